@@ -0,0 +1,307 @@
+"""
+Splash detectors for the Fishbot audio stream.
+Each detector consumes batches of int16 chunks read from the AudioEngine ring
+and reports a score and a trigger flag per analysis frame. Detectors keep
+their own streaming state, so a backlog can be processed in one call, and
+they time themselves so the cost per chunk can be checked against the
+real-time budget (1024 samples at 44.1 kHz is 23.2 ms).
+"""
+
+import os
+import time
+import logging
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+from audio_engine import CHUNK, RATE, read_wav
+from audio_features import AudioFeatureExtractor, as_chunks, ema
+
+logger = logging.getLogger(__name__)
+
+Band = Tuple[float, float]
+
+@dataclass
+class AudioDetection:
+    """Scores for one batch; one entry per analysis frame"""
+    score: np.ndarray
+    triggered: np.ndarray
+    
+    @property
+    def fired(self) -> bool:
+        return bool(self.triggered.any())
+    
+    @property
+    def first(self) -> Optional[int]:
+        """Index of the first triggering frame"""
+        hits = np.flatnonzero(self.triggered)
+        return int(hits[0]) if hits.size else None
+    
+    @property
+    def peak_score(self) -> float:
+        return float(self.score.max()) if len(self.score) else 0.0
+
+class AudioDetector:
+    """Base class for streaming splash detectors"""
+    
+    name = ''
+    
+    def __init__(self):
+        self.last_chunk_ms = 0.0
+        self.total_ms = 0.0
+        self.chunks_processed = 0
+    
+    @property
+    def mean_chunk_ms(self) -> float:
+        """Average processing cost per input chunk so far"""
+        return self.total_ms / self.chunks_processed if self.chunks_processed else 0.0
+    
+    def reset(self):
+        """Drop streaming state (e.g. after the read cursor jumped)"""
+        pass
+    
+    def process(self, chunks: Union[bytes, np.ndarray]) -> AudioDetection:
+        """Score a batch of chunks, timing the work"""
+        chunks = as_chunks(chunks)
+        start = time.perf_counter()
+        result = self._process(chunks)
+        elapsed = (time.perf_counter() - start) * 1000
+        if len(chunks):
+            self.last_chunk_ms = elapsed / len(chunks)
+            self.total_ms += elapsed
+            self.chunks_processed += len(chunks)
+        return result
+    
+    def _process(self, chunks: np.ndarray) -> AudioDetection:
+        raise NotImplementedError
+
+class RMSDetector(AudioDetector):
+    """Broadband volume threshold, one frame per chunk"""
+    
+    name = 'rms'
+    
+    def __init__(self, threshold: float = 3000):
+        super().__init__()
+        self.threshold = threshold
+        self.features = AudioFeatureExtractor()
+    
+    def reset(self):
+        self.features.reset()
+    
+    def _process(self, chunks: np.ndarray) -> AudioDetection:
+        rms = self.features.process(chunks).rms
+        return AudioDetection(rms, rms > self.threshold)
+
+class SpectralSplashDetector(AudioDetector):
+    """Band-limited onset detector on a windowed short-time FFT
+    
+    Overlapping Hann-windowed frames are transformed with rfft and the power
+    is summed into the configured splash bands. Each band is compared with a
+    slow running noise floor; a frame triggers when a band rises by
+    `onset_ratio` over its floor and by `selectivity` times more than the
+    energy outside the bands, so broadband noise (voice chat, explosions)
+    that lifts everything at once does not fire.
+    """
+    
+    name = 'spectral'
+    MAX_BATCH = 512
+    
+    def __init__(self, sample_rate: int = RATE, bands: Sequence[Band] = ((1000.0, 4000.0), (4000.0, 8000.0)),
+                 window_size: int = CHUNK, hop: int = CHUNK // 2, onset_ratio: float = 6.0,
+                 selectivity: float = 2.0, floor_alpha: float = 0.02, min_energy: float = 1e3):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.bands = [tuple(band) for band in bands]
+        self.window_size = window_size
+        self.hop = hop
+        self.onset_ratio = onset_ratio
+        self.selectivity = selectivity
+        self.floor_alpha = floor_alpha
+        self.min_energy = min_energy
+        
+        self.window = np.hanning(window_size)
+        # Normalise so a full-scale sine has a band power of roughly its mean square
+        self._scale = 2.0 / (self.window.sum() ** 2)
+        freqs = np.fft.rfftfreq(window_size, 1.0 / sample_rate)
+        self.band_matrix = np.stack([(freqs >= low) & (freqs < high) for low, high in self.bands],
+                                    axis=1).astype(np.float64)
+        if not self.band_matrix.any(axis=0).all():
+            raise ValueError(f"Splash band outside the spectrum at {sample_rate} Hz: {self.bands}")
+        # Out-of-band energy is tracked as one extra column
+        self.band_matrix = np.hstack([self.band_matrix, 1.0 - self.band_matrix.max(axis=1, keepdims=True)])
+        self.reset()
+    
+    def reset(self):
+        self._pending = np.zeros(0, dtype=np.float64)
+        self.floor: Optional[np.ndarray] = None
+    
+    def frames(self, chunks: np.ndarray) -> np.ndarray:
+        """Overlapping analysis frames from the pending samples plus new chunks"""
+        samples = np.concatenate([self._pending, chunks.ravel()])
+        count = (len(samples) - self.window_size) // self.hop + 1 if len(samples) >= self.window_size else 0
+        self._pending = samples[count * self.hop:]
+        if count == 0:
+            return np.zeros((0, self.window_size))
+        return np.lib.stride_tricks.sliding_window_view(samples, self.window_size)[::self.hop][:count]
+    
+    def band_energy(self, frames: np.ndarray) -> np.ndarray:
+        """Power per splash band plus out-of-band power, shape (frames, bands + 1)"""
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        return power @ self.band_matrix * self._scale
+    
+    def _process(self, chunks: np.ndarray) -> AudioDetection:
+        frames = self.frames(chunks)
+        if len(frames) == 0:
+            return AudioDetection(np.zeros(0), np.zeros(0, dtype=bool))
+        if len(frames) > self.MAX_BATCH:
+            parts = [self._score(frames[i:i + self.MAX_BATCH]) for i in range(0, len(frames), self.MAX_BATCH)]
+            return AudioDetection(np.concatenate([part.score for part in parts]),
+                                  np.concatenate([part.triggered for part in parts]))
+        return self._score(frames)
+    
+    def floor_ratio(self, frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Energy over the running noise floor for a block of frames, advancing the floor
+        
+        Returns (ratio, energy), both shaped (frames, bands + 1) with the
+        out-of-band column last. The thresholds are applied separately, so
+        calibration can sweep them over one pass of the audio.
+        """
+        energy = self.band_energy(frames)
+        if self.floor is None:
+            self.floor = energy[0].copy()
+        
+        # Compare each frame against the floor *before* it arrived
+        floor = np.vstack([self.floor, ema(energy[:-1], self.floor, self.floor_alpha)])
+        self.floor = floor[-1] * (1 - self.floor_alpha) + energy[-1] * self.floor_alpha
+        return energy / np.maximum(floor, self.min_energy), energy
+    
+    def _score(self, frames: np.ndarray) -> AudioDetection:
+        """Onsets for a block of frames, advancing the noise floor"""
+        ratio, energy = self.floor_ratio(frames)
+        band_ratio = ratio[:, :-1]
+        selective = band_ratio >= self.selectivity * ratio[:, -1:]
+        onset = (band_ratio >= self.onset_ratio) & selective & (energy[:, :-1] >= self.min_energy)
+        return AudioDetection(band_ratio.max(axis=1), onset.any(axis=1))
+
+class MatchedFilterDetector(AudioDetector):
+    """Normalised cross-correlation against recorded splash clips
+    
+    The clips are applied as FIR filters with streaming, uniformly partitioned
+    overlap-save FFT convolution. Each clip is split into `block_size`
+    partitions; every new block of audio is transformed once and multiplied
+    against the partition spectra through a short delay line of recent block
+    spectra. The cost per chunk is fixed by the clip and block sizes, not by
+    how long the session has run. The score is the best normalised
+    correlation (-1..1) across clips for the windows ending in each block.
+    """
+    
+    name = 'matched'
+    
+    def __init__(self, clips: Sequence[np.ndarray], threshold: float = 0.5, block_size: int = CHUNK,
+                 min_rms: float = 200.0, names: Sequence[str] = ()):
+        super().__init__()
+        if not clips:
+            raise ValueError("Matched filter needs at least one splash clip")
+        self.threshold = threshold
+        self.block_size = block_size
+        self.min_rms = min_rms
+        self.names = list(names) or [f"clip{i}" for i in range(len(clips))]
+        
+        clips = [np.asarray(clip, dtype=np.float64) for clip in clips]
+        clips = [clip - clip.mean() for clip in clips]
+        self.lengths = np.array([len(clip) for clip in clips])
+        self.norms = np.array([np.linalg.norm(clip) for clip in clips])
+        self.clip_length = int(self.lengths.max())
+        self.partitions = -(-self.clip_length // block_size)
+        
+        # Reversed clips, end-aligned so every filter reports the window ending at the same sample
+        kernels = np.zeros((len(clips), self.partitions * block_size))
+        for i, clip in enumerate(clips):
+            kernels[i, :len(clip)] = clip[::-1]
+        partitions = kernels.reshape(len(clips), self.partitions, block_size)
+        # Oldest block first, to line up with the delay line
+        self.filters = np.fft.rfft(partitions, n=2 * block_size, axis=2)[:, ::-1, :]
+        # Samples kept between calls: enough for the energy window and the FFT overlap
+        self.history_size = max(self.clip_length - 1, block_size)
+        self.reset()
+    
+    def reset(self):
+        self._history = np.zeros(self.history_size)
+        self._pending = np.zeros(0)
+        self._delay_line = np.zeros((self.partitions - 1, self.block_size + 1), dtype=np.complex128)
+    
+    def _process(self, chunks: np.ndarray) -> AudioDetection:
+        block = self.block_size
+        buffer = np.concatenate([self._history, self._pending, chunks.ravel()])
+        count = (len(buffer) - self.history_size) // block
+        if count == 0:
+            self._pending = buffer[self.history_size:]
+            return AudioDetection(np.zeros(0), np.zeros(0, dtype=bool))
+        
+        # One 2-block FFT per new block (overlap-save input), then the partitioned product
+        windows = np.lib.stride_tricks.sliding_window_view(buffer[self.history_size - block:], 2 * block)
+        spectra = np.concatenate([self._delay_line, np.fft.rfft(windows[::block][:count], axis=1)])
+        lines = np.lib.stride_tricks.sliding_window_view(spectra, self.partitions, axis=0)
+        product = np.einsum('kfp,tpf->ktf', lines, self.filters)
+        # The first half of each output wraps around and is discarded
+        correlation = np.fft.irfft(product, n=2 * block, axis=2)[:, :, block:]
+        
+        # Energy of the window under each clip, from one running sum of squares
+        squares = np.concatenate([[0.0], np.cumsum(buffer * buffer)])
+        ends = self.history_size + 1 + np.arange(count * block).reshape(count, 1, block)
+        energy = np.maximum(squares[ends] - squares[ends - self.lengths[None, :, None]], 0.0)
+        loud = energy >= self.lengths[None, :, None] * self.min_rms ** 2
+        ncc = correlation / (self.norms[None, :, None] * np.sqrt(np.maximum(energy, 1.0)))
+        score = np.where(loud, ncc, 0.0).max(axis=(1, 2))
+        
+        consumed = count * block
+        self._history = buffer[consumed:consumed + self.history_size]
+        self._pending = buffer[consumed + self.history_size:]
+        self._delay_line = spectra[len(spectra) - self.partitions + 1:]
+        return AudioDetection(score, score >= self.threshold)
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """Linear-interpolation resample, adequate for short reference clips"""
+    if rate == target_rate:
+        return samples
+    count = int(round(len(samples) * target_rate / rate))
+    return np.interp(np.arange(count) * rate / target_rate, np.arange(len(samples)), samples)
+
+def load_sound_templates(directory: str = 'templates/sounds',
+                         sample_rate: int = RATE) -> Tuple[List[str], List[np.ndarray]]:
+    """Splash clips from every WAV file in `directory`, resampled to `sample_rate`"""
+    names, clips = [], []
+    if not os.path.isdir(directory):
+        return names, clips
+    for filename in sorted(os.listdir(directory)):
+        if not filename.lower().endswith('.wav'):
+            continue
+        try:
+            samples, rate = read_wav(os.path.join(directory, filename))
+        except Exception as e:
+            logger.warning(f"Skipping sound template {filename}: {e}")
+            continue
+        names.append(os.path.splitext(filename)[0])
+        clips.append(resample(samples.astype(np.float64), rate, sample_rate))
+    return names, clips
+
+def extract_splash_clip(samples: np.ndarray, sample_rate: int = RATE, length: float = 0.3,
+                        pre_roll: float = 0.02) -> np.ndarray:
+    """Cut the loudest event out of a recording, starting just before its onset
+    
+    The onset is the start of the run of 10 ms frames leading up to the
+    loudest one that stay above both 4x the median level and 10% of the peak.
+    """
+    hop = max(1, sample_rate // 100)
+    count = len(samples) // hop
+    if count == 0:
+        return samples.copy()
+    frames = samples[:count * hop].reshape(count, hop).astype(np.float64)
+    energy = np.einsum('ij,ij->i', frames, frames)
+    loudest = int(energy.argmax())
+    level = max(4 * np.median(energy), 0.1 * energy[loudest])
+    quiet = np.flatnonzero(energy[:loudest] < level)
+    onset = int(quiet[-1]) + 1 if quiet.size else 0
+    start = max(0, onset * hop - int(pre_roll * sample_rate))
+    return samples[start:start + int(length * sample_rate)].copy()
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+Long-lived audio input for the Fishbot sound detector.
+The input device is opened once and delivers chunks from its own callback
+thread into a preallocated ring buffer with monotonic timestamps. Readers
+keep their own cursor, so arming detection for a cast is just remembering
+the current write position.
+"""
+
+import numpy as np
+import threading
+import time
+import wave
+import logging
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK = 1024
+RATE = 44100
+
+ChunkCallback = Callable[[np.ndarray, float], None]
+
+def read_wav(path: str) -> Tuple[np.ndarray, int]:
+    """16-bit WAV file as mono int16 samples and its sample rate"""
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"Only 16-bit WAV files are supported: {path}")
+        sample_rate = wav.getframerate()
+        channels = wav.getnchannels()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    # Mix down to mono
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = RATE):
+    """Write mono int16 samples as a 16-bit WAV file"""
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+
+class AudioRingBuffer:
+    """Single-producer ring of fixed-size int16 chunks with timestamps
+    
+    The producer fills a slot and only then publishes it by bumping
+    `write_count`, so readers never need a lock. A reader that falls more
+    than `capacity` chunks behind skips ahead to the oldest valid chunk.
+    """
+    
+    def __init__(self, capacity: int = 256, chunk_size: int = CHUNK):
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.samples = np.zeros((capacity, chunk_size), dtype=np.int16)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.write_count = 0
+    
+    def write(self, chunk: np.ndarray, timestamp: float):
+        """Store one chunk (shorter chunks are zero-padded)"""
+        slot = self.write_count % self.capacity
+        count = min(len(chunk), self.chunk_size)
+        self.samples[slot, :count] = chunk[:count]
+        if count < self.chunk_size:
+            self.samples[slot, count:] = 0
+        self.timestamps[slot] = timestamp
+        self.write_count += 1
+    
+    def read(self, cursor: int, max_chunks: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Chunks written since `cursor` as (samples, timestamps, new_cursor)
+        
+        Returns views into the ring when the range does not wrap and copies
+        otherwise. Views are only valid until the producer laps them.
+        """
+        end = self.write_count
+        start = max(cursor, end - self.capacity + 1)
+        if max_chunks is not None:
+            end = min(end, start + max_chunks)
+        if end <= start:
+            return self.samples[:0], self.timestamps[:0], max(cursor, end)
+        
+        first = start % self.capacity
+        last = first + (end - start)
+        if last <= self.capacity:
+            return self.samples[first:last], self.timestamps[first:last], end
+        
+        indices = np.arange(start, end) % self.capacity
+        return self.samples[indices], self.timestamps[indices], end
+
+class AudioInput:
+    """Base class for audio sources that push int16 mono chunks to a callback"""
+    
+    sample_rate = RATE
+    chunk_size = CHUNK
+    
+    def start(self, callback: ChunkCallback):
+        """Begin delivering chunks to callback(samples, timestamp)"""
+        raise NotImplementedError
+    
+    def stop(self):
+        """Stop delivering chunks"""
+        pass
+
+class PyAudioInput(AudioInput):
+    """Microphone/loopback input through PyAudio in callback mode"""
+    
+    def __init__(self, sample_rate: int = RATE, chunk_size: int = CHUNK, device_index: Optional[int] = None):
+        import pyaudio
+        self._pyaudio = pyaudio
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.device_index = device_index
+        self._audio = None
+        self._stream = None
+    
+    def start(self, callback: ChunkCallback):
+        pyaudio = self._pyaudio
+        
+        def on_audio(in_data, frame_count, time_info, status):
+            callback(np.frombuffer(in_data, dtype=np.int16), time.monotonic())
+            return (None, pyaudio.paContinue)
+        
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16,
+                                        channels=1,
+                                        rate=self.sample_rate,
+                                        input=True,
+                                        input_device_index=self.device_index,
+                                        frames_per_buffer=self.chunk_size,
+                                        stream_callback=on_audio)
+        self._stream.start_stream()
+    
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._audio is not None:
+            self._audio.terminate()
+            self._audio = None
+
+class WavFileInput(AudioInput):
+    """Plays a 16-bit WAV file into the engine, for testing without a sound card
+    
+    With `realtime` the chunks are paced at the file's sample rate; otherwise
+    they are delivered as fast as possible.
+    """
+    
+    def __init__(self, path: str, chunk_size: int = CHUNK, realtime: bool = True, loop: bool = False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+        self.loop = loop
+        self.samples, self.sample_rate = read_wav(path)
+        self.finished = threading.Event()
+        self._running = False
+        self._thread = None
+    
+    def _run(self, callback: ChunkCallback):
+        """Feed the file chunk by chunk"""
+        period = self.chunk_size / self.sample_rate
+        next_time = time.monotonic()
+        while self._running:
+            for start in range(0, len(self.samples), self.chunk_size):
+                if not self._running:
+                    break
+                if self.realtime:
+                    next_time += period
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                callback(self.samples[start:start + self.chunk_size], time.monotonic())
+            if not self.loop:
+                break
+        self.finished.set()
+    
+    def start(self, callback: ChunkCallback):
+        self._running = True
+        self.finished.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback,))
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def stop(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+class AudioEngine:
+    """Opens an audio input once and keeps a timestamped ring of recent chunks
+    
+    Listeners (e.g. a session recorder) are called with every chunk on the
+    input's thread and must return quickly.
+    """
+    
+    def __init__(self, audio_input: Optional[AudioInput] = None, capacity: int = 256):
+        self._input = audio_input
+        self.capacity = capacity
+        self.ring = None
+        self.running = False
+        self.listeners: List[ChunkCallback] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def sample_rate(self) -> int:
+        return self._input.sample_rate if self._input is not None else RATE
+    
+    def push(self, samples: np.ndarray, timestamp: float):
+        """Store one chunk; called from the input's thread, or directly when replaying"""
+        self.ring.write(samples, timestamp)
+        for listener in self.listeners:
+            listener(samples, timestamp)
+    
+    def start(self) -> bool:
+        """Open the input if it is not already running; returns False if unavailable"""
+        with self._lock:
+            if self.running:
+                return True
+            try:
+                if self._input is None:
+                    self._input = PyAudioInput()
+                self.ring = AudioRingBuffer(self.capacity, self._input.chunk_size)
+                self._input.start(self.push)
+                self.running = True
+                logger.info("Audio engine started")
+            except ImportError:
+                logger.warning("PyAudio not available, sound detection disabled")
+            except Exception as e:
+                logger.error(f"Audio engine error: {e}")
+            return self.running
+    
+    def stop(self):
+        """Close the input device"""
+        with self._lock:
+            if self.running:
+                self._input.stop()
+                self.running = False
+                logger.info("Audio engine stopped")
+    
+    def cursor(self) -> int:
+        """Current write position; read from here to see only new audio"""
+        return self.ring.write_count if self.ring is not None else 0
+    
+    def read(self, cursor: int, max_chunks: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Chunks written since `cursor` as (samples, timestamps, new_cursor)"""
+        if self.ring is None:
+            empty = np.zeros((0, CHUNK), dtype=np.int16)
+            return empty, np.zeros(0), cursor
+        return self.ring.read(cursor, max_chunks)
\ No newline at end of file
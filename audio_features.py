@@ -0,0 +1,98 @@
+"""
+Vectorised audio features for the Fishbot sound detector.
+Replaces audioop (removed in Python 3.13). Features are computed directly on
+int16 views of the audio chunks, and a backlog of chunks is processed in a
+single numpy call rather than one chunk at a time.
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Union
+
+@dataclass
+class AudioFeatures:
+    """Per-chunk features for a batch of chunks"""
+    rms: np.ndarray
+    peak: np.ndarray
+    energy: np.ndarray
+    energy_ratio: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.rms)
+
+def as_chunks(data: Union[bytes, np.ndarray], chunk_size: Optional[int] = None) -> np.ndarray:
+    """View raw int16 bytes (or samples) as a 2-D (chunks, samples) array without copying"""
+    samples = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    if samples.ndim == 2:
+        return samples
+    if chunk_size is None:
+        return samples.reshape(1, -1)
+    return samples[:len(samples) - len(samples) % chunk_size].reshape(-1, chunk_size)
+
+def mean_square(chunks: np.ndarray) -> np.ndarray:
+    """Mean of squared samples per chunk, accumulated in int64 without a widened copy"""
+    return np.einsum('ij,ij->i', chunks, chunks, dtype=np.int64) / chunks.shape[1]
+
+def rms(data: Union[bytes, np.ndarray]) -> np.ndarray:
+    """Root-mean-square per chunk (same scale as audioop.rms for 16-bit audio)"""
+    return np.sqrt(mean_square(as_chunks(data)))
+
+def peak(chunks: np.ndarray) -> np.ndarray:
+    """Largest absolute sample per chunk (avoids np.abs overflow at -32768)"""
+    return np.maximum(chunks.max(axis=1).astype(np.int32), -chunks.min(axis=1).astype(np.int32))
+
+def ema(values: np.ndarray, initial: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponential moving average along axis 0 in closed form
+    
+    L_k = d*L_{k-1} + a*E_k, i.e. L_k = d^k * (L_0 + a * sum_j E_j / d^j).
+    Keep batches to a few hundred rows so d^-k stays well inside float64 range.
+    """
+    decay = (1 - alpha) ** np.arange(1, len(values) + 1)
+    decay = decay.reshape((-1,) + (1,) * (values.ndim - 1))
+    return decay * (initial + alpha * np.cumsum(values / decay, axis=0))
+
+class AudioFeatureExtractor:
+    """Batched RMS, peak and short-term/long-term energy ratio
+    
+    The long-term energy is an exponential moving average over chunks. For a
+    batch it is evaluated in closed form, so a backlog of chunks is a handful
+    of vectorised numpy calls instead of a Python loop.
+    """
+    
+    MAX_BATCH = 512
+    
+    def __init__(self, long_term_alpha: float = 0.05):
+        self.long_term_alpha = long_term_alpha
+        self.long_term_energy: Optional[float] = None
+    
+    def reset(self):
+        """Forget the long-term energy (e.g. when a new cast is armed)"""
+        self.long_term_energy = None
+    
+    def process(self, chunks: Union[bytes, np.ndarray]) -> AudioFeatures:
+        """Features for every chunk in the batch, updating the long-term average"""
+        chunks = as_chunks(chunks)
+        if len(chunks) == 0:
+            empty = np.zeros(0)
+            return AudioFeatures(empty, empty, empty, empty)
+        
+        if len(chunks) > self.MAX_BATCH:
+            # Keep d^-k well inside float64 range for very long backlogs
+            parts = [self.process(chunks[i:i + self.MAX_BATCH]) for i in range(0, len(chunks), self.MAX_BATCH)]
+            return AudioFeatures(*(np.concatenate([getattr(part, name) for part in parts])
+                                   for name in ('rms', 'peak', 'energy', 'energy_ratio')))
+        
+        energy = mean_square(chunks)
+        if self.long_term_energy is None:
+            self.long_term_energy = float(energy[0])
+        
+        long_term = ema(energy, self.long_term_energy, self.long_term_alpha)
+        
+        # Compare each chunk against the average *before* it arrived
+        previous = np.empty_like(long_term)
+        previous[0] = self.long_term_energy
+        previous[1:] = long_term[:-1]
+        ratio = energy / np.maximum(previous, 1.0)
+        
+        self.long_term_energy = float(long_term[-1])
+        return AudioFeatures(np.sqrt(energy), peak(chunks), energy, ratio)
\ No newline at end of file
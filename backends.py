@@ -0,0 +1,91 @@
+"""
+Clock and input backends for the Fishbot.
+FishBot takes all of its timing and key presses from these objects instead
+of calling time and pyautogui directly, so the same bot loop can drive the
+real game or a simulated one on a virtual clock (see simulation.py).
+"""
+
+import time
+from typing import Callable, List
+
+class Clock:
+    """Base class for the time source used by the bot loop"""
+    
+    def time(self) -> float:
+        """Wall-clock seconds, for timeouts and statistics"""
+        raise NotImplementedError
+    
+    def perf_counter(self) -> float:
+        """Monotonic high-resolution seconds, for latency measurements"""
+        raise NotImplementedError
+    
+    def sleep(self, seconds: float):
+        raise NotImplementedError
+
+class SystemClock(Clock):
+    """The real clock"""
+    
+    def time(self) -> float:
+        return time.time()
+    
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+    
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+class VirtualClock(Clock):
+    """Clock that only moves when the bot sleeps
+    
+    Sleeping returns immediately after advancing the clock and notifying the
+    listeners, which is where a simulated world produces the frames and
+    audio for the elapsed time. Every reading is therefore deterministic.
+    """
+    
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.listeners: List[Callable[[float], None]] = []
+    
+    def time(self) -> float:
+        return self.now
+    
+    def perf_counter(self) -> float:
+        return self.now
+    
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+        for listener in self.listeners:
+            listener(self.now)
+
+class InputBackend:
+    """Base class for sending game key presses"""
+    
+    # Set by backends that queue inputs and send them later from another thread
+    deferred = False
+    
+    def press(self, key: str):
+        raise NotImplementedError
+    
+    def hotkey(self, *keys: str):
+        """Press a key combination, e.g. hotkey('shift', 'right')"""
+        raise NotImplementedError
+    
+    def click(self, x: int, y: int):
+        """Left-click a screen position, e.g. to focus a game window"""
+        raise NotImplementedError
+
+class PyAutoGUIInput(InputBackend):
+    """Real key presses through pyautogui (imported on first use)"""
+    
+    def press(self, key: str):
+        import pyautogui
+        pyautogui.press(key)
+    
+    def hotkey(self, *keys: str):
+        import pyautogui
+        pyautogui.hotkey(*keys)
+    
+    def click(self, x: int, y: int):
+        import pyautogui
+        pyautogui.click(x, y)
\ No newline at end of file
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Fishbot detection hot paths.
+Everything runs on synthetic frames, so no display or game is needed.
+
+    python benchmark.py bobber
+    python benchmark.py audio
+    python benchmark.py suite --save benchmarks/baseline.json
+    python benchmark.py suite --baseline benchmarks/baseline.json
+    python benchmark.py parallel --workers 0 1 2 4
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from audio_detectors import (AudioDetector, MatchedFilterDetector, RMSDetector, SpectralSplashDetector,
+                             extract_splash_clip)
+from audio_engine import CHUNK, RATE
+from audio_features import AudioFeatureExtractor
+from capture import Frame, SyntheticFrameSource
+from template_matching import PyramidMatcher, TemplateBank, match_single_scale
+
+BOBBER_RADIUS = 10
+TEMPLATE_SIZE = 40
+
+def bobber_scene(position: Tuple[int, int], area: Tuple[int, int, int, int], scale: float = 1.0,
+                 seed: int = 0) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Render one grayscale scene and return it with the true bobber centre"""
+    source = SyntheticFrameSource(seed=seed, screen_size=(area[0] + area[2], area[1] + area[3]),
+                                  bobber_position=position,
+                                  bobber_radius=max(2, round(BOBBER_RADIUS * scale)))
+    frame = source.grab(area)
+    # Matches the bobbing offset the source applies on its first tick
+    bob = int(round(2 * np.sin(0.5)))
+    center = (position[0] - area[0], position[1] - area[1] + bob)
+    return frame.gray.copy(), center
+
+def bobber_template(seed: int = 1, size: int = TEMPLATE_SIZE) -> np.ndarray:
+    """Tight bobber template cut from a scene with different water noise"""
+    area = (0, 0, 200, 200)
+    gray, (cx, cy) = bobber_scene((100, 100), area, scale=size / TEMPLATE_SIZE, seed=seed)
+    half = size // 2
+    return gray[cy - half:cy + half, cx - half:cx + half].copy()
+
+def time_call(function: Callable, repeat: int) -> np.ndarray:
+    """Per-call latency in milliseconds"""
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples[i] = (time.perf_counter() - start) * 1000
+    return samples
+
+def allocated_kib(function: Callable, repeat: int = 3) -> float:
+    """Peak Python/numpy heap growth per call in KiB (OpenCV's own buffers are not traced)"""
+    function()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(repeat):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            function()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return max(peaks) / 1024
+
+def bench_bobber(args):
+    """Compare single-scale and pyramid bobber matching on latency and accuracy"""
+    rng = np.random.default_rng(args.seed)
+    area = (0, 0, args.width, args.height)
+    template = bobber_template()
+    
+    methods: Dict[str, Callable] = {
+        'single-scale': lambda gray: match_single_scale(gray, template),
+        'pyramid': PyramidMatcher(template, levels=args.levels).match,
+        'pyramid multi-scale': PyramidMatcher(template, scales=args.scales, levels=args.levels).match,
+    }
+    scene_sets = {'fixed zoom': [1.0], 'varied zoom': [min(args.scales), 1.0, max(args.scales)]}
+    
+    print(f"Bobber matching, {args.width}x{args.height} area, {TEMPLATE_SIZE}x{TEMPLATE_SIZE} template, "
+          f"{args.trials} scenes per set")
+    print(f"{'scenes':<12} {'method':<20} {'p50 ms':>8} {'p95 ms':>8} {'hit %':>7} {'mean err px':>12}")
+    
+    margin = TEMPLATE_SIZE
+    for set_name, zooms in scene_sets.items():
+        scenes: List[Tuple[np.ndarray, Tuple[int, int]]] = []
+        for trial in range(args.trials):
+            position = (int(rng.integers(margin, args.width - margin)),
+                        int(rng.integers(margin, args.height - margin)))
+            scenes.append(bobber_scene(position, area, zooms[trial % len(zooms)], seed=trial + 2))
+        
+        for name, match in methods.items():
+            latencies = []
+            errors = []
+            for gray, center in scenes:
+                latencies.append(time_call(lambda: match(gray), args.repeat))
+                result = match(gray)
+                found = result.center if result is not None else (-10 ** 6, -10 ** 6)
+                errors.append(np.hypot(found[0] - center[0], found[1] - center[1]))
+            
+            latencies = np.concatenate(latencies)
+            errors = np.array(errors)
+            hits = errors <= args.tolerance
+            mean_error = errors[hits].mean() if hits.any() else float('nan')
+            print(f"{set_name:<12} {name:<20} {np.percentile(latencies, 50):8.2f} "
+                  f"{np.percentile(latencies, 95):8.2f} {hits.mean() * 100:7.1f} {mean_error:12.2f}")
+
+def audio_scene(kind: str, rng: np.random.Generator, seconds: float = 2.0, onset: float = 1.0,
+                event_seed: int = 7) -> np.ndarray:
+    """Quiet background with one loud event as int16 chunks
+    
+    `splash` is band-limited noise (1.5-6 kHz) with a fast decay, `broadband`
+    is white noise and `voice` is a low harmonic tone, both at similar volume.
+    """
+    count = int(seconds * RATE)
+    samples = rng.normal(0, 300, count)
+    start = int(onset * RATE)
+    length = int(0.3 * RATE)
+    t = np.arange(length) / RATE
+    if kind == 'splash':
+        # Same splash every time, as with a game sound effect
+        spectrum = np.fft.rfft(np.random.default_rng(event_seed).normal(0, 1, length))
+        freqs = np.fft.rfftfreq(length, 1.0 / RATE)
+        spectrum[(freqs < 1500) | (freqs > 6000)] = 0
+        event = np.fft.irfft(spectrum, length)
+        event *= 6000 / event.std() * np.exp(-t * 8)
+    elif kind == 'broadband':
+        event = rng.normal(0, 6000, length)
+    elif kind == 'voice':
+        event = sum(4000 / h * np.sin(2 * np.pi * 180 * h * t) for h in range(1, 5))
+    else:
+        raise ValueError(kind)
+    samples[start:start + length] += event
+    samples = np.clip(samples, -32768, 32767).astype(np.int16)
+    return samples[:len(samples) // CHUNK * CHUNK].reshape(-1, CHUNK)
+
+def bench_audio(args):
+    """Per-chunk cost and false/true triggers of the audio splash detectors"""
+    rng = np.random.default_rng(args.seed)
+    # Reference clip: the splash from a separate recording, cut the way the setup utility does
+    reference = extract_splash_clip(audio_scene('splash', np.random.default_rng(args.seed + 1)).ravel())
+    detectors: Dict[str, Callable[[], AudioDetector]] = {
+        'rms': RMSDetector,
+        'spectral': SpectralSplashDetector,
+        'matched': lambda: MatchedFilterDetector([reference]),
+    }
+    budget = CHUNK / RATE * 1000
+    
+    print(f"Audio detectors, {CHUNK}-sample chunks at {RATE} Hz ({budget:.1f} ms real-time budget), "
+          f"polled {args.batch} chunks at a time")
+    print(f"{'detector':<10} {'ms/chunk':>9} {'x realtime':>11} {'splash':>7} {'broadband':>10} {'voice':>6}")
+    scenes = {kind: audio_scene(kind, rng) for kind in ('splash', 'broadband', 'voice')}
+    for name, create in detectors.items():
+        fired = {}
+        detector = create()
+        for kind, chunks in scenes.items():
+            detector.reset()
+            fired[kind] = any(detector.process(chunks[i:i + args.batch]).fired
+                              for i in range(0, len(chunks), args.batch))
+        
+        # Steady-state cost on background noise
+        detector = create()
+        noise = rng.normal(0, 300, (args.chunks, CHUNK)).astype(np.int16)
+        for i in range(0, args.chunks, args.batch):
+            detector.process(noise[i:i + args.batch])
+        cost = detector.mean_chunk_ms
+        marks = {kind: 'fired' if hit else '-' for kind, hit in fired.items()}
+        print(f"{name:<10} {cost:9.3f} {budget / cost:11.0f} {marks['splash']:>7} "
+              f"{marks['broadband']:>10} {marks['voice']:>6}")
+
+ROI_SIZES = [(100, 100), (320, 240), (800, 600), (1920, 1080)]
+TEMPLATE_SIZES = [24, 40, 64]
+
+def suite_cases(args) -> List[Tuple[str, str, Callable]]:
+    """(case, size, call) for every hot path in the matrix"""
+    # Imported here so the other benchmarks do not need the bot's GUI dependencies
+    from main import FishbotConfig, VisualDetector
+    
+    cases = []
+    for width, height in ROI_SIZES:
+        size = f"{width}x{height}"
+        area = (0, 0, width, height)
+        source = SyntheticFrameSource(seed=0, screen_size=(width, height),
+                                      bobber_position=(width // 2, height // 2))
+        bgr = source.grab(area).bgr.copy()
+        moved = source.grab(area).bgr.copy()
+        bgra = cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA)
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        
+        visual = VisualDetector(FishbotConfig(bobber_detection_area=area))
+        
+        def new_frame(image: np.ndarray, visual=visual, area=area) -> Frame:
+            # What VisualDetector.capture_frame does after the grab
+            frame = Frame(image, area)
+            visual.engine.prepare(frame)
+            return frame
+        
+        # pyautogui path: RGB screenshot into a persistent BGR buffer; XShm path: BGRA view to gray
+        buffer = np.empty_like(bgr)
+        cases.append(("capture_rgb_to_bgr", size, lambda rgb=rgb, buffer=buffer:
+                      cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=buffer)))
+        cases.append(("capture_bgra_gray", size, lambda bgra=bgra, new_frame=new_frame:
+                      new_frame(bgra).gray))
+        cases.append(("detect_splash", size, lambda bgr=bgr, visual=visual, new_frame=new_frame:
+                      visual.detect_splash(new_frame(bgr))))
+        
+        frames = [new_frame(bgr)]
+        images = [bgr, moved]
+        def motion(visual=visual, new_frame=new_frame, frames=frames, images=images):
+            current = new_frame(images[len(frames) % 2])
+            visual.detect_motion(frames[-1], current)
+            frames[-1] = current
+        cases.append(("detect_motion", size, motion))
+        
+        for template_size in TEMPLATE_SIZES:
+            if template_size * 2 > min(width, height):
+                continue
+            bank = TemplateBank(directory='', levels=2)
+            bank.add('bobber', bobber_template(size=template_size))
+            detector = VisualDetector(FishbotConfig(bobber_detection_area=area))
+            detector.bobber_bank = bank
+            cases.append((f"detect_bobber_t{template_size}", size, lambda bgr=bgr, detector=detector, new_frame=new_frame:
+                          detector.detect_bobber(new_frame(bgr))))
+    
+    rng = np.random.default_rng(args.seed)
+    for batch in (1, 4):
+        chunks = rng.normal(0, 300, (batch, CHUNK)).astype(np.int16)
+        extractor = AudioFeatureExtractor()
+        cases.append(("audio_rms", f"{batch}x{CHUNK}", lambda chunks=chunks, extractor=extractor:
+                      extractor.process(chunks)))
+        spectral = SpectralSplashDetector()
+        cases.append(("audio_spectral", f"{batch}x{CHUNK}", lambda chunks=chunks, spectral=spectral:
+                      spectral.process(chunks)))
+    return cases
+
+def environment() -> Dict[str, str]:
+    """Versions and machine the numbers were taken on"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": str(os.cpu_count()),
+        "opencv_threads": str(cv2.getNumThreads()),
+    }
+
+def bench_suite(args):
+    """Latency percentiles and allocations for the detection hot paths"""
+    cv2.setNumThreads(args.threads)
+    baseline: Optional[Dict] = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    
+    results = {}
+    regressions = []
+    header = f"{'case':<22} {'size':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'alloc KiB':>10}"
+    print(header + (f" {'vs base':>8}" if baseline else ""))
+    for name, size, call in suite_cases(args):
+        time_call(call, args.warmup)
+        latencies = time_call(call, args.repeat)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        key = f"{name}@{size}"
+        results[key] = {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "alloc_kib": allocated_kib(call)}
+        
+        line = f"{name:<22} {size:>10} {p50:8.3f} {p95:8.3f} {p99:8.3f} {results[key]['alloc_kib']:10.1f}"
+        if baseline and key in baseline["results"]:
+            ratio = p50 / max(baseline["results"][key]["p50_ms"], 1e-6)
+            # Ignore sub-50us differences; they are timer noise
+            regressed = ratio > args.tolerance and p50 - baseline["results"][key]["p50_ms"] > 0.05
+            line += f" {ratio:7.2f}x" + (" REGRESSION" if regressed else "")
+            if regressed:
+                regressions.append(key)
+        print(line)
+    
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({"environment": environment(), "repeat": args.repeat, "results": results}, f, indent=4)
+        print(f"Baseline saved to {args.save}")
+    
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than {args.tolerance:.2f}x baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+def bench_parallel(args):
+    """Per-frame detector latency and pipelined frame rate at several pool sizes"""
+    from dataclasses import replace
+    from concurrent.futures import wait
+    from detectors import DetectorCascade, TickContext
+    from main import FishbotConfig, VisualDetector
+    
+    cv2.setNumThreads(args.threads)
+    print(f"All visual detectors on every frame, {os.cpu_count()} CPUs, {args.threads} OpenCV thread(s)")
+    print(f"{'size':>10} {'workers':>8} {'decide p50':>11} {'decide p95':>11} {'frame p50':>10} {'speedup':>8}")
+    for width, height in ROI_SIZES:
+        area = (0, 0, width, height)
+        # No cascading: the HSV splash check runs on every frame, as on a tick where a cheap stage trips
+        config = replace(FishbotConfig(bobber_detection_area=area), enable_sound_detection=False, cascade=False,
+                         cascade_confidence=1.0)
+        inline = None
+        for workers in args.workers:
+            source = SyntheticFrameSource(seed=args.seed, screen_size=(width, height),
+                                          bobber_position=(width // 2, height // 2), splash_every=0)
+            visual = VisualDetector(config, frame_source=source)
+            cascade = DetectorCascade.from_config(replace(config, detector_workers=workers))
+            context = TickContext(config, visual, None)
+            prefetched = []
+            
+            def overlap(futures):
+                # Back-to-back polling: the next capture always overlaps the detectors
+                prefetched.append(visual.capture_frame(area))
+                wait(futures)
+            
+            detect = np.empty(args.repeat)
+            frame_times = np.empty(args.repeat)
+            for i in range(args.warmup + args.repeat):
+                start = time.perf_counter()
+                frame = prefetched.pop() if prefetched else visual.capture_frame(area)
+                visual.prepare_frame(frame)
+                context.frame = frame
+                detect_start = time.perf_counter()
+                cascade.evaluate(context, overlap if cascade.parallel else None)
+                end = time.perf_counter()
+                context.previous_frame = frame
+                if i >= args.warmup:
+                    detect[i - args.warmup] = (end - detect_start) * 1000
+                    frame_times[i - args.warmup] = (end - start) * 1000
+            cascade.close()
+            
+            p50 = np.percentile(frame_times, 50)
+            inline = inline or p50
+            print(f"{f'{width}x{height}':>10} {workers:>8} {np.percentile(detect, 50):11.3f} "
+                  f"{np.percentile(detect, 95):11.3f} {p50:10.3f} {inline / p50:7.2f}x")
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Fishbot detection benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    
+    bobber = subparsers.add_parser('bobber', help="single-scale vs pyramid bobber matching")
+    bobber.add_argument('--width', type=int, default=800)
+    bobber.add_argument('--height', type=int, default=600)
+    bobber.add_argument('--trials', type=int, default=20)
+    bobber.add_argument('--repeat', type=int, default=5)
+    bobber.add_argument('--levels', type=int, default=2)
+    bobber.add_argument('--scales', type=float, nargs='+', default=[0.8, 0.9, 1.0, 1.1, 1.25])
+    bobber.add_argument('--tolerance', type=float, default=4.0, help="max centre error counted as a hit (px)")
+    bobber.add_argument('--seed', type=int, default=0)
+    bobber.set_defaults(run=bench_bobber)
+    
+    audio = subparsers.add_parser('audio', help="cost and selectivity of the audio splash detectors")
+    audio.add_argument('--chunks', type=int, default=2000)
+    audio.add_argument('--batch', type=int, default=4, help="chunks processed per poll")
+    audio.add_argument('--seed', type=int, default=0)
+    audio.set_defaults(run=bench_audio)
+    
+    suite = subparsers.add_parser('suite', help="latency and allocations of every detection hot path")
+    suite.add_argument('--repeat', type=int, default=50)
+    suite.add_argument('--warmup', type=int, default=5)
+    suite.add_argument('--threads', type=int, default=1, help="OpenCV threads (1 for stable numbers)")
+    suite.add_argument('--save', help="write the results as a baseline JSON file")
+    suite.add_argument('--baseline', help="compare against a saved baseline and fail on regressions")
+    suite.add_argument('--tolerance', type=float, default=1.25, help="allowed p50 slowdown vs the baseline")
+    suite.add_argument('--seed', type=int, default=0)
+    suite.set_defaults(run=bench_suite)
+    
+    parallel = subparsers.add_parser('parallel', help="detectors on a thread pool vs inline")
+    parallel.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4],
+                          help="pool sizes to compare (0 runs the detectors inline)")
+    parallel.add_argument('--repeat', type=int, default=100)
+    parallel.add_argument('--warmup', type=int, default=10)
+    parallel.add_argument('--threads', type=int, default=1, help="OpenCV threads per call")
+    parallel.add_argument('--seed', type=int, default=0)
+    parallel.set_defaults(run=bench_parallel)
+    
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Offline threshold calibration from recorded sessions.
+Each session is read once, in its own worker process, and every detector
+metric is computed once per frame or audio frame: splash pixel counts for a
+whole grid of HSV bounds (from one saturation/value histogram), the motion
+ratio, the bobber match score, chunk RMS, the spectral band ratios and the
+matched-filter correlation. Every threshold grid is then evaluated against
+the recorded bites with vectorised numpy: a running maximum over each cast
+gives the first crossing of all thresholds at once, so nothing is re-run per
+grid point.
+
+The best value of each detector (highest F1, then shortest median delay,
+then the most conservative threshold) is written into the config file.
+
+    python calibration.py recordings datasets/scenes-01
+    python calibration.py recordings --config fishbot_config.json --output calibrated.json
+"""
+
+import argparse
+import json
+import os
+import time
+import warnings
+import logging
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from audio_detectors import MatchedFilterDetector, SpectralSplashDetector, load_sound_templates
+from audio_features import rms
+from detection_engine import DetectionEngine
+from evaluation import expand_sessions
+from main import FishbotConfig, setup_logging
+from recording import Session
+from template_matching import TemplateBank
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CalibrationGrid:
+    """Threshold values to sweep"""
+    splash_ratio: Sequence[float] = tuple(np.round(np.geomspace(0.001, 0.1, 25), 5))
+    splash_saturation: Sequence[int] = (20, 30, 45, 60)
+    splash_value: Sequence[int] = (170, 185, 200, 215, 230)
+    motion: Sequence[float] = tuple(np.round(np.geomspace(0.005, 0.3, 25), 5))
+    bobber_confidence: Sequence[float] = tuple(np.round(np.linspace(0.5, 0.95, 10), 3))
+    volume: Sequence[float] = tuple(np.round(np.geomspace(300, 20000, 25)))
+    onset_ratio: Sequence[float] = tuple(np.round(np.geomspace(2, 50, 20), 2))
+    selectivity: Sequence[float] = (1.0, 1.5, 2.0, 3.0, 4.0)
+    matched: Sequence[float] = tuple(np.round(np.linspace(0.2, 0.9, 15), 3))
+
+@dataclass
+class SessionSweep:
+    """First detection of every grid point in every cast of one session (seconds after the cast)"""
+    path: str
+    bites: np.ndarray
+    detections: Dict[str, np.ndarray] = field(default_factory=dict)
+    bobber_scores: Optional[np.ndarray] = None
+    bobber_present: Optional[np.ndarray] = None
+
+def first_crossings(times: np.ndarray, values: np.ndarray, thresholds: Sequence[float],
+                    casts: List[Dict[str, Any]], inclusive: bool = False) -> np.ndarray:
+    """Time of the first sample above each threshold within each cast
+    
+    `values` is (samples, *params); the result is (casts, *params, thresholds)
+    in seconds after the cast start, NaN where nothing crossed.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    result = np.full((len(casts),) + values.shape[1:] + thresholds.shape, np.nan)
+    for number, cast in enumerate(casts):
+        first, last = np.searchsorted(times, [cast["start"], cast["end"]])
+        if last <= first:
+            continue
+        peak = np.maximum.accumulate(values[first:last], axis=0)[..., None]
+        exceeded = peak >= thresholds if inclusive else peak > thresholds
+        index = exceeded.argmax(axis=0)
+        result[number] = np.where(exceeded[-1], times[first + index] - cast["start"], np.nan)
+    return result
+
+def frame_metrics(session: Session, config: FishbotConfig, grid: CalibrationGrid,
+                  bank: Optional[TemplateBank]) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """Per-frame splash ratios over the baseline (frames, saturations, values), motion ratio and bobber score
+    
+    Frames are split into full-area and bobber-window frames the way
+    BiteWatch grabbed them. A full-area frame followed by a window frame was
+    only grabbed to locate the bobber and is never checked, so its splash and
+    motion stay 0. The first frame of each bobber window sets the splash
+    baseline its later frames are measured against; full-area frames have none.
+    """
+    engine = DetectionEngine()
+    saturation = np.asarray(grid.splash_saturation)
+    value = np.asarray(grid.splash_value)
+    splash = np.zeros((session.frame_count, len(saturation), len(value)), dtype=np.float32)
+    motion = np.zeros(session.frame_count, dtype=np.float32)
+    scores = np.full(session.frame_count, np.nan, dtype=np.float32) if bank is not None else None
+    records = session.frame_index
+    areas = list(zip(records['x'].tolist(), records['y'].tolist(), records['width'].tolist(),
+                     records['height'].tolist()))
+    full_area = tuple(config.bobber_detection_area)
+    baseline = np.zeros((len(saturation), len(value)), dtype=np.float32)
+    previous = None
+    for index in range(session.frame_count):
+        frame = session.frame(index)
+        engine.prepare(frame)
+        # Pixels with S <= s and V >= v for every grid pair, from one 2-D histogram
+        hist = cv2.calcHist([frame.hsv], [1, 2], None, [256, 256], [0, 256, 0, 256])
+        counts = hist.cumsum(axis=0)[:, ::-1].cumsum(axis=1)[:, ::-1]
+        ratios = counts[np.ix_(saturation, value)] / (frame.shape[0] * frame.shape[1])
+        area = areas[index]
+        if area == full_area:
+            baseline[...] = 0.0
+            locating = index + 1 < len(areas) and areas[index + 1] != full_area
+        else:
+            if index == 0 or areas[index - 1] != area:
+                baseline[...] = ratios
+            locating = False
+        if not locating:
+            splash[index] = ratios - baseline
+            motion[index] = engine.motion_ratio(previous, frame)
+        if bank is not None:
+            match = bank.match(frame)
+            if match is not None:
+                scores[index] = match.score
+        previous = frame
+    return splash, motion, scores
+
+def audio_metrics(session: Session, config: FishbotConfig, grid: CalibrationGrid,
+                  block: int = 256) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Per-chunk RMS, per-analysis-frame spectral ratios and per-chunk matched-filter scores with their times"""
+    metrics: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    if session.audio_count == 0:
+        return metrics
+    chunks, times = session.audio_between(-np.inf, np.inf)
+    metrics['rms'] = (times, np.concatenate([rms(chunks[i:i + block]) for i in range(0, len(chunks), block)]))
+    
+    spectral = SpectralSplashDetector(session.sample_rate, config.splash_bands)
+    selectivity = np.asarray(grid.selectivity)
+    ratios = []
+    for i in range(0, len(chunks), block):
+        ratio, energy = spectral.floor_ratio(spectral.frames(chunks[i:i + block]))
+        band, outside = ratio[:, :-1], ratio[:, -1:]
+        # Best band ratio among bands that are selective enough, for each selectivity
+        loud = energy[:, :-1] >= spectral.min_energy
+        qualifies = loud[:, :, None] & (band[:, :, None] >= outside[:, :, None] * selectivity)
+        ratios.append(np.where(qualifies, band[:, :, None], 0.0).max(axis=1))
+    ratios = np.concatenate(ratios)
+    # Analysis frame k ends at sample k * hop + window; stamp it with its chunk's time
+    ends = np.arange(len(ratios)) * spectral.hop + spectral.window_size - 1
+    metrics['spectral'] = (times[np.minimum(ends // session.chunk_size, len(times) - 1)], ratios)
+    
+    names, clips = load_sound_templates(config.sound_template_dir, session.sample_rate)
+    if clips:
+        matched = MatchedFilterDetector(clips, block_size=session.chunk_size, names=names)
+        scores = np.concatenate([matched.process(chunks[i:i + block]).score for i in range(0, len(chunks), block)])
+        metrics['matched'] = (times[:len(scores)], scores)
+    return metrics
+
+def sweep_session(path: str, config: FishbotConfig, grid: CalibrationGrid) -> SessionSweep:
+    """Worker: measure one session once and find every grid point's detections"""
+    session = Session(path)
+    casts = session.casts()
+    bites = np.array([np.nan if cast["bite"] is None else cast["bite"] - cast["start"] for cast in casts])
+    sweep = SessionSweep(path, bites)
+    
+    bank = TemplateBank('templates', scales=config.template_scales, levels=config.pyramid_levels,
+                        confidence=np.inf, exclude=('splash',))
+    bank.refresh(force=True)
+    splash, motion, scores = frame_metrics(session, config, grid, bank if len(bank) else None)
+    frame_times = np.asarray(session.frame_times)
+    sweep.detections['splash'] = first_crossings(frame_times, splash, grid.splash_ratio, casts)
+    sweep.detections['motion'] = first_crossings(frame_times, motion, grid.motion, casts)
+    
+    labels_path = os.path.join(path, 'labels.jsonl')
+    if scores is not None and os.path.exists(labels_path):
+        from scene_generator import load_labels
+        present = []
+        for label, index in zip(load_labels(path), range(session.frame_count)):
+            x, y, w, h = session.frame(index).area
+            present.append(label.bobber is not None and x <= label.bobber[0] < x + w and y <= label.bobber[1] < y + h)
+        sweep.bobber_scores = scores[:len(present)]
+        sweep.bobber_present = np.array(present)
+    
+    for name, (times, values) in audio_metrics(session, config, grid).items():
+        thresholds = {'rms': grid.volume, 'spectral': grid.onset_ratio, 'matched': grid.matched}[name]
+        sweep.detections[name] = first_crossings(np.asarray(times), values, thresholds, casts,
+                                                 inclusive=name != 'rms')
+    return sweep
+
+def score_grid(detections: np.ndarray, bites: np.ndarray, early: float = 0.1) -> Dict[str, np.ndarray]:
+    """Precision, recall, F1 and median delay for every grid point (arrays over the grid)"""
+    bites = bites.reshape((-1,) + (1,) * (detections.ndim - 1))
+    detected = ~np.isnan(detections)
+    has_bite = ~np.isnan(bites)
+    with np.errstate(invalid='ignore'):
+        tp = detected & has_bite & (detections >= bites - early)
+    fp = (detected & ~tp).sum(axis=0)
+    fn = (has_bite & ~detected).sum(axis=0)
+    tp_count = tp.sum(axis=0)
+    precision = np.divide(tp_count, tp_count + fp, out=np.zeros(tp_count.shape), where=tp_count + fp > 0)
+    recall = np.divide(tp_count, tp_count + fn, out=np.zeros(tp_count.shape), where=tp_count + fn > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(tp_count.shape),
+                   where=precision + recall > 0)
+    delays = np.where(tp, detections - bites, np.nan)
+    with warnings.catch_warnings():
+        # Grid points without a true positive have no delay
+        warnings.simplefilter('ignore', RuntimeWarning)
+        delay = np.nanmedian(delays, axis=0)
+    return {"tp": tp_count, "fp": fp, "fn": fn, "precision": precision, "recall": recall, "f1": f1, "delay": delay}
+
+def best_point(scores: Dict[str, np.ndarray], delay_resolution: float = 0.05) -> Tuple[int, ...]:
+    """Grid index with the highest F1, then the shortest median delay
+    
+    Delays within `delay_resolution` of each other count as equal, and the
+    remaining ties go to the highest (most conservative) thresholds.
+    """
+    f1 = scores["f1"].ravel()
+    delay = np.round(np.nan_to_num(scores["delay"].ravel(), nan=np.inf) / delay_resolution)
+    order = np.lexsort((-np.arange(len(f1)), delay, -f1))
+    return np.unravel_index(order[0], scores["f1"].shape)
+
+def best_confidence(scores: np.ndarray, present: np.ndarray, thresholds: Sequence[float]) -> Tuple[float, float]:
+    """Bobber confidence with the best F1 at telling frames with the bobber from frames without"""
+    found = np.nan_to_num(scores, nan=-1.0)[:, None] > np.asarray(thresholds)
+    tp = (found & present[:, None]).sum(axis=0)
+    fp = (found & ~present[:, None]).sum(axis=0)
+    fn = (~found & present[:, None]).sum(axis=0)
+    f1 = np.divide(2 * tp, 2 * tp + fp + fn, out=np.zeros(len(tp)), where=2 * tp + fp + fn > 0)
+    index = int(np.argmax(f1))
+    return float(thresholds[index]), float(f1[index])
+
+def calibrate(sessions: Sequence[str], config: FishbotConfig, grid: CalibrationGrid,
+              workers: Optional[int] = None, early: float = 0.1) -> Tuple[Dict[str, Any], List[str]]:
+    """Sweep all sessions (one per worker process); returns (calibrated fields, report lines)"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        sweeps = list(pool.map(sweep_session, sessions, [config] * len(sessions), [grid] * len(sessions)))
+    
+    bites = np.concatenate([sweep.bites for sweep in sweeps])
+    updates: Dict[str, Any] = {}
+    report = [f"{len(sessions)} sessions, {len(bites)} casts, {int((~np.isnan(bites)).sum())} bites"]
+    if np.isnan(bites).all():
+        report.append("No recorded bites to calibrate against")
+        return updates, report
+    
+    for name in ('splash', 'motion', 'rms', 'spectral', 'matched'):
+        # Audio metrics only exist for sessions that recorded audio
+        measured = [sweep for sweep in sweeps if name in sweep.detections]
+        if not measured:
+            continue
+        detections = np.concatenate([sweep.detections[name] for sweep in measured])
+        scores = score_grid(detections, np.concatenate([sweep.bites for sweep in measured]), early)
+        index = best_point(scores)
+        if name == 'splash':
+            s, v, r = index
+            updates.update(splash_ratio_threshold=float(grid.splash_ratio[r]),
+                           splash_hsv_lower=(0, 0, int(grid.splash_value[v])),
+                           splash_hsv_upper=(180, int(grid.splash_saturation[s]), 255))
+            chosen = (f"ratio > {grid.splash_ratio[r]}, S <= {grid.splash_saturation[s]}, "
+                      f"V >= {grid.splash_value[v]}")
+        elif name == 'motion':
+            updates['motion_threshold'] = float(grid.motion[index[0]])
+            chosen = f"ratio > {grid.motion[index[0]]}"
+        elif name == 'rms':
+            updates['volume_threshold'] = float(grid.volume[index[0]])
+            chosen = f"volume > {grid.volume[index[0]]:.0f}"
+        elif name == 'spectral':
+            s, r = index
+            updates.update(splash_selectivity=float(grid.selectivity[s]),
+                           splash_onset_ratio=float(grid.onset_ratio[r]))
+            chosen = f"onset >= {grid.onset_ratio[r]}, selectivity {grid.selectivity[s]}"
+        else:
+            updates['matched_filter_threshold'] = float(grid.matched[index[0]])
+            chosen = f"correlation >= {grid.matched[index[0]]}"
+        delay = scores["delay"][index]
+        report.append(f"{name:<9} {chosen:<45} precision {scores['precision'][index]:.2f} "
+                      f"recall {scores['recall'][index]:.2f} fp {int(scores['fp'][index])} "
+                      f"fn {int(scores['fn'][index])} median delay "
+                      f"{'-' if np.isnan(delay) else f'{delay * 1000:.0f} ms'}")
+    
+    labelled = [sweep for sweep in sweeps if sweep.bobber_scores is not None]
+    if labelled:
+        confidence, f1 = best_confidence(np.concatenate([sweep.bobber_scores for sweep in labelled]),
+                                         np.concatenate([sweep.bobber_present for sweep in labelled]),
+                                         grid.bobber_confidence)
+        updates['bobber_confidence'] = confidence
+        report.append(f"{'bobber':<9} {f'score > {confidence}':<45} F1 {f1:.2f} on labelled frames")
+    return updates, report
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Calibrate Fishbot detector thresholds on recorded sessions")
+    parser.add_argument('sessions', nargs='+', help="session directories (or directories of sessions)")
+    parser.add_argument('--config', default='fishbot_config.json', help="config to start from, if it exists")
+    parser.add_argument('--output', help="where to write the calibrated config (default: --config)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--early', type=float, default=0.1,
+                        help="seconds before the recorded bite a detection still counts as correct")
+    parser.add_argument('--dry-run', action='store_true', help="report only, do not write the config")
+    args = parser.parse_args()
+    setup_logging()
+    
+    sessions = expand_sessions(args.sessions)
+    if not sessions:
+        parser.error("no sessions found")
+    config = FishbotConfig()
+    if os.path.exists(args.config):
+        with open(args.config, 'r') as f:
+            config = FishbotConfig(**json.load(f))
+    
+    start = time.perf_counter()
+    updates, report = calibrate(sessions, config, CalibrationGrid(), args.workers, args.early)
+    for line in report:
+        print(line)
+    print(f"Calibrated in {time.perf_counter() - start:.1f} s")
+    
+    if updates and not args.dry_run:
+        output = args.output or args.config
+        values = asdict(config)
+        values.update(updates)
+        with open(output, 'w') as f:
+            json.dump(values, f, indent=4)
+        print(f"Wrote {', '.join(updates)} to {output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,446 @@
+"""
+Frame capture helpers for the Fishbot detectors.
+A Frame is captured once per polling tick and shared by every detector, so
+colour conversions and downsampled copies are computed at most once.
+
+Frames come from a FrameSource. The X11 shared-memory source writes into
+persistent buffers and hands out numpy views of them; file and synthetic
+sources let the detectors run without a display.
+"""
+
+import cv2
+import numpy as np
+import os
+import sys
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Area = Tuple[int, int, int, int]
+
+class Frame:
+    """A single BGR (or BGRA) capture with lazily computed derived planes"""
+    
+    def __init__(self, image: np.ndarray, area: Optional[Area] = None,
+                 timestamp: Optional[float] = None):
+        self.image = image
+        self.area = area
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self._gray = None
+        self._hsv = None
+        self._gray_buffer = None
+        self._hsv_buffer = None
+        self._pyramid: Dict[int, np.ndarray] = {}
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Shape of the underlying BGR image"""
+        return self.image.shape
+    
+    def use_buffers(self, gray: Optional[np.ndarray] = None, hsv: Optional[np.ndarray] = None):
+        """Have lazily computed planes written into caller-owned buffers"""
+        self._gray_buffer = gray
+        self._hsv_buffer = hsv
+    
+    @property
+    def buffers_bound(self) -> bool:
+        """Whether derived planes are written into caller-owned buffers"""
+        return self._gray_buffer is not None
+    
+    @property
+    def bgr(self) -> np.ndarray:
+        """BGR view of the image (drops the alpha/pad channel without copying)"""
+        if self.image.ndim == 3 and self.image.shape[2] == 4:
+            return self.image[:, :, :3]
+        return self.image
+    
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale plane, converted on first access"""
+        if self._gray is None:
+            if self.image.ndim == 2:
+                self._gray = self.image
+            elif self.image.shape[2] == 4:
+                self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGRA2GRAY, dst=self._gray_buffer)
+            else:
+                self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY, dst=self._gray_buffer)
+        return self._gray
+    
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV plane, converted on first access"""
+        if self._hsv is None:
+            # BGR2HSV reads the first three channels of a BGRA image directly
+            self._hsv = cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV, dst=self._hsv_buffer)
+        return self._hsv
+    
+    def downsampled(self, level: int = 1) -> np.ndarray:
+        """Grayscale plane halved `level` times with cv2.pyrDown"""
+        if level <= 0:
+            return self.gray
+        if level not in self._pyramid:
+            self._pyramid[level] = cv2.pyrDown(self.downsampled(level - 1))
+        return self._pyramid[level]
+
+class FrameSource:
+    """Base class for anything that produces Frames of a screen area
+    
+    Sources may reuse their pixel buffers. A returned Frame stays valid until
+    the second following grab() call, which is enough for the bot to diff
+    the previous and current frame.
+    """
+    
+    def grab(self, area: Area) -> Frame:
+        """Capture the given (x, y, w, h) area"""
+        raise NotImplementedError
+    
+    def close(self):
+        """Release any resources held by the source"""
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class PyAutoGUIFrameSource(FrameSource):
+    """Portable capture through pyautogui, converted into a persistent buffer"""
+    
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+        self._buffers: List[np.ndarray] = []
+        self._index = 0
+    
+    def grab(self, area: Area) -> Frame:
+        x, y, w, h = area
+        screenshot = self._pyautogui.screenshot(region=(x, y, w, h))
+        rgb = np.asarray(screenshot)
+        
+        if not self._buffers or self._buffers[0].shape != rgb.shape:
+            self._buffers = [np.empty_like(rgb), np.empty_like(rgb)]
+        self._index ^= 1
+        buffer = self._buffers[self._index]
+        
+        cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=buffer)
+        return Frame(buffer, area)
+
+class XShmFrameSource(FrameSource):
+    """Linux X11 capture via the MIT-SHM extension
+    
+    The X server copies the requested area straight into shared memory that
+    stays mapped for the lifetime of the source. Frames are BGRA views of
+    that memory, so no conversion or copy happens on the Python side.
+    """
+    
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+    ZPIXMAP = 2
+    ALL_PLANES = 0xFFFFFFFFFFFFFFFF
+    
+    def __init__(self, display: Optional[str] = None, buffers: int = 2):
+        import ctypes
+        import ctypes.util
+        
+        self._ctypes = ctypes
+        x11_path = ctypes.util.find_library('X11')
+        xext_path = ctypes.util.find_library('Xext')
+        if not x11_path or not xext_path:
+            raise OSError("libX11/libXext not found")
+        
+        self._x11 = ctypes.CDLL(x11_path)
+        self._xext = ctypes.CDLL(xext_path)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._declare_functions()
+        
+        self._display = self._x11.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            raise OSError("Cannot open X display")
+        if not self._xext.XShmQueryExtension(self._display):
+            self._x11.XCloseDisplay(self._display)
+            self._display = None
+            raise OSError("X server does not support MIT-SHM")
+        
+        screen = self._x11.XDefaultScreen(self._display)
+        self._root = self._x11.XRootWindow(self._display, screen)
+        self._visual = self._x11.XDefaultVisual(self._display, screen)
+        self._depth = self._x11.XDefaultDepth(self._display, screen)
+        
+        self._buffer_count = max(1, buffers)
+        self._segments = []
+        self._size = None
+        self._index = 0
+    
+    def _declare_functions(self):
+        """Set ctypes signatures for the Xlib/XShm/SysV calls we use"""
+        ctypes = self._ctypes
+        
+        class XShmSegmentInfo(ctypes.Structure):
+            _fields_ = [('shmseg', ctypes.c_ulong), ('shmid', ctypes.c_int),
+                        ('shmaddr', ctypes.c_void_p), ('readOnly', ctypes.c_int)]
+        
+        class XImage(ctypes.Structure):
+            # Leading fields of Xlib's XImage; the rest is never touched
+            _fields_ = [('width', ctypes.c_int), ('height', ctypes.c_int),
+                        ('xoffset', ctypes.c_int), ('format', ctypes.c_int),
+                        ('data', ctypes.c_void_p), ('byte_order', ctypes.c_int),
+                        ('bitmap_unit', ctypes.c_int), ('bitmap_bit_order', ctypes.c_int),
+                        ('bitmap_pad', ctypes.c_int), ('depth', ctypes.c_int),
+                        ('bytes_per_line', ctypes.c_int), ('bits_per_pixel', ctypes.c_int)]
+        
+        self._XShmSegmentInfo = XShmSegmentInfo
+        self._XImage = XImage
+        x11, xext, libc = self._x11, self._xext, self._libc
+        
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+    
+    def _create_segment(self, w: int, h: int):
+        """Create one shared-memory XImage and its numpy BGRA view"""
+        ctypes = self._ctypes
+        info = self._XShmSegmentInfo()
+        image = self._xext.XShmCreateImage(self._display, self._visual, self._depth, self.ZPIXMAP,
+                                           None, ctypes.byref(info), w, h)
+        if not image:
+            raise OSError("XShmCreateImage failed")
+        if image.contents.bits_per_pixel != 32:
+            self._x11.XFree(image)
+            raise OSError(f"Unsupported pixel depth: {image.contents.bits_per_pixel} bpp")
+        
+        stride = image.contents.bytes_per_line
+        size = stride * h
+        info.shmid = self._libc.shmget(self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+        if info.shmid < 0:
+            self._x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        
+        address = self._libc.shmat(info.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            self._libc.shmctl(info.shmid, self.IPC_RMID, None)
+            self._x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        
+        info.shmaddr = address
+        info.readOnly = 0
+        image.contents.data = address
+        self._xext.XShmAttach(self._display, ctypes.byref(info))
+        self._x11.XSync(self._display, 0)
+        # Mark for removal now so the segment is freed even if we crash
+        self._libc.shmctl(info.shmid, self.IPC_RMID, None)
+        
+        raw = (ctypes.c_ubyte * size).from_address(address)
+        view = np.ctypeslib.as_array(raw).reshape(h, stride)[:, :w * 4].reshape(h, w, 4)
+        return info, image, view
+    
+    def _release_segments(self):
+        """Detach and free all shared-memory images"""
+        ctypes = self._ctypes
+        for info, image, _ in self._segments:
+            self._xext.XShmDetach(self._display, ctypes.byref(info))
+            self._x11.XFree(image)
+            self._libc.shmdt(info.shmaddr)
+        self._segments = []
+        self._size = None
+    
+    def grab(self, area: Area) -> Frame:
+        x, y, w, h = area
+        if self._size != (w, h):
+            self._release_segments()
+            self._segments = [self._create_segment(w, h) for _ in range(self._buffer_count)]
+            self._size = (w, h)
+        
+        self._index = (self._index + 1) % len(self._segments)
+        _, image, view = self._segments[self._index]
+        if not self._xext.XShmGetImage(self._display, self._root, image, x, y, self.ALL_PLANES):
+            raise OSError(f"XShmGetImage failed for area {area}")
+        return Frame(view, area)
+    
+    def close(self):
+        if self._display:
+            self._release_segments()
+            self._x11.XCloseDisplay(self._display)
+            self._display = None
+
+class FileFrameSource(FrameSource):
+    """Replays an image, a directory of images, or a video file as frames
+    
+    An image the size of the requested area is taken to be a pre-cropped
+    capture and returned whole. A larger image is a screenshot and is
+    cropped to the area (as a view); an area that does not fit raises.
+    """
+    
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+    
+    def __init__(self, path: str, loop: bool = True):
+        self.path = path
+        self.loop = loop
+        self._images: List[np.ndarray] = []
+        self._video = None
+        self._video_frames: List[Optional[np.ndarray]] = [None, None]
+        self._index = -1
+        
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path)
+                           if name.lower().endswith(self.IMAGE_EXTENSIONS))
+            self._images = [cv2.imread(os.path.join(path, name)) for name in names]
+        elif path.lower().endswith(self.IMAGE_EXTENSIONS):
+            self._images = [cv2.imread(path)]
+        else:
+            self._video = cv2.VideoCapture(path)
+            if not self._video.isOpened():
+                raise IOError(f"Cannot open video: {path}")
+        
+        self._images = [image for image in self._images if image is not None]
+        if self._video is None and not self._images:
+            raise IOError(f"No readable images at: {path}")
+    
+    def _next_image(self) -> np.ndarray:
+        """Advance to the next image or video frame"""
+        if self._video is None:
+            self._index += 1
+            if self._index >= len(self._images):
+                if not self.loop:
+                    raise EOFError("End of frame files")
+                self._index = 0
+            return self._images[self._index]
+        
+        # Decode into alternate buffers, so the previous frame survives this grab
+        self._index ^= 1
+        ok, frame = self._video.read(self._video_frames[self._index])
+        if not ok and self.loop:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._video.read(self._video_frames[self._index])
+        if not ok:
+            raise EOFError("End of video")
+        self._video_frames[self._index] = frame
+        return frame
+    
+    def grab(self, area: Area) -> Frame:
+        image = self._next_image()
+        x, y, w, h = area
+        height, width = image.shape[:2]
+        if (width, height) != (w, h):
+            if x < 0 or y < 0 or x + w > width or y + h > height:
+                raise ValueError(f"Area {area} does not fit in the {width}x{height} frames of {self.path}")
+            image = image[y:y + h, x:x + w]
+        return Frame(image, area)
+    
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+class SyntheticFrameSource(FrameSource):
+    """Generates water frames with a bobbing bobber and periodic splashes
+    
+    The scene lives in screen coordinates, so grabbing a small window around
+    the bobber shows the same pixels as the full detection area. Everything
+    is drawn into two preallocated buffers that are reused on alternate grabs.
+    """
+    
+    def __init__(self, seed: int = 0, screen_size: Tuple[int, int] = (1920, 1080),
+                 bobber_position: Optional[Tuple[int, int]] = None, bobber_radius: int = 10,
+                 splash_every: int = 0, splash_duration: int = 3):
+        self.seed = seed
+        self.screen_size = screen_size
+        self.bobber_position = bobber_position or (screen_size[0] // 2, screen_size[1] // 2)
+        self.bobber_radius = bobber_radius
+        self.splash_every = splash_every
+        self.splash_duration = splash_duration
+        self.tick = 0
+        self._water = None
+        self._buffers: List[np.ndarray] = []
+        self._index = 0
+    
+    def _render_water(self):
+        """Render the static full-screen water texture once"""
+        w, h = self.screen_size
+        rng = np.random.default_rng(self.seed)
+        water = np.empty((h, w, 3), dtype=np.int16)
+        water[:, :, 0] = 120
+        water[:, :, 1] = 80
+        water[:, :, 2] = 30
+        water += rng.integers(-12, 13, size=(h, w, 1), dtype=np.int16)
+        self._water = np.clip(water, 0, 255).astype(np.uint8)
+    
+    def splash_active(self) -> bool:
+        """Whether the current tick falls inside a scripted splash"""
+        if self.splash_every <= 0:
+            return False
+        return self.tick % self.splash_every < self.splash_duration and self.tick >= self.splash_every
+    
+    def grab(self, area: Area) -> Frame:
+        x, y, w, h = area
+        if self._water is None:
+            self._render_water()
+        if not self._buffers or self._buffers[0].shape[:2] != (h, w):
+            self._buffers = [np.empty((h, w, 3), np.uint8) for _ in range(2)]
+        
+        self.tick += 1
+        self._index ^= 1
+        buffer = self._buffers[self._index]
+        np.copyto(buffer, self._water[y:y + h, x:x + w])
+        
+        cx = self.bobber_position[0] - x
+        cy = self.bobber_position[1] - y + int(round(2 * np.sin(self.tick * 0.5)))
+        radius = self.bobber_radius
+        cv2.circle(buffer, (cx, cy), radius, (40, 40, 200), -1)
+        cv2.circle(buffer, (cx, cy - radius), max(1, radius // 2), (230, 230, 230), -1)
+        
+        if self.splash_active():
+            cv2.circle(buffer, (cx, cy), radius * 4, (250, 250, 250), -1)
+        return Frame(buffer, area)
+
+def create_frame_source(backend: str = 'auto', path: Optional[str] = None, **kwargs) -> FrameSource:
+    """Create a frame source by name: auto, xshm, pyautogui, file or synthetic
+    
+    The file backend replays `path` (an image, a directory of images or a video).
+    """
+    if backend == 'file':
+        if not path:
+            raise ValueError("The file capture backend needs a path to replay")
+        return FileFrameSource(path, **kwargs)
+    if backend == 'synthetic':
+        return SyntheticFrameSource(**kwargs)
+    if backend == 'pyautogui':
+        return PyAutoGUIFrameSource()
+    if backend == 'xshm':
+        return XShmFrameSource(**kwargs)
+    if backend != 'auto':
+        raise ValueError(f"Unknown capture backend: {backend}")
+    
+    if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+        try:
+            return XShmFrameSource(**kwargs)
+        except Exception as e:
+            logger.warning(f"X11 shared-memory capture unavailable ({e}), falling back to pyautogui")
+    return PyAutoGUIFrameSource()
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Allocation-free detection kernels for the Fishbot visual detectors.
+The engine owns every intermediate buffer the splash and motion checks
+need, sized to the detection area, and hands them to OpenCV as dst=
+arguments. Once warmed up, polling does not allocate any pixel buffers.
+"""
+
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from capture import Frame
+
+class _PlaneBuffers:
+    """Working buffers for one detection area size"""
+    
+    def __init__(self, height: int, width: int):
+        self.gray = [np.empty((height, width), np.uint8) for _ in range(2)]
+        self.hsv = [np.empty((height, width, 3), np.uint8) for _ in range(2)]
+        self.mask = np.empty((height, width), np.uint8)
+        # Separate from `mask` so the highlight and splash checks can run in parallel
+        self.highlight = np.empty((height, width), np.uint8)
+        self.diff = np.empty((height, width), np.uint8)
+        self.index = 0
+
+class DetectionEngine:
+    """Splash and motion kernels over preallocated, double-buffered planes
+    
+    Buffers are kept per area size, so switching between the full detection
+    area and a bobber window does not reallocate anything.
+    """
+    
+    def __init__(self, lower_splash: Tuple[int, int, int] = (0, 0, 200),
+                 upper_splash: Tuple[int, int, int] = (180, 30, 255),
+                 motion_pixel_threshold: int = 30):
+        self.set_splash_range(lower_splash, upper_splash)
+        self.motion_pixel_threshold = motion_pixel_threshold
+        self._buffers: Dict[Tuple[int, int], _PlaneBuffers] = {}
+    
+    def set_splash_range(self, lower: Tuple[int, int, int], upper: Tuple[int, int, int]):
+        """Change the HSV range counted as splash"""
+        self.lower_splash = np.array(lower, dtype=np.uint8)
+        self.upper_splash = np.array(upper, dtype=np.uint8)
+        # Lowest gray value of a pixel in the range: min(B, G, R) >= V * (1 - S / 255),
+        # and gray is a weighted mean of B, G and R (one level of slack for rounding)
+        self.highlight_floor = max(int(lower[2] * (255 - upper[1]) / 255) - 1, 0)
+    
+    def _buffers_for(self, frame: Frame) -> _PlaneBuffers:
+        """Working buffers matching the frame size, allocated on first use"""
+        shape = frame.shape[:2]
+        buffers = self._buffers.get(shape)
+        if buffers is None:
+            buffers = self._buffers[shape] = _PlaneBuffers(*shape)
+        return buffers
+    
+    def prepare(self, frame: Frame):
+        """Bind the next pair of plane buffers to a freshly captured frame
+        
+        Buffers alternate between frames, so the previous frame's planes stay
+        intact for motion detection while the current frame is converted.
+        """
+        if frame.buffers_bound:
+            return
+        buffers = self._buffers_for(frame)
+        buffers.index ^= 1
+        frame.use_buffers(buffers.gray[buffers.index], buffers.hsv[buffers.index])
+    
+    def splash_ratio(self, frame: Frame) -> float:
+        """Fraction of pixels inside the splash HSV range"""
+        self.prepare(frame)
+        mask = cv2.inRange(frame.hsv, self.lower_splash, self.upper_splash, dst=self._buffers_for(frame).mask)
+        return cv2.countNonZero(mask) / mask.size
+    
+    def highlight_ratio(self, frame: Frame) -> float:
+        """Fraction of gray pixels bright enough to be inside the splash HSV range
+        
+        Never less than splash_ratio, and only needs the gray plane.
+        """
+        self.prepare(frame)
+        mask = self._buffers_for(frame).highlight
+        cv2.threshold(frame.gray, self.highlight_floor, 255, cv2.THRESH_BINARY, dst=mask)
+        return cv2.countNonZero(mask) / mask.size
+    
+    def motion_ratio(self, previous_frame: Optional[Frame], current_frame: Frame) -> float:
+        """Fraction of pixels whose grayscale value changed between two frames"""
+        if previous_frame is None or previous_frame.shape[:2] != current_frame.shape[:2]:
+            return 0.0
+        self.prepare(previous_frame)
+        self.prepare(current_frame)
+        
+        diff = cv2.absdiff(previous_frame.gray, current_frame.gray, dst=self._buffers_for(current_frame).diff)
+        cv2.threshold(diff, self.motion_pixel_threshold, 255, cv2.THRESH_BINARY, dst=diff)
+        return cv2.countNonZero(diff) / diff.size
\ No newline at end of file
@@ -0,0 +1,365 @@
+"""
+Bite detectors and the cost-ordered cascade that runs them.
+Every bite signal is a BiteDetector registered by name with a declared cost
+(milliseconds per tick) and confidence (how likely a firing alone is a real
+bite). FishBot and replay.py build a DetectorCascade from the names in
+`bite_detectors`, so new detectors plug in by registering themselves in a
+module listed in `detector_plugins`.
+
+The cascade runs the cheap stages (cost up to `cascade_gate_cost`) on every
+tick. The expensive stages run only on ticks where a cheap stage tripped, or
+on every tick if no cheap stage is enabled. A bite is reported once the
+combined confidence of the stages that fired, 1 - prod(1 - confidence),
+reaches `cascade_confidence`. Stages with zero confidence are pure gates:
+they can trip the expensive checks but never report a bite themselves. At
+the default of 0.6 any sound, motion or splash detection alone is a bite,
+as before the cascade; at 0.9 motion needs sound or splash to confirm it.
+With `cascade` off every stage runs on every tick. Per-stage evaluation and
+pass counts and the measured cost are kept so the order can be tuned from
+data.
+
+With `detector_workers` above zero the stages of each tier run at the same
+time on a persistent thread pool. The OpenCV kernels behind the visual
+detectors release the GIL, so a tier costs about as much as its slowest
+stage instead of the sum. Detectors must then treat the frames as
+read-only: the bot converts the shared gray plane before dispatching.
+
+BiteWatch holds the rest of a cast's bite analysis (bobber window, splash
+baseline, bobber tracking) around the cascade, so the bot, the supervisor
+and replay.py all run the same per-tick steps.
+"""
+
+import importlib
+import time
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from capture import Frame
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TickContext:
+    """What a detector may look at on one polling tick"""
+    config: Any
+    visual: Any
+    sound: Any
+    frame: Optional[Frame] = None
+    previous_frame: Optional[Frame] = None
+    splash_baseline: float = 0.0
+
+class BiteDetector:
+    """Base class for a bite signal checked once per tick"""
+    
+    name = ''
+    cost = 1.0
+    confidence = 0.5
+    needs_frame = False
+    
+    def enabled(self, config: Any) -> bool:
+        """Whether the detector should run with this configuration"""
+        return True
+    
+    def check(self, context: TickContext) -> bool:
+        raise NotImplementedError
+
+DETECTORS: Dict[str, Type[BiteDetector]] = {}
+
+def register_detector(cls: Type[BiteDetector]) -> Type[BiteDetector]:
+    """Class decorator making a detector available to `bite_detectors` by its name"""
+    DETECTORS[cls.name] = cls
+    return cls
+
+@register_detector
+class SoundStage(BiteDetector):
+    """Audio splash onset; the heavy lifting already happened as chunks arrived"""
+    
+    name = 'sound'
+    cost = 0.05
+    confidence = 0.9
+    
+    def enabled(self, config: Any) -> bool:
+        return config.enable_sound_detection
+    
+    def check(self, context: TickContext) -> bool:
+        return context.sound.sound_detected
+
+@register_detector
+class HighlightStage(BiteDetector):
+    """Bright gray pixels; a superset of the splash pixels, so it only gates the splash check"""
+    
+    name = 'highlights'
+    cost = 0.2
+    confidence = 0.0
+    needs_frame = True
+    
+    def enabled(self, config: Any) -> bool:
+        return config.enable_visual_detection
+    
+    def check(self, context: TickContext) -> bool:
+        return context.visual.detect_highlights(context.frame)
+
+@register_detector
+class MotionStage(BiteDetector):
+    """Grayscale frame difference against the previous tick"""
+    
+    name = 'motion'
+    cost = 0.4
+    confidence = 0.6
+    needs_frame = True
+    
+    def enabled(self, config: Any) -> bool:
+        return config.enable_visual_detection
+    
+    def check(self, context: TickContext) -> bool:
+        if context.previous_frame is None:
+            return False
+        return context.visual.detect_motion(context.previous_frame, context.frame)
+
+@register_detector
+class SplashStage(BiteDetector):
+    """HSV foam-pixel ratio above the bobber baseline"""
+    
+    name = 'splash'
+    cost = 1.5
+    confidence = 0.9
+    needs_frame = True
+    
+    def enabled(self, config: Any) -> bool:
+        return config.enable_visual_detection
+    
+    def check(self, context: TickContext) -> bool:
+        return context.visual.detect_splash(context.frame, context.splash_baseline)
+
+@dataclass
+class StageStats:
+    """Evaluation counts and measured cost of one cascade stage"""
+    evaluated: int = 0
+    fired: int = 0
+    seconds: float = 0.0
+    
+    @property
+    def pass_rate(self) -> float:
+        return self.fired / self.evaluated if self.evaluated else 0.0
+    
+    @property
+    def mean_ms(self) -> float:
+        return self.seconds / self.evaluated * 1000 if self.evaluated else 0.0
+
+class DetectorCascade:
+    """Runs bite detectors cheapest first, escalating to expensive ones only when needed"""
+    
+    def __init__(self, detectors: Sequence[BiteDetector], cascade: bool = True, confidence: float = 0.6,
+                 gate_cost: float = 0.5, clock: Callable[[], float] = time.perf_counter, instruments=None,
+                 workers: int = 0):
+        self.stages = sorted(detectors, key=lambda detector: detector.cost)
+        self.cascade = cascade
+        self.confidence = confidence
+        self.gate_cost = gate_cost
+        self.clock = clock
+        self.instruments = instruments
+        self.workers = workers
+        self.ticks = 0
+        self.stats: Dict[str, StageStats] = {stage.name: StageStats() for stage in self.stages}
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def parallel(self) -> bool:
+        return self.workers > 0
+    
+    @classmethod
+    def from_config(cls, config: Any, clock: Callable[[], float] = time.perf_counter,
+                    instruments=None) -> 'DetectorCascade':
+        """Build the configured detectors, importing plugin modules first"""
+        for module in config.detector_plugins:
+            importlib.import_module(module)
+        detectors = []
+        for name in config.bite_detectors:
+            if name not in DETECTORS:
+                raise ValueError(f"Unknown bite detector: {name} (registered: {', '.join(sorted(DETECTORS))})")
+            detector = DETECTORS[name]()
+            # Per-instance overrides, so the order can be tuned from the config
+            if name in config.detector_costs:
+                detector.cost = float(config.detector_costs[name])
+            if name in config.detector_confidences:
+                detector.confidence = float(config.detector_confidences[name])
+            detectors.append(detector)
+        return cls(detectors, config.cascade, config.cascade_confidence, config.cascade_gate_cost,
+                   clock, instruments, config.detector_workers)
+    
+    def close(self):
+        """Shut the worker threads down; the next parallel evaluation starts new ones"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def _run(self, stage: BiteDetector, context: TickContext) -> bool:
+        start = self.clock()
+        fired = stage.check(context)
+        elapsed = self.clock() - start
+        stats = self.stats[stage.name]
+        stats.evaluated += 1
+        stats.fired += bool(fired)
+        stats.seconds += elapsed
+        if self.instruments is not None:
+            self.instruments.record(f'detect_{stage.name}', elapsed)
+        return fired
+    
+    def evaluate(self, context: TickContext,
+                 overlap: Optional[Callable[[List[Future]], None]] = None) -> Optional[BiteDetector]:
+        """Check one tick; returns the stage that completed the bite decision, if any
+        
+        In parallel mode `overlap` is called on the calling thread with the
+        futures of the first tier while they run, e.g. to capture the next
+        frame in the meantime.
+        """
+        self.ticks += 1
+        active = [stage for stage in self.stages
+                  if stage.enabled(context.config) and (context.frame is not None or not stage.needs_frame)]
+        cheap = [stage for stage in active if stage.cost <= self.gate_cost]
+        # Without cascading, or with no cheap stage to trip, every stage runs on every tick
+        if self.cascade and cheap:
+            tiers = [cheap, [stage for stage in active if stage.cost > self.gate_cost]]
+        else:
+            tiers = [active]
+        
+        tripped = False
+        missed = 1.0
+        for number, tier in enumerate(tiers):
+            if number and not tripped:
+                break
+            if self.parallel:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='detector')
+                futures = [self._executor.submit(self._run, stage, context) for stage in tier]
+                if overlap is not None and number == 0:
+                    overlap(futures)
+                # Wait for the whole tier so no detector is still reading the frames afterwards
+                results = [future.result() for future in futures]
+            else:
+                # Lazily, so a decisive cheap stage skips the rest of the tier
+                results = (self._run(stage, context) for stage in tier)
+            for stage, fired in zip(tier, results):
+                if fired:
+                    tripped = True
+                    missed *= 1.0 - stage.confidence
+                    if 1.0 - missed >= self.confidence:
+                        return stage
+        return None
+    
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage counts, pass rate and cost, in evaluation order"""
+        return {stage.name: {
+            "cost": stage.cost,
+            "confidence": stage.confidence,
+            "evaluated": self.stats[stage.name].evaluated,
+            "skipped": self.ticks - self.stats[stage.name].evaluated,
+            "fired": self.stats[stage.name].fired,
+            "pass_rate": self.stats[stage.name].pass_rate,
+            "mean_ms": self.stats[stage.name].mean_ms,
+        } for stage in self.stages}
+
+class BiteWatch:
+    """The per-cast bite analysis: bobber window, splash baseline and one cascade check per tick
+    
+    Shared by FishBot.wait_for_bite, the supervisor and replay.py, so a
+    replayed session goes through exactly the steps the bot took live,
+    including the frames grabbed to locate and re-acquire the bobber.
+    """
+    
+    # Ticks without the bobber in the window before it is searched for again
+    REACQUIRE_AFTER = 5
+    
+    def __init__(self, config: Any, visual: Any, sound: Any, cascade: DetectorCascade, instruments=None):
+        self.config = config
+        self.visual = visual
+        self.sound = sound
+        self.cascade = cascade
+        self.instruments = instruments
+        self.context = TickContext(config, visual, sound)
+        self.analysis_area = None
+        self.previous_frame: Optional[Frame] = None
+        self.splash_baseline = 0.0
+        self.bobber_misses = 0
+    
+    def begin(self):
+        """Set up a new cast: locate the bobber, then arm sound detection"""
+        self.acquire()
+        if self.config.enable_sound_detection:
+            self.sound.start_listening()
+    
+    def acquire(self):
+        """Locate the bobber and narrow bite analysis to a window around it
+        
+        Falls back to the full detection area when adaptive ROI is disabled,
+        no bobber template is loaded, or the bobber cannot be found.
+        """
+        self.analysis_area = tuple(self.config.bobber_detection_area)
+        self.previous_frame = None
+        self.splash_baseline = 0.0
+        self.bobber_misses = 0
+        
+        if not (self.config.enable_visual_detection and self.config.adaptive_roi):
+            return
+        
+        frame = self.visual.capture_frame(self.analysis_area)
+        window = self.visual.bobber_window(frame, self.config.bobber_roi_size)
+        if window is None:
+            logger.debug("Bobber not found, analysing full detection area")
+            return
+        
+        # The bobber itself may contain splash-coloured pixels; measure them once
+        self.analysis_area = window
+        self.previous_frame = self.visual.capture_frame(window)
+        self.splash_baseline = self.visual.engine.splash_ratio(self.previous_frame)
+        logger.info(f"Bobber located, analysing window {window}")
+    
+    def roi_active(self) -> bool:
+        """Whether bite analysis is narrowed to a bobber window"""
+        return self.analysis_area is not None and self.analysis_area != tuple(self.config.bobber_detection_area)
+    
+    @property
+    def interval(self) -> float:
+        """Polling interval for the current analysis area; ROI ticks are cheap"""
+        return self.config.roi_poll_interval if self.roi_active() else self.config.poll_interval
+    
+    def track(self, frame: Frame):
+        """Re-acquire the bobber after it has been missing for several frames"""
+        if self.visual.detect_bobber(frame) is not None:
+            self.bobber_misses = 0
+            return
+        
+        self.bobber_misses += 1
+        if self.bobber_misses >= self.REACQUIRE_AFTER:
+            logger.info("Bobber lost, re-acquiring")
+            self.acquire()
+    
+    def check(self, frame: Optional[Frame],
+              overlap: Optional[Callable[[List[Future]], None]] = None) -> Optional[BiteDetector]:
+        """Run the cascade on one tick's frame (None for the non-visual detectors only)
+        
+        Returns the detector that decided on a bite. Otherwise the frame
+        becomes the previous frame and the bobber is tracked in it.
+        """
+        if frame is not None and self.cascade.parallel:
+            self.visual.prepare_frame(frame)
+        context = self.context
+        context.frame = frame
+        context.previous_frame = self.previous_frame
+        # Re-acquiring the bobber moves the window and re-measures the baseline
+        context.splash_baseline = self.splash_baseline
+        detector = self.cascade.evaluate(context, overlap)
+        context.frame = context.previous_frame = None
+        if detector is not None or frame is None:
+            return detector
+        
+        self.previous_frame = frame
+        if self.roi_active():
+            if self.instruments is not None:
+                with self.instruments.timer('track_bobber'):
+                    self.track(frame)
+            else:
+                self.track(frame)
+        return None
\ No newline at end of file
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Detection accuracy and time-to-detect evaluation for the Fishbot.
+Every cast of one or more labelled sessions (recordings, or datasets from
+scene_generator.py) is replayed through the detectors for each configuration
+under test, exactly as replay.py does. Each cast is scored against its true
+bite:
+
+    true positive   detection at or after the bite (within `early` seconds)
+    false positive  detection before the bite, or in a cast without one
+    false negative  a bite that was never detected
+
+Results include precision and recall, the bite-to-detection delay
+distribution, detector compute per frame and an estimate of catches per hour
+that charges every cast its real duration, so configurations can be compared
+on what actually matters.
+
+    python evaluation.py datasets/scenes-01 --set splash_ratio_threshold=0.01,0.02,0.04
+    python evaluation.py recordings/* --config a.json --config b.json --json results.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+import logging
+import numpy as np
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from audio_engine import AudioEngine
+from instrumentation import Instrumentation
+from main import FishbotConfig, SoundDetector, VisualDetector, setup_logging
+from recording import Session, SessionReplay
+from replay import replay_cast
+
+@dataclass
+class CastOutcome:
+    """One replayed cast scored against its true bite (times relative to the cast start)"""
+    session: str
+    bite: Optional[float]
+    detected: Optional[float]
+    detector: Optional[str]
+    outcome: str
+    duration: float
+    
+    @property
+    def delay(self) -> Optional[float]:
+        if self.outcome != "tp":
+            return None
+        return self.detected - self.bite
+
+@dataclass
+class EvaluationResult:
+    """Scores of one configuration over all sessions"""
+    name: str
+    casts: List[CastOutcome] = field(default_factory=list)
+    frames: int = 0
+    detector_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    
+    def count(self, outcome: str) -> int:
+        return sum(cast.outcome == outcome for cast in self.casts)
+    
+    def summary(self, loot_window: float = 3.0, reaction_delay: float = 0.2,
+                cycle_overhead: float = 1.5) -> Dict[str, Any]:
+        """Precision, recall, delays, cost per frame and estimated catches per hour
+        
+        A catch is a true positive looted within `loot_window` of the bite.
+        Each cast costs its time until detection (or its full length), plus
+        the reaction delay and the bot's fixed sleeps after a detection.
+        """
+        tp, fp, fn = self.count("tp"), self.count("fp"), self.count("fn")
+        delays = np.array([cast.delay for cast in self.casts if cast.delay is not None]) * 1000
+        catches = sum(cast.delay is not None and cast.delay + reaction_delay <= loot_window for cast in self.casts)
+        hours = sum(cast.duration + (reaction_delay + cycle_overhead if cast.detected is not None else 0.5)
+                    for cast in self.casts) / 3600
+        return {
+            "config": self.name,
+            "casts": len(self.casts),
+            "bites": tp + fn,
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "precision": tp / (tp + fp) if tp + fp else None,
+            "recall": tp / (tp + fn) if tp + fn else None,
+            "delay_ms": {
+                "p50": float(np.percentile(delays, 50)) if len(delays) else None,
+                "p95": float(np.percentile(delays, 95)) if len(delays) else None,
+                "max": float(delays.max()) if len(delays) else None,
+            },
+            "frames": self.frames,
+            "detector_ms_per_frame": self.detector_seconds / self.frames * 1000 if self.frames else None,
+            "catches": catches,
+            "catches_per_hour": catches / hours if hours > 0 else None,
+            "wall_seconds": self.wall_seconds,
+        }
+
+def score_cast(session: str, cast: Dict[str, Any], detector: Optional[str],
+               detected_at: Optional[float], early: float) -> CastOutcome:
+    """Classify one replayed cast against the recorded (true) bite"""
+    start = cast["start"]
+    bite = None if cast["bite"] is None else cast["bite"] - start
+    detected = None if detected_at is None else detected_at - start
+    if detected is None:
+        outcome = "fn" if bite is not None else "tn"
+    elif bite is not None and detected >= bite - early:
+        outcome = "tp"
+    else:
+        outcome = "fp"
+    duration = detected if detected is not None else cast["end"] - start
+    return CastOutcome(session, bite, detected, detector, outcome, duration)
+
+def evaluate(config: FishbotConfig, sessions: Sequence[str], name: str = "config",
+             early: float = 0.1) -> EvaluationResult:
+    """Replay every cast of the sessions through one configuration"""
+    result = EvaluationResult(name)
+    instruments = Instrumentation(enabled=True)
+    start = time.perf_counter()
+    for path in sessions:
+        session = Session(path)
+        replay = SessionReplay(session)
+        visual = VisualDetector(config, frame_source=replay.frame_source)
+        sound = SoundDetector(config, AudioEngine(replay.audio_input))
+        try:
+            for cast in session.casts():
+                replay.seek(cast["start"])
+                detector, detected_at = replay_cast(replay, visual, sound, config, cast["end"], instruments)
+                result.casts.append(score_cast(path, cast, detector, detected_at, early))
+        finally:
+            sound.close()
+    result.wall_seconds = time.perf_counter() - start
+    result.frames = instruments.stages['capture'].count if 'capture' in instruments.stages else 0
+    result.detector_seconds = sum(histogram.total for stage, histogram in instruments.stages.items()
+                                  if stage.startswith('detect_'))
+    return result
+
+def parse_value(text: str) -> Any:
+    """JSON value of a --set option, or the bare text for unquoted strings"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_grid(settings: Sequence[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Expand --set key=v1,v2 options into named config overrides (their cross product)"""
+    axes = []
+    for setting in settings:
+        key, _, values = setting.partition('=')
+        if not values or key not in FishbotConfig.__dataclass_fields__:
+            raise ValueError(f"Expected <config field>=<value>[,<value>...], got {setting!r}")
+        axes.append([(key, parse_value(value)) for value in values.split(',')])
+    variants = []
+    for combination in itertools.product(*axes):
+        name = " ".join(f"{key}={value}" for key, value in combination)
+        variants.append((name, dict(combination)))
+    return variants
+
+def expand_sessions(paths: Sequence[str]) -> List[str]:
+    """Session directories, descending one level into directories of sessions"""
+    sessions = []
+    for path in paths:
+        if os.path.exists(os.path.join(path, 'session.json')):
+            sessions.append(path)
+        elif os.path.isdir(path):
+            sessions.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                            if os.path.exists(os.path.join(path, name, 'session.json')))
+    return sessions
+
+def format_value(value: Optional[float], pattern: str) -> str:
+    """Format a table cell, with a right-aligned dash for missing values"""
+    if value is None:
+        return "-".rjust(int(pattern.split('.')[0]))
+    return format(value, pattern)
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Score Fishbot detector configurations on labelled sessions")
+    parser.add_argument('sessions', nargs='+', help="session directories (or directories of sessions)")
+    parser.add_argument('--config', action='append', default=[], help="config file to evaluate (repeatable)")
+    parser.add_argument('--set', action='append', default=[], metavar='FIELD=V1,V2',
+                        help="override a config field; several values evaluate each (repeatable, crossed)")
+    parser.add_argument('--no-sound', action='store_true', help="evaluate visual detection only")
+    parser.add_argument('--early', type=float, default=0.1,
+                        help="seconds before the true bite a detection still counts as correct")
+    parser.add_argument('--loot-window', type=float, default=3.0, help="seconds after the bite a loot still catches")
+    parser.add_argument('--json', help="write the summaries to this file")
+    args = parser.parse_args()
+    setup_logging()
+    
+    logging.getLogger('main').setLevel(logging.WARNING)
+    sessions = expand_sessions(args.sessions)
+    if not sessions:
+        parser.error("no sessions found")
+    
+    bases = [("defaults", FishbotConfig())]
+    if args.config:
+        bases = []
+        for path in args.config:
+            with open(path, 'r') as f:
+                bases.append((os.path.basename(path), FishbotConfig(**json.load(f))))
+    try:
+        grid = parse_grid(args.set) if args.set else [("", {})]
+    except ValueError as e:
+        parser.error(str(e))
+    
+    summaries = []
+    for (base_name, base), (grid_name, overrides) in itertools.product(bases, grid):
+        config = replace(base, **overrides)
+        if args.no_sound:
+            config = replace(config, enable_sound_detection=False)
+        name = " ".join(part for part in (base_name if len(bases) > 1 or not grid_name else "", grid_name) if part)
+        summaries.append(evaluate(config, sessions, name, args.early).summary(
+            args.loot_window, (config.reaction_delay_min + config.reaction_delay_max) / 2))
+    
+    print(f"{len(sessions)} sessions, {summaries[0]['casts']} casts, {summaries[0]['bites']} bites")
+    print(f"{'config':<40} {'prec':>5} {'recall':>6} {'fp':>4} {'fn':>4} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'ms/frame':>8} {'catch/h':>7}")
+    for summary in summaries:
+        print(f"{summary['config']:<40} {format_value(summary['precision'], '5.2f')} "
+              f"{format_value(summary['recall'], '6.2f')} {summary['fp']:>4} {summary['fn']:>4} "
+              f"{format_value(summary['delay_ms']['p50'], '7.0f')} {format_value(summary['delay_ms']['p95'], '7.0f')} "
+              f"{format_value(summary['detector_ms_per_frame'], '8.3f')} "
+              f"{format_value(summary['catches_per_hour'], '7.1f')}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=4)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Rolling flight recorder for the Fishbot.
+The last few seconds of frames and audio are kept in memory. When a
+detection fires or a cast times out, they are handed to a background thread
+that saves them as a normal recorded session, so the snapshot can be
+inspected or fed to replay.py like any other recording.
+
+Each frame slot is sized to the frame it holds, so with a bobber window the
+ring takes a few megabytes rather than `frames` full detection areas.
+Taking a snapshot never blocks the polling loop and does not clear the
+history: the snapshot keeps the current slot arrays, and the ring gives a
+slot a fresh array the next time it overwrites one still held by a
+snapshot. Only the small audio ring is copied. If the previous snapshot is
+still being written, the new one is skipped.
+"""
+
+import os
+import queue
+import threading
+import time
+import logging
+import numpy as np
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from audio_engine import CHUNK, RATE, AudioRingBuffer
+from capture import Area, Frame
+from recording import FRAME_RECORD, SessionRecorder
+
+logger = logging.getLogger(__name__)
+
+class FrameRing:
+    """Ring of the most recent frames, each slot an array sized to its frame"""
+    
+    def __init__(self, capacity: int, stride: int):
+        self.capacity = capacity
+        self.stride = stride
+        self.slots: List[Optional[np.ndarray]] = [None] * capacity
+        self.records = np.zeros(capacity, dtype=FRAME_RECORD)
+        # Slots whose array a snapshot still refers to; they are replaced, not overwritten
+        self.shared = [False] * capacity
+        self.count = 0
+    
+    def write(self, frame: Frame) -> bool:
+        """Copy a frame into the next slot; False if it does not fit"""
+        image = frame.image
+        if image.nbytes > self.stride:
+            return False
+        slot = self.count % self.capacity
+        buffer = self.slots[slot]
+        # Reallocate for shared slots, and when the frame size changes a lot (bobber window vs full area)
+        if buffer is None or self.shared[slot] or not image.nbytes <= buffer.nbytes <= 4 * image.nbytes:
+            buffer = self.slots[slot] = np.empty(image.nbytes, dtype=np.uint8)
+            self.shared[slot] = False
+        buffer[:image.nbytes].reshape(image.shape)[...] = image
+        channels = image.shape[2] if image.ndim == 3 else 1
+        x, y = frame.area[:2] if frame.area else (0, 0)
+        self.records[slot] = (frame.timestamp, x, y, image.shape[0], image.shape[1], channels)
+        self.count += 1
+        return True
+    
+    def clear(self):
+        self.count = 0
+    
+    def share(self) -> List[Frame]:
+        """Frames held in the ring, oldest first, as views that later writes leave alone"""
+        frames = []
+        for index in range(max(0, self.count - self.capacity), self.count):
+            slot = index % self.capacity
+            t, x, y, height, width, channels = self.records[slot].tolist()
+            shape = (height, width, channels) if channels > 1 else (height, width)
+            image = self.slots[slot][:height * width * channels].reshape(shape)
+            frames.append(Frame(image, (x, y, width, height), timestamp=t))
+            self.shared[slot] = True
+        return frames
+
+class FlightRecorder:
+    """Keeps recent frames, audio and events and snapshots them on trigger events"""
+    
+    def __init__(self, directory: str, detection_area: Area, frames: int = 30, audio_chunks: int = 256,
+                 sample_rate: int = RATE, chunk_size: int = CHUNK,
+                 trigger_events: Sequence[str] = ('bite', 'timeout')):
+        self.directory = directory
+        self.detection_area = tuple(detection_area)
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.trigger_events = tuple(trigger_events)
+        stride = int(detection_area[2]) * int(detection_area[3]) * 4
+        
+        self._frames = FrameRing(frames, stride)
+        self._audio = AudioRingBuffer(audio_chunks, chunk_size)
+        self._events: deque = deque(maxlen=64)
+        self._lock = threading.Lock()
+        self._jobs: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._idle = threading.Event()
+        self._idle.set()
+        self.snapshots = 0
+        self.skipped = 0
+        self._writer = threading.Thread(target=self._run)
+        self._writer.daemon = True
+        self._writer.start()
+    
+    def record_frame(self, frame: Frame):
+        with self._lock:
+            self._frames.write(frame)
+    
+    def record_audio(self, samples: np.ndarray, timestamp: float):
+        """AudioEngine listener; the ring is single-producer, so no lock"""
+        self._audio.write(samples, timestamp)
+    
+    def record_event(self, event: str, timestamp: Optional[float] = None, **data):
+        """Remember an event; trigger events also take a snapshot"""
+        record = {"t": time.monotonic() if timestamp is None else timestamp, "event": event}
+        record.update(data)
+        self._events.append(record)
+        if event in self.trigger_events:
+            self.snapshot(event)
+    
+    def snapshot(self, reason: str) -> Optional[str]:
+        """Queue the recent history for writing; returns the snapshot path, or None if skipped"""
+        if not self._idle.is_set():
+            self.skipped += 1
+            logger.warning(f"Flight recorder still writing the previous snapshot, skipped {reason}")
+            return None
+        
+        self._idle.clear()
+        with self._lock:
+            frames = self._frames.share()
+        # The audio ring keeps being written by the audio thread, so copy it
+        samples, timestamps, _ = self._audio.read(0)
+        events = list(self._events)
+        
+        self.snapshots += 1
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.snapshots:04d}-{reason}"
+        path = os.path.join(self.directory, name)
+        self._jobs.put((path, frames, samples.copy(), timestamps.copy(), events))
+        return path
+    
+    def _run(self):
+        """Writer thread: save snapshots as recorded sessions"""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            path, frames, samples, timestamps, events = job
+            try:
+                self._write(path, frames, samples, timestamps, events)
+                logger.info(f"Flight recorder snapshot saved to {path}")
+            except Exception as e:
+                logger.error(f"Flight recorder snapshot failed: {e}")
+            finally:
+                self._idle.set()
+    
+    def _write(self, path: str, frames: List[Frame], samples: np.ndarray, timestamps: np.ndarray,
+               events: List[Dict[str, Any]]):
+        recorder = SessionRecorder(path, self.detection_area, self.sample_rate, self.chunk_size, compress=True,
+                                   background=False)
+        try:
+            for frame in frames:
+                recorder.record_frame(frame)
+            for chunk, timestamp in zip(samples, timestamps):
+                recorder.record_audio(chunk, timestamp)
+            for event in events:
+                event = dict(event)
+                recorder.record_event(event.pop("event"), event.pop("t"), **event)
+        finally:
+            recorder.close()
+    
+    def close(self):
+        """Finish pending snapshots and stop the writer thread"""
+        self._jobs.put(None)
+        self._writer.join()
\ No newline at end of file
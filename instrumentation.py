@@ -0,0 +1,164 @@
+"""
+Per-stage latency instrumentation for the Fishbot.
+Each stage of the fishing cycle (cast, capture, every detector, the bite
+decision, the reaction sleep, the loot input) is timed on a monotonic clock
+and folded into a streaming log-bucket histogram, so p50/p95/p99 are
+available at any time with constant memory however long the bot runs.
+
+Two clocks are kept apart. Spans of bot time (cast to bite, bite to loot,
+the reaction sleep) use `clock`, the bot's clock, which is virtual in the
+simulation. Work done on the CPU (capture, detectors, input calls, the
+bite decision) is timed on `work_clock`, always the real `perf_counter`,
+so the simulation still reports what the detectors cost.
+
+When disabled, every entry point returns immediately and `timer` hands back
+one shared no-op context manager, so the instrumented code pays only an
+attribute check per stage.
+"""
+
+import json
+import math
+import time
+import numpy as np
+from typing import Callable, Dict, Optional
+
+class LatencyHistogram:
+    """Streaming latency histogram with log-spaced buckets
+    
+    Buckets cover 1 us to 1000 s at `per_decade` buckets per decade, so
+    percentiles are accurate to about 6% at the default resolution. Count,
+    sum, min and max are exact.
+    """
+    
+    MIN_SECONDS = 1e-6
+    DECADES = 9
+    
+    def __init__(self, per_decade: int = 40):
+        self.per_decade = per_decade
+        self.counts = np.zeros(self.DECADES * per_decade + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+    
+    def add(self, seconds: float):
+        if seconds <= self.MIN_SECONDS:
+            bucket = 0
+        else:
+            bucket = min(int(math.log10(seconds / self.MIN_SECONDS) * self.per_decade) + 1, len(self.counts) - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+    
+    def percentile(self, q: float) -> float:
+        """Approximate q-th percentile in seconds (bucket midpoint, clamped to min/max)"""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        bucket = int(np.searchsorted(np.cumsum(self.counts), max(rank, 1)))
+        if bucket == 0:
+            return self.min
+        value = self.MIN_SECONDS * 10 ** ((bucket - 0.5) / self.per_decade)
+        return min(max(value, self.min), self.max)
+    
+    def summary(self) -> Dict[str, float]:
+        """Count and latencies in milliseconds"""
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000,
+            "min_ms": self.min * 1000,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+class _StageTimer:
+    """Context manager that records the time spent inside it"""
+    
+    __slots__ = ('instrumentation', 'stage', 'start')
+    
+    def __init__(self, instrumentation: 'Instrumentation', stage: str):
+        self.instrumentation = instrumentation
+        self.stage = stage
+        self.start = 0.0
+    
+    def __enter__(self):
+        self.start = self.instrumentation.work_clock()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation.work_since(self.stage, self.start)
+        return False
+
+class _NullTimer:
+    """Shared no-op stand-in used while instrumentation is disabled"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Instrumentation:
+    """Named stage histograms fed from a monotonic clock"""
+    
+    def __init__(self, enabled: bool = False, clock: Callable[[], float] = time.perf_counter,
+                 work_clock: Callable[[], float] = time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.work_clock = work_clock
+        self.stages: Dict[str, LatencyHistogram] = {}
+    
+    def record(self, stage: str, seconds: float):
+        """Add one measurement to a stage"""
+        if not self.enabled:
+            return
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.add(seconds)
+    
+    def since(self, stage: str, start: Optional[float]):
+        """Record the time elapsed since `start` (a value of `clock()`), if there is one"""
+        if self.enabled and start is not None:
+            self.record(stage, self.clock() - start)
+    
+    def work_since(self, stage: str, start: Optional[float]):
+        """Record the work time elapsed since `start` (a value of `work_clock()`), if there is one"""
+        if self.enabled and start is not None:
+            self.record(stage, self.work_clock() - start)
+    
+    def timer(self, stage: str):
+        """Context manager timing the work in the enclosed block as `stage`"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage)
+    
+    def now(self) -> Optional[float]:
+        """Current clock value, or None while disabled (pairs with `since`)"""
+        return self.clock() if self.enabled else None
+    
+    def work_now(self) -> Optional[float]:
+        """Current work clock value, or None while disabled (pairs with `work_since`)"""
+        return self.work_clock() if self.enabled else None
+    
+    def reset(self):
+        self.stages.clear()
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count and p50/p95/p99 latencies in milliseconds"""
+        return {stage: histogram.summary() for stage, histogram in self.stages.items()}
+    
+    def dump(self, path: str):
+        """Write the summary as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=4)
\ No newline at end of file
@@ -6,30 +6,45 @@ This bot demonstrates automation concepts for educational purposes.
 
 import cv2
 import numpy as np
-import pyautogui
 import time
 import threading
+from concurrent.futures import wait
 import tkinter as tk
 from tkinter import ttk, messagebox
 import logging
 from PIL import Image, ImageTk
 import os
 import json
-from dataclasses import dataclass, asdict
-from typing import Optional, Tuple, List
-import keyboard
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Optional, Tuple, List
+from audio_detectors import (AudioDetector, MatchedFilterDetector, RMSDetector, SpectralSplashDetector,
+                             load_sound_templates)
+from audio_engine import AudioEngine
+from audio_features import AudioFeatureExtractor
+from backends import Clock, InputBackend, PyAutoGUIInput, SystemClock
+from capture import Frame, FrameSource, create_frame_source
+from detection_engine import DetectionEngine
+from detectors import BiteWatch, DetectorCascade
+from flight_recorder import FlightRecorder
+from instrumentation import Instrumentation
+from metrics_server import BotMetrics, MetricsServer
+from pipeline import DetectionPipeline
+from recording import RecordingFrameSource, SessionRecorder, new_session_path
+from template_matching import MatchResult, TemplateBank
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('fishbot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+def setup_logging():
+    """Log to fishbot.log and the console; called by the command-line entry points, not on import"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('fishbot.log'),
+            logging.StreamHandler()
+        ]
+    )
+
 @dataclass
 class FishbotConfig:
     """Configuration settings for the fishbot"""
@@ -44,166 +59,331 @@ class FishbotConfig:
     enable_sound_detection: bool = True
     enable_visual_detection: bool = True
     auto_loot: bool = True
+    capture_backend: str = "auto"
+    capture_path: str = ""
+    adaptive_roi: bool = True
+    bobber_roi_size: int = 120
+    poll_interval: float = 0.1
+    roi_poll_interval: float = 0.05
+    template_scales: Tuple[float, ...] = (1.0,)
+    pyramid_levels: int = 2
+    sound_method: str = "spectral"
+    splash_bands: Tuple[Tuple[float, float], ...] = ((1000.0, 4000.0), (4000.0, 8000.0))
+    splash_onset_ratio: float = 6.0
+    splash_selectivity: float = 2.0
+    sound_template_dir: str = "templates/sounds"
+    matched_filter_threshold: float = 0.5
+    record_dir: str = ""
+    record_compression: bool = False
+    flight_recorder_dir: str = ""
+    flight_recorder_frames: int = 30
+    instrumentation: bool = False
+    latency_report: str = "latency.json"
+    metrics_port: int = 0
+    metrics_host: str = "127.0.0.1"
+    splash_ratio_threshold: float = 0.02
+    motion_threshold: float = 0.05
+    bobber_confidence: float = 0.8
+    volume_threshold: float = 3000.0
+    splash_hsv_lower: Tuple[int, int, int] = (0, 0, 200)
+    splash_hsv_upper: Tuple[int, int, int] = (180, 30, 255)
+    bite_detectors: Tuple[str, ...] = ("sound", "highlights", "motion", "splash")
+    detector_plugins: Tuple[str, ...] = ()
+    detector_costs: Dict[str, float] = field(default_factory=dict)
+    detector_confidences: Dict[str, float] = field(default_factory=dict)
+    cascade: bool = True
+    cascade_confidence: float = 0.6
+    cascade_gate_cost: float = 0.5
+    detector_workers: int = 0
+    pipeline_workers: int = 0
+    pipeline_slots: int = 8
 
 class SoundDetector:
-    """Detects fishing sounds using audio analysis"""
+    """Detects fishing sounds using audio analysis
     
-    def __init__(self):
+    Audio comes from a long-lived AudioEngine. Arming and disarming per cast
+    only moves a read cursor; the device stays open between casts.
+    """
+    
+    # Chunks of recent audio used to settle the noise floor when arming (~0.5 s)
+    PRIME_CHUNKS = 20
+    
+    def __init__(self, config: Optional[FishbotConfig] = None, engine: Optional[AudioEngine] = None):
+        self.config = config or FishbotConfig()
+        self.engine = engine or AudioEngine()
+        self.features = AudioFeatureExtractor()
+        self.detector: Optional[AudioDetector] = None
+        self.matched_filter: Optional[MatchedFilterDetector] = None
+        self.last_correlation: Optional[float] = None
         self.is_listening = False
-        self.sound_detected = False
+        self._sound_detected = False
+        self._cursor = 0
+        self._detector_key = None
+    
+    def _template_stamp(self) -> Tuple:
+        """Names and modification times of the recorded splash clips"""
+        directory = self.config.sound_template_dir
+        if not os.path.isdir(directory):
+            return ()
+        return tuple(sorted((entry.name, entry.stat().st_mtime) for entry in os.scandir(directory)
+                            if entry.name.lower().endswith('.wav')))
+    
+    def refresh_detectors(self):
+        """Rebuild the detectors if the config or the recorded splash clips changed"""
+        key = (repr(asdict(self.config)), self.engine.sample_rate, self._template_stamp())
+        if key == self._detector_key:
+            return
+        self._detector_key = key
+        
+        names, clips = load_sound_templates(self.config.sound_template_dir, self.engine.sample_rate)
+        self.matched_filter = None
+        if clips:
+            self.matched_filter = MatchedFilterDetector(clips, self.config.matched_filter_threshold, names=names)
+            logger.info(f"Loaded {len(clips)} splash sound template(s): {', '.join(names)}")
+        self.detector = self.create_detector()
+    
+    def create_detector(self) -> AudioDetector:
+        """Build the splash detector selected by `sound_method`"""
+        method = self.config.sound_method
+        if method == "matched":
+            if self.matched_filter is not None:
+                return self.matched_filter
+            logger.warning(f"No splash sounds in {self.config.sound_template_dir}, using spectral detection")
+            method = "spectral"
+        if method == "rms":
+            return RMSDetector(self.config.volume_threshold)
+        if method == "spectral":
+            return SpectralSplashDetector(self.engine.sample_rate, self.config.splash_bands,
+                                          onset_ratio=self.config.splash_onset_ratio,
+                                          selectivity=self.config.splash_selectivity)
+        raise ValueError(f"Unknown sound detection method: {method}")
+    
+    def _active_detectors(self) -> List[AudioDetector]:
+        """The triggering detector, plus the matched filter when it only reports a score"""
+        detectors = [self.detector]
+        if self.matched_filter is not None and self.matched_filter is not self.detector:
+            detectors.append(self.matched_filter)
+        return detectors
         
     def start_listening(self):
-        """Start listening for fishing sounds"""
-        try:
-            import pyaudio
-            import audioop
-            self.is_listening = True
-            self.sound_detected = False
-            
-            # Audio parameters
-            CHUNK = 1024
-            FORMAT = pyaudio.paInt16
-            CHANNELS = 1
-            RATE = 44100
-            
-            p = pyaudio.PyAudio()
-            stream = p.open(format=FORMAT,
-                          channels=CHANNELS,
-                          rate=RATE,
-                          input=True,
-                          frames_per_buffer=CHUNK)
-            
-            logger.info("Sound detection started")
-            
-            while self.is_listening:
-                try:
-                    data = stream.read(CHUNK, exception_on_overflow=False)
-                    volume = audioop.rms(data, 2)
-                    
-                    # Detect sudden volume spikes (splash sound)
-                    if volume > 3000:  # Adjust threshold as needed
-                        self.sound_detected = True
-                        logger.info(f"Sound detected: volume {volume}")
-                        break
-                        
-                except Exception as e:
-                    logger.error(f"Audio processing error: {e}")
-                    
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
-        except ImportError:
-            logger.warning("PyAudio not available, sound detection disabled")
-        except Exception as e:
-            logger.error(f"Sound detection error: {e}")
+        """Arm sound detection for the current cast"""
+        self._sound_detected = False
+        self.is_listening = self.engine.start()
+        self._cursor = self.engine.cursor()
+        if not self.is_listening:
+            return
+        
+        # Settle the running averages on the audio just before the cast
+        self.refresh_detectors()
+        self.features.reset()
+        self.last_correlation = None
+        recent, _, _ = self.engine.read(max(0, self._cursor - self.PRIME_CHUNKS))
+        self.features.process(recent)
+        for detector in self._active_detectors():
+            detector.reset()
+            detector.process(recent)
+        logger.debug("Sound detection armed")
+    
+    def poll(self) -> bool:
+        """Check audio received since the last poll for a splash"""
+        if not self.is_listening or self._sound_detected:
+            return self._sound_detected
+        
+        # Everything since the last poll is processed as one batch
+        chunks, _, self._cursor = self.engine.read(self._cursor)
+        if len(chunks) == 0:
+            return False
+        features = self.features.process(chunks)
+        detection = self.detector.process(chunks)
+        if self.matched_filter is self.detector:
+            self.last_correlation = detection.peak_score
+        elif self.matched_filter is not None:
+            self.last_correlation = self.matched_filter.process(chunks).peak_score
+        
+        if detection.fired:
+            self._sound_detected = True
+            correlation = f", correlation {self.last_correlation:.2f}" if self.last_correlation is not None else ""
+            logger.info(f"Sound detected ({self.detector.name}): score {detection.peak_score:.1f}{correlation}, "
+                        f"volume {int(features.rms.max())}, peak {int(features.peak.max())}, "
+                        f"energy ratio {features.energy_ratio.max():.1f}, "
+                        f"{self.detector.last_chunk_ms:.3f} ms/chunk")
+        return self._sound_detected
+    
+    @property
+    def sound_detected(self) -> bool:
+        """Whether a splash sound arrived since detection was armed"""
+        return self.poll()
     
     def stop_listening(self):
-        """Stop listening for sounds"""
+        """Disarm sound detection; the audio device stays open"""
         self.is_listening = False
+    
+    def close(self):
+        """Disarm and close the audio device"""
+        self.stop_listening()
+        self.engine.stop()
 
 class VisualDetector:
     """Detects bobber and splash using computer vision"""
     
-    def __init__(self, config: FishbotConfig):
+    def __init__(self, config: FishbotConfig, frame_source: Optional[FrameSource] = None):
         self.config = config
-        self.bobber_template = None
+        self.bobber_bank = TemplateBank('templates', scales=config.template_scales, levels=config.pyramid_levels,
+                                        confidence=config.bobber_confidence, exclude=('splash',))
         self.splash_template = None
+        self._frame_source = frame_source
+        self.engine = DetectionEngine(config.splash_hsv_lower, config.splash_hsv_upper)
         self.load_templates()
     
+    def update_config(self, config: FishbotConfig):
+        """Switch to a new configuration without reloading unchanged templates"""
+        self.config = config
+        self.engine.set_splash_range(config.splash_hsv_lower, config.splash_hsv_upper)
+        self.bobber_bank.configure(config.template_scales, config.pyramid_levels, config.bobber_confidence)
+    
+    @property
+    def frame_source(self) -> FrameSource:
+        """Frame source, created from the configured backend on first use"""
+        if self._frame_source is None:
+            self._frame_source = create_frame_source(self.config.capture_backend, self.config.capture_path)
+        return self._frame_source
+    
+    @frame_source.setter
+    def frame_source(self, source: FrameSource):
+        self._frame_source = source
+    
     def load_templates(self):
-        """Load bobber and splash templates if available"""
+        """Load bobber and splash templates if available
+        
+        Every image in templates/ not named splash* is a bobber template. The
+        bank re-reads changed files by itself while the bot is running.
+        """
         try:
-            if os.path.exists('templates/bobber.png'):
-                self.bobber_template = cv2.imread('templates/bobber.png', 0)
+            self.bobber_bank.refresh(force=True)
             if os.path.exists('templates/splash.png'):
                 self.splash_template = cv2.imread('templates/splash.png', 0)
         except Exception as e:
             logger.error(f"Error loading templates: {e}")
     
     def capture_screen_area(self, area: Tuple[int, int, int, int]) -> np.ndarray:
-        """Capture a specific area of the screen"""
-        x, y, w, h = area
-        screenshot = pyautogui.screenshot(region=(x, y, w, h))
-        return cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-    
-    def detect_bobber(self) -> Optional[Tuple[int, int]]:
-        """Detect bobber position using template matching"""
-        if self.bobber_template is None:
-            return None
-            
-        screen = self.capture_screen_area(self.config.bobber_detection_area)
-        gray_screen = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
-        
-        result = cv2.matchTemplate(gray_screen, self.bobber_template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        """Capture a specific area of the screen as a BGR view"""
+        return self.frame_source.grab(area).bgr
+    
+    def capture_frame(self, area: Optional[Tuple[int, int, int, int]] = None) -> Frame:
+        """Capture the detection area once as a Frame shared by all detectors"""
+        area = area or self.config.bobber_detection_area
+        frame = self.frame_source.grab(tuple(area))
+        self.engine.prepare(frame)
+        return frame
+    
+    def locate_bobber(self, frame: Optional[Frame] = None) -> Optional[MatchResult]:
+        """Find the bobber with coarse-to-fine, multi-scale template matching"""
+        if frame is None:
+            frame = self.capture_frame()
         
-        if max_val > 0.8:  # High confidence threshold
-            return max_loc
+        match = self.bobber_bank.match(frame)
+        if match is not None and match.score > self.config.bobber_confidence:
+            return match
         return None
     
-    def detect_splash(self) -> bool:
-        """Detect splash effect around bobber area"""
-        screen = self.capture_screen_area(self.config.bobber_detection_area)
-        
-        # Convert to HSV for better color detection
-        hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV)
-        
-        # Define white/light blue color range for splash
-        lower_splash = np.array([0, 0, 200])
-        upper_splash = np.array([180, 30, 255])
+    def detect_bobber(self, frame: Optional[Frame] = None) -> Optional[Tuple[int, int]]:
+        """Detect bobber position (top-left of the match) using template matching"""
+        match = self.locate_bobber(frame)
+        return match.location if match is not None else None
+    
+    def bobber_window(self, frame: Frame, size: int) -> Optional[Tuple[int, int, int, int]]:
+        """Screen-space analysis window centred on the bobber, or None if not found"""
+        match = self.locate_bobber(frame)
+        if match is None or frame.area is None:
+            return None
         
-        mask = cv2.inRange(hsv, lower_splash, upper_splash)
+        template_w, template_h = match.size
+        area_x, area_y, area_w, area_h = frame.area
+        center_x = area_x + match.center[0]
+        center_y = area_y + match.center[1]
         
-        # Count white pixels (splash indicators)
-        white_pixels = np.sum(mask == 255)
-        total_pixels = mask.shape[0] * mask.shape[1]
+        # Window must fit the template for tracking and stay inside the area
+        w = min(max(size, 2 * template_w), area_w)
+        h = min(max(size, 2 * template_h), area_h)
+        x = min(max(center_x - w // 2, area_x), area_x + area_w - w)
+        y = min(max(center_y - h // 2, area_y), area_y + area_h - h)
+        return (x, y, w, h)
+    
+    def detect_splash(self, frame: Optional[Frame] = None, baseline: float = 0.0) -> bool:
+        """Detect splash effect around bobber area"""
+        if frame is None:
+            frame = self.capture_frame()
         
-        splash_ratio = white_pixels / total_pixels
+        # White/light blue HSV range for splash, counted in preallocated buffers
+        splash_ratio = self.engine.splash_ratio(frame)
         
         logger.debug(f"Splash ratio: {splash_ratio}")
-        return splash_ratio > 0.02  # Adjust threshold as needed
+        return splash_ratio - baseline > self.config.splash_ratio_threshold
+    
+    def prepare_frame(self, frame: Frame):
+        """Convert the gray plane up front, so detectors running in parallel only read the frame"""
+        self.engine.prepare(frame)
+        frame.gray
     
-    def detect_motion(self, previous_frame: np.ndarray, current_frame: np.ndarray) -> bool:
+    def detect_highlights(self, frame: Frame) -> bool:
+        """Cheap splash pre-check: could the frame hold enough splash pixels at all?"""
+        return self.engine.highlight_ratio(frame) > self.config.splash_ratio_threshold
+    
+    def detect_motion(self, previous_frame: Optional[Frame], current_frame: Frame) -> bool:
         """Detect motion in the bobber area"""
         if previous_frame is None:
             return False
             
-        # Calculate frame difference
-        diff = cv2.absdiff(previous_frame, current_frame)
-        gray_diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-        
-        # Apply threshold
-        _, thresh = cv2.threshold(gray_diff, 30, 255, cv2.THRESH_BINARY)
-        
-        # Count motion pixels
-        motion_pixels = np.sum(thresh == 255)
-        total_pixels = thresh.shape[0] * thresh.shape[1]
-        
-        motion_ratio = motion_pixels / total_pixels
-        return motion_ratio > 0.05  # Adjust threshold as needed
+        # Thresholded grayscale difference, counted in preallocated buffers
+        motion_ratio = self.engine.motion_ratio(previous_frame, current_frame)
+        return motion_ratio > self.config.motion_threshold
 
 class FishBot:
-    """Main fishing bot class"""
+    """Main fishing bot class
     
-    def __init__(self):
-        self.config = FishbotConfig()
+    The clock, key input, frame source and audio engine can be injected to
+    run the bot loop against a simulated game (see simulation.py).
+    """
+    
+    def __init__(self, config: Optional[FishbotConfig] = None, clock: Optional[Clock] = None,
+                 input_backend: Optional[InputBackend] = None, frame_source: Optional[FrameSource] = None,
+                 audio_engine: Optional[AudioEngine] = None, rng: Optional[np.random.Generator] = None,
+                 hotkeys: bool = True):
+        self.config = config or FishbotConfig()
+        self.clock = clock or SystemClock()
+        self.input = input_backend or PyAutoGUIInput()
+        self.rng = rng or np.random.default_rng()
         self.is_running = False
         self.is_paused = False
-        self.visual_detector = VisualDetector(self.config)
-        self.sound_detector = SoundDetector()
+        self.visual_detector = VisualDetector(self.config, frame_source=frame_source)
+        self.sound_detector = SoundDetector(self.config, audio_engine)
         self.stats = {
             'casts': 0,
             'catches': 0,
             'start_time': None,
-            'runtime': 0
+            'runtime': 0,
+            'latency': {},
+            'cascade': {},
+            'pipeline': {}
         }
-        self.previous_frame = None
+        self.instruments = Instrumentation(self.config.instrumentation, clock=self.clock.perf_counter)
+        self.cascade = DetectorCascade.from_config(self.config, instruments=self.instruments)
+        self.watch = BiteWatch(self.config, self.visual_detector, self.sound_detector, self.cascade,
+                               self.instruments)
+        self.cast_time = None
+        self.bite_time = None
+        self.metrics = BotMetrics(clock=self.clock.perf_counter)
+        self.metrics_server: Optional[MetricsServer] = None
+        self.pipeline: Optional[DetectionPipeline] = None
+        self.recorder: Optional[SessionRecorder] = None
+        self.flight_recorder: Optional[FlightRecorder] = None
         
-        # Setup hotkeys
-        keyboard.add_hotkey('f9', self.toggle_bot)
-        keyboard.add_hotkey('f10', self.pause_resume)
-        keyboard.add_hotkey('f11', self.stop_bot)
+        # Setup hotkeys (imported here so the detectors can be used without a desktop session)
+        if hotkeys:
+            import keyboard
+            keyboard.add_hotkey('f9', self.toggle_bot)
+            keyboard.add_hotkey('f10', self.pause_resume)
+            keyboard.add_hotkey('f11', self.stop_bot)
     
     def load_config(self, filename: str = 'fishbot_config.json'):
         """Load configuration from file"""
@@ -212,6 +392,13 @@ class FishBot:
                 with open(filename, 'r') as f:
                     config_dict = json.load(f)
                     self.config = FishbotConfig(**config_dict)
+                    self.visual_detector.update_config(self.config)
+                    self.sound_detector.config = self.config
+                    self.instruments.enabled = self.config.instrumentation
+                    self.cascade.close()
+                    self.cascade = DetectorCascade.from_config(self.config, instruments=self.instruments)
+                    self.watch = BiteWatch(self.config, self.visual_detector, self.sound_detector, self.cascade,
+                                           self.instruments)
                 logger.info("Configuration loaded successfully")
         except Exception as e:
             logger.error(f"Error loading config: {e}")
@@ -225,66 +412,274 @@ class FishBot:
         except Exception as e:
             logger.error(f"Error saving config: {e}")
     
+    def recorders(self) -> List:
+        """Active session and flight recorders"""
+        return [recorder for recorder in (self.recorder, self.flight_recorder) if recorder is not None]
+    
+    def start_recording(self):
+        """Attach the session recorder (record_dir) and flight recorder (flight_recorder_dir)"""
+        area = tuple(self.config.bobber_detection_area)
+        engine = self.sound_detector.engine
+        if self.config.record_dir:
+            path = new_session_path(self.config.record_dir)
+            self.recorder = SessionRecorder(path, area, engine.sample_rate,
+                                            compress=self.config.record_compression)
+            logger.info(f"Recording session to {path}")
+        if self.config.flight_recorder_dir:
+            self.flight_recorder = FlightRecorder(self.config.flight_recorder_dir, area,
+                                                  self.config.flight_recorder_frames,
+                                                  sample_rate=engine.sample_rate)
+        
+        recorders = self.recorders()
+        if recorders:
+            self.visual_detector.frame_source = RecordingFrameSource(self.visual_detector.frame_source, recorders)
+            engine.listeners.extend(recorder.record_audio for recorder in recorders)
+    
+    def stop_recording(self):
+        """Detach and close the recorders"""
+        if isinstance(self.visual_detector.frame_source, RecordingFrameSource):
+            self.visual_detector.frame_source = self.visual_detector.frame_source.source
+        for recorder in self.recorders():
+            listener = recorder.record_audio
+            if listener in self.sound_detector.engine.listeners:
+                self.sound_detector.engine.listeners.remove(listener)
+            recorder.close()
+        self.recorder = None
+        self.flight_recorder = None
+    
+    def record_event(self, event: str, **data):
+        """Note a cast/bite/timeout/loot event; bites and timeouts also snapshot the flight recorder"""
+        for recorder in self.recorders():
+            recorder.record_event(event, **data)
+    
+    def start_metrics_server(self):
+        """Serve the metrics on metrics_port; the server stays up until the process exits"""
+        if self.metrics_server is not None or not self.config.metrics_port:
+            return
+        try:
+            self.metrics_server = MetricsServer(self.metrics, self.config.metrics_port, self.config.metrics_host)
+            self.metrics_server.start()
+        except OSError as e:
+            logger.error(f"Error starting metrics server: {e}")
+    
+    def start_pipeline(self):
+        """Move capture and visual detection into worker processes if configured"""
+        if self.pipeline is not None or self.config.pipeline_workers <= 0 or not self.config.enable_visual_detection:
+            return
+        if not isinstance(self.clock, SystemClock):
+            logger.warning("The detection pipeline captures the real screen; ignoring pipeline_workers")
+            return
+        self.pipeline = DetectionPipeline(self.config, self.config.pipeline_workers, self.config.pipeline_slots)
+        self.pipeline.start()
+    
+    def sync_pipeline(self):
+        """Restart the pipeline processes, which hold a copy of the config, after load_config"""
+        if self.pipeline is not None and self.pipeline.config is self.config:
+            return
+        self.stop_pipeline()
+        self.start_pipeline()
+    
+    def stop_pipeline(self):
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = None
+    
+    def update_state_metrics(self):
+        self.metrics.set('fishbot_running', int(self.is_running))
+        self.metrics.set('fishbot_paused', int(self.is_paused))
+    
     def cast_line(self):
         """Cast the fishing line"""
+        self.send_cast()
+        self.clock.sleep(self.config.cast_delay)
+    
+    def send_cast(self):
+        """Press the fishing key and count the cast, without waiting for the bobber"""
         logger.info("Casting fishing line")
-        pyautogui.press(self.config.fishing_key)
+        # A deferred backend reports when the press actually went out (see supervisor.py)
+        self.cast_time = None if self.input.deferred else self.instruments.now()
+        with self.instruments.timer('cast_input'):
+            self.input.press(self.config.fishing_key)
+        self.record_event("cast")
         self.stats['casts'] += 1
-        time.sleep(self.config.cast_delay)
+        self.metrics.increment('fishbot_casts_total')
     
     def loot_fish(self):
         """Loot the caught fish"""
+        if self.send_loot():
+            self.clock.sleep(0.5)
+    
+    def send_loot(self) -> bool:
+        """Send the loot input if auto-loot is on; returns whether it was sent"""
         if self.config.auto_loot:
             logger.info("Looting fish")
-            pyautogui.hotkey(*self.config.loot_key.split('+'))
+            with self.instruments.timer('loot_input'):
+                self.input.hotkey(*self.config.loot_key.split('+'))
+            if not self.input.deferred:
+                self.loot_sent(self.instruments.now())
+            self.record_event("loot")
             self.stats['catches'] += 1
-            time.sleep(0.5)
+            self.metrics.increment('fishbot_catches_total')
+            return True
+        return False
+    
+    def loot_sent(self, at: Optional[float]):
+        """Record the loot input as sent at `at`, a value of instruments.now()"""
+        # Key metric: from the bite decision until the loot input has been sent
+        if at is not None and self.bite_time is not None:
+            self.instruments.record('bite_to_loot', at - self.bite_time)
     
     def wait_for_bite(self) -> bool:
         """Wait for fish to bite using multiple detection methods"""
-        start_time = time.time()
-        
-        # Start sound detection in separate thread if enabled
-        if self.config.enable_sound_detection:
-            sound_thread = threading.Thread(target=self.sound_detector.start_listening)
-            sound_thread.daemon = True
-            sound_thread.start()
+        clock = self.clock
+        start_time = clock.time()
+        instruments = self.instruments
+        watch = self.watch
+        # Locate the bobber and arm sound detection; the audio engine keeps running between casts
+        watch.begin()
         
-        while time.time() - start_time < self.config.timeout_duration:
-            if not self.is_running or self.is_paused:
-                return False
-            
-            # Visual detection
-            if self.config.enable_visual_detection:
-                current_frame = self.visual_detector.capture_screen_area(
-                    self.config.bobber_detection_area
-                )
+        first_frame = True
+        parallel = self.cascade.parallel
+        prefetched = None
+        prefetched_area = None
+        pipeline = self.pipeline
+        if pipeline is not None:
+            pipeline.arm(watch.analysis_area, watch.splash_baseline, watch.interval)
+        try:
+            while clock.time() - start_time < self.config.timeout_duration:
+                if not self.is_running or self.is_paused:
+                    return False
+                if self.watch is not watch:
+                    # load_config ran: start this cast's analysis over with the new settings
+                    if pipeline is not None:
+                        pipeline.disarm()
+                    self.sync_pipeline()
+                    watch = self.watch
+                    watch.begin()
+                    parallel = self.cascade.parallel
+                    prefetched = None
+                    pipeline = self.pipeline
+                    if pipeline is not None:
+                        pipeline.arm(watch.analysis_area, watch.splash_baseline, watch.interval)
+                tick = instruments.work_now()
+                interval = watch.interval
                 
-                # Check for splash
-                if self.visual_detector.detect_splash():
-                    logger.info("Splash detected!")
-                    self.sound_detector.stop_listening()
-                    return True
+                # Capture once per tick and share the frame across detectors
+                current_frame = None
+                if pipeline is not None:
+                    # Frames are captured and analysed in the pipeline processes
+                    for result in pipeline.poll(timeout=interval):
+                        instruments.record('capture', result.capture_seconds)
+                        instruments.record('detect_pipeline', result.detect_seconds)
+                        self.metrics.frame(result.capture_seconds)
+                        if first_frame:
+                            instruments.since('first_frame', self.cast_time)
+                            first_frame = False
+                        rearmed = self.follow_pipeline_frame(pipeline, result)
+                        if result.detector is not None:
+                            instruments.record('pipeline_lag', time.monotonic() - result.timestamp)
+                            logger.info(f"{result.detector.capitalize()} detected!")
+                            return self.bite_detected(result.detector, result.started)
+                        if rearmed:
+                            # The rest of this batch was captured from the old window
+                            break
+                elif self.config.enable_visual_detection:
+                    current_frame = prefetched if prefetched is not None else self.capture_tick_frame()
+                    prefetched = None
+                    if first_frame:
+                        instruments.since('first_frame', self.cast_time)
+                        first_frame = False
                 
-                # Check for motion
-                if (self.previous_frame is not None and 
-                    self.visual_detector.detect_motion(self.previous_frame, current_frame)):
-                    logger.info("Motion detected!")
-                    self.sound_detector.stop_listening()
-                    return True
+                due = clock.perf_counter() + interval
                 
-                self.previous_frame = current_frame.copy()
-            
-            # Sound detection
-            if self.config.enable_sound_detection and self.sound_detector.sound_detected:
-                logger.info("Sound detected!")
-                return True
-            
-            time.sleep(0.1)  # Small delay to prevent excessive CPU usage
+                def overlap(futures):
+                    # While the detectors run, capture the next frame once it is due
+                    nonlocal prefetched, prefetched_area
+                    _, pending = wait(futures, timeout=max(due - clock.perf_counter(), 0))
+                    if pending and current_frame is not None:
+                        prefetched_area = watch.analysis_area
+                        prefetched = self.capture_tick_frame()
+                
+                # Bite detectors, cheapest first; without a frame only the non-visual ones run
+                detector = watch.check(current_frame, overlap if parallel else None)
+                if detector is not None:
+                    logger.info(f"{detector.name.capitalize()} detected!")
+                    return self.bite_detected(detector.name, tick)
+                if prefetched is not None and (watch.analysis_area != prefetched_area
+                                               or watch.previous_frame is not current_frame):
+                    # Tracking re-acquired the bobber: the prefetched frame shows the old window,
+                    # and the frames grabbed since may have reused its buffer
+                    prefetched = None
+                
+                if pipeline is not None:
+                    continue
+                if not parallel:
+                    clock.sleep(interval)
+                elif prefetched is None:
+                    # The detectors already used up part of the interval
+                    clock.sleep(max(due - clock.perf_counter(), 0))
+        finally:
+            if pipeline is not None:
+                pipeline.disarm()
+        
+        self.cast_timed_out()
+        return False
+    
+    def follow_pipeline_frame(self, pipeline: DetectionPipeline, result) -> bool:
+        """Record a frame the pipeline analysed and track the bobber in it
         
+        The frame is read back from its slot only when a recorder is attached
+        or an ROI window is being tracked. Returns whether the bobber was
+        re-acquired and the pipeline re-armed on the new window.
+        """
+        watch = self.watch
+        recorders = self.recorders()
+        track = result.detector is None and watch.roi_active()
+        if not recorders and not track:
+            return False
+        frame = pipeline.frame(result)
+        if frame is None:
+            # Overwritten while the result was queued
+            return False
+        for recorder in recorders:
+            recorder.record_frame(frame)
+        if not track:
+            return False
+        area = watch.analysis_area
+        with self.instruments.timer('track_bobber'):
+            watch.track(frame)
+        if watch.analysis_area == area:
+            return False
+        pipeline.arm(watch.analysis_area, watch.splash_baseline, watch.interval)
+        return True
+    
+    def cast_timed_out(self):
+        """Record a cast that ended without a bite"""
         logger.info("Fishing timeout reached")
+        self.record_event("timeout")
+        self.metrics.increment('fishbot_timeouts_total')
+        self.metrics.idle()
         self.sound_detector.stop_listening()
-        return False
+    
+    def capture_tick_frame(self) -> Frame:
+        """Capture the analysis area, recording the capture time"""
+        capture_start = time.perf_counter()
+        frame = self.visual_detector.capture_frame(self.watch.analysis_area)
+        capture_time = time.perf_counter() - capture_start
+        self.instruments.record('capture', capture_time)
+        self.metrics.frame(capture_time)
+        return frame
+    
+    def bite_detected(self, detector: str, tick: Optional[float]) -> bool:
+        """Record a bite found during the poll tick that started at `tick` (a work clock value)"""
+        self.instruments.work_since('decision', tick)
+        self.instruments.since('time_to_bite', self.cast_time)
+        self.bite_time = self.instruments.now()
+        self.record_event("bite", detector=detector)
+        self.metrics.increment('fishbot_bites_total', detector=detector)
+        self.metrics.idle()
+        self.sound_detector.stop_listening()
+        return True
     
     def fishing_cycle(self):
         """Complete fishing cycle"""
@@ -292,16 +687,34 @@ class FishBot:
         
         if self.wait_for_bite():
             # Add reaction delay to simulate human response
-            reaction_delay = np.random.uniform(
+            reaction_delay = self.rng.uniform(
                 self.config.reaction_delay_min,
                 self.config.reaction_delay_max
             )
-            time.sleep(reaction_delay)
+            sleep_start = self.instruments.now()
+            self.clock.sleep(reaction_delay)
+            self.instruments.since('reaction_sleep', sleep_start)
             
             self.loot_fish()
-            time.sleep(1)  # Wait before next cast
+            self.clock.sleep(1)  # Wait before next cast
         else:
-            time.sleep(0.5)  # Short delay before recasting
+            self.clock.sleep(0.5)  # Short delay before recasting
+        
+        self.update_cascade_stats()
+        if self.pipeline is not None:
+            self.stats['pipeline'] = {'frames': self.pipeline.frames, 'dropped': self.pipeline.dropped,
+                                      'torn': self.pipeline.torn, 'oversized': self.pipeline.oversized}
+            self.metrics.set('fishbot_frames_dropped_total', self.pipeline.dropped)
+        if self.instruments.enabled:
+            self.stats['latency'] = self.instruments.summary()
+    
+    def update_cascade_stats(self):
+        """Publish the per-stage detector counts to the stats and the metrics endpoint"""
+        self.stats['cascade'] = self.cascade.report()
+        for stage, report in self.stats['cascade'].items():
+            self.metrics.set('fishbot_stage_evaluations_total', report['evaluated'], stage=stage)
+            self.metrics.set('fishbot_stage_fired_total', report['fired'], stage=stage)
+            self.metrics.set('fishbot_stage_seconds_total', self.cascade.stats[stage].seconds, stage=stage)
     
     def start_bot(self):
         """Start the fishing bot"""
@@ -311,14 +724,18 @@ class FishBot:
         logger.info("Starting fishing bot")
         self.is_running = True
         self.is_paused = False
-        self.stats['start_time'] = time.time()
+        self.stats['start_time'] = self.clock.time()
+        self.start_recording()
+        self.start_metrics_server()
+        self.start_pipeline()
+        self.update_state_metrics()
         
         try:
             while self.is_running:
                 if not self.is_paused:
                     self.fishing_cycle()
                 else:
-                    time.sleep(0.5)
+                    self.clock.sleep(0.5)
                     
         except KeyboardInterrupt:
             logger.info("Bot interrupted by user")
@@ -332,10 +749,23 @@ class FishBot:
         logger.info("Stopping fishing bot")
         self.is_running = False
         self.is_paused = False
-        self.sound_detector.stop_listening()
+        self.update_state_metrics()
+        self.metrics.idle()
+        self.sound_detector.close()
+        self.cascade.close()
+        self.stop_pipeline()
+        self.stop_recording()
+        
+        if self.stats['start_time'] is not None:
+            self.stats['runtime'] = self.clock.time() - self.stats['start_time']
         
-        if self.stats['start_time']:
-            self.stats['runtime'] = time.time() - self.stats['start_time']
+        if self.instruments.enabled:
+            self.stats['latency'] = self.instruments.summary()
+            try:
+                self.instruments.dump(self.config.latency_report)
+                logger.info(f"Latency report saved to {self.config.latency_report}")
+            except Exception as e:
+                logger.error(f"Error saving latency report: {e}")
         
         self.print_stats()
     
@@ -352,6 +782,8 @@ class FishBot:
         """Pause or resume the bot"""
         if self.is_running:
             self.is_paused = not self.is_paused
+            self.update_state_metrics()
+            self.metrics.idle()
             status = "paused" if self.is_paused else "resumed"
             logger.info(f"Bot {status}")
     
@@ -359,13 +791,25 @@ class FishBot:
         """Print fishing statistics"""
         runtime_minutes = self.stats['runtime'] / 60
         catch_rate = (self.stats['catches'] / self.stats['casts'] * 100) if self.stats['casts'] > 0 else 0
+        catches_per_hour = self.stats['catches'] / runtime_minutes * 60 if runtime_minutes > 0 else 0
         
         logger.info("=== Fishing Statistics ===")
         logger.info(f"Runtime: {runtime_minutes:.1f} minutes")
         logger.info(f"Total casts: {self.stats['casts']}")
         logger.info(f"Total catches: {self.stats['catches']}")
         logger.info(f"Catch rate: {catch_rate:.1f}%")
-        logger.info(f"Catches per hour: {(self.stats['catches'] / runtime_minutes * 60):.1f}")
+        logger.info(f"Catches per hour: {catches_per_hour:.1f}")
+        for stage, latency in self.stats['latency'].items():
+            if latency['count']:
+                logger.info(f"{stage}: p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, "
+                            f"p99 {latency['p99_ms']:.2f} ms ({latency['count']} samples)")
+        if self.stats['pipeline']:
+            logger.info(f"Pipeline: {self.stats['pipeline']['frames']} frames analysed, "
+                        f"{self.stats['pipeline']['dropped']} dropped, {self.stats['pipeline']['torn']} overwritten, "
+                        f"{self.stats['pipeline']['oversized']} too large for the frame slots")
+        for stage, report in self.stats['cascade'].items():
+            logger.info(f"Detector {stage}: {report['evaluated']} checks, {report['skipped']} skipped, "
+                        f"pass rate {report['pass_rate'] * 100:.1f}%, {report['mean_ms']:.2f} ms/check")
 
 class FishBotGUI:
     """GUI interface for the fishing bot"""
@@ -492,8 +936,8 @@ class FishBotGUI:
     def update_stats(self):
         """Update statistics display"""
         runtime = 0
-        if self.bot.stats['start_time'] and self.bot.is_running:
-            runtime = time.time() - self.bot.stats['start_time']
+        if self.bot.stats['start_time'] is not None and self.bot.is_running:
+            runtime = self.bot.clock.time() - self.bot.stats['start_time']
         elif self.bot.stats['runtime']:
             runtime = self.bot.stats['runtime']
         
@@ -522,6 +966,18 @@ Visual Detection: {'Enabled' if self.bot.config.enable_visual_detection else 'Di
 Sound Detection: {'Enabled' if self.bot.config.enable_sound_detection else 'Disabled'}
 Auto Loot: {'Enabled' if self.bot.config.auto_loot else 'Disabled'}
 """
+        latency = self.bot.stats['latency']
+        if latency:
+            stats_text += "\nLatency (p50 / p95 / p99 ms):\n"
+            for stage, summary in latency.items():
+                if summary['count']:
+                    stats_text += (f"{stage}: {summary['p50_ms']:.1f} / {summary['p95_ms']:.1f} / "
+                                   f"{summary['p99_ms']:.1f}\n")
+        cascade = self.bot.stats['cascade']
+        if cascade:
+            stats_text += "\nDetectors (checks / pass rate):\n"
+            for stage, report in cascade.items():
+                stats_text += f"{stage}: {report['evaluated']} / {report['pass_rate'] * 100:.1f}%\n"
         
         self.stats_text.delete(1.0, tk.END)
         self.stats_text.insert(1.0, stats_text)
@@ -538,6 +994,7 @@ Auto Loot: {'Enabled' if self.bot.config.auto_loot else 'Disabled'}
 
 def main():
     """Main entry point"""
+    setup_logging()
     print("Fishbot - Educational Implementation")
     print("==========================================")
     print("This bot is for educational purposes only.")
@@ -0,0 +1,142 @@
+"""
+Local metrics endpoint for the Fishbot.
+The bot loop publishes counters and gauges into a BotMetrics object; an
+optional HTTP server on its own thread serves a copy of them in the
+Prometheus text format, so several bot instances can be scraped and graphed
+side by side. The server only ever sees snapshots taken under the metrics
+lock, never the bot's live state.
+
+    curl http://127.0.0.1:9464/metrics
+"""
+
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# name -> (type, help); series are rendered in this order
+METRICS = {
+    'fishbot_casts_total': ('counter', "Lines cast"),
+    'fishbot_catches_total': ('counter', "Fish looted"),
+    'fishbot_timeouts_total': ('counter', "Casts that timed out without a bite"),
+    'fishbot_bites_total': ('counter', "Bites detected, by detector"),
+    'fishbot_stage_evaluations_total': ('counter', "Bite detector checks run, by cascade stage"),
+    'fishbot_stage_fired_total': ('counter', "Bite detector checks that fired, by cascade stage"),
+    'fishbot_stage_seconds_total': ('counter', "Time spent in bite detector checks, by cascade stage"),
+    'fishbot_frames_total': ('counter', "Frames captured while waiting for a bite"),
+    'fishbot_frames_dropped_total': ('counter', "Frames the detection pipeline skipped because all workers were busy"),
+    'fishbot_capture_seconds_total': ('counter', "Time spent capturing frames"),
+    'fishbot_frame_rate': ('gauge', "Recent frames captured per second"),
+    'fishbot_capture_latency_seconds': ('gauge', "Recent mean capture latency"),
+    'fishbot_running': ('gauge', "1 while the bot is running"),
+    'fishbot_paused': ('gauge', "1 while the bot is paused"),
+    'process_cpu_seconds_total': ('counter', "User and system CPU time of the bot process"),
+}
+
+class BotMetrics:
+    """Counters and gauges written by the bot loop and read as snapshots"""
+    
+    def __init__(self, smoothing: float = 0.1, clock: Callable[[], float] = time.monotonic):
+        self.smoothing = smoothing
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], float] = {}
+        self._last_frame: Optional[float] = None
+    
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+    
+    def frame(self, capture_seconds: float):
+        """Count one captured frame and update the frame rate and latency gauges"""
+        now = self.clock()
+        with self._lock:
+            values = self._values
+            values[('fishbot_frames_total', ())] = values.get(('fishbot_frames_total', ()), 0) + 1
+            values[('fishbot_capture_seconds_total', ())] = (
+                values.get(('fishbot_capture_seconds_total', ()), 0) + capture_seconds)
+            latency = values.get(('fishbot_capture_latency_seconds', ()), capture_seconds)
+            values[('fishbot_capture_latency_seconds', ())] = latency + self.smoothing * (capture_seconds - latency)
+            if self._last_frame is not None and now > self._last_frame:
+                rate = 1.0 / (now - self._last_frame)
+                previous = values.get(('fishbot_frame_rate', ()), rate)
+                values[('fishbot_frame_rate', ())] = previous + self.smoothing * (rate - previous)
+            self._last_frame = now
+    
+    def idle(self):
+        """Forget the last frame time so pauses between casts do not drag the frame rate down"""
+        with self._lock:
+            self._last_frame = None
+    
+    def snapshot(self) -> Dict[Tuple[str, Labels], float]:
+        with self._lock:
+            return dict(self._values)
+
+def render_prometheus(values: Dict[Tuple[str, Labels], float]) -> str:
+    """Prometheus text exposition (format 0.0.4) of a metrics snapshot"""
+    series: Dict[str, list] = {}
+    for (name, labels), value in values.items():
+        series.setdefault(name, []).append((labels, value))
+    
+    lines = []
+    for name in list(METRICS) + sorted(set(series) - set(METRICS)):
+        if name not in series:
+            continue
+        kind, help_text = METRICS.get(name, ('untyped', ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series[name]):
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f"{name}{{{label_text}}} {value!r}" if labels else f"{name} {value!r}")
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """Serves /metrics for a BotMetrics object from a background thread"""
+    
+    def __init__(self, metrics: BotMetrics, port: int, host: str = "127.0.0.1"):
+        self.metrics = metrics
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                values = metrics.snapshot()
+                values[('process_cpu_seconds_total', ())] = time.process_time()
+                body = render_prometheus(values).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+        
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+    
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address[:2]
+    
+    def start(self):
+        self.thread.start()
+        logger.info(f"Metrics available at http://{self.address[0]}:{self.address[1]}/metrics")
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
\ No newline at end of file
@@ -0,0 +1,341 @@
+"""
+Multiprocess capture and detection pipeline for the Fishbot.
+One capture process writes frames into a ring of preallocated slots in a
+multiprocessing.shared_memory block. Detection worker processes run the
+visual cascade stages on those slots in place and send a compact result per
+frame back to the bot over a queue. Pixels never enter the bot process, so a
+heavy detector stack does not compete for the GIL with the Tk GUI or the
+audio thread.
+
+Workers always take the newest frame. Frames that arrive while every worker
+is busy are dropped, not queued, so a result is never older than one
+analysis. A slot is rewritten only after the ring wraps; the slot's sequence
+number is checked again after the analysis, and results for frames
+overwritten in the meantime are discarded.
+
+Sound and other non-visual detectors keep running in the bot process, as
+does bobber tracking: while an ROI window is active, or a recorder is
+attached, the bot reads each analysed frame back from its slot. A lost
+bobber is re-acquired there and the pipeline re-armed on the new window.
+"""
+
+import queue
+import time
+import logging
+import multiprocessing
+import numpy as np
+from dataclasses import dataclass, replace
+from multiprocessing import shared_memory
+from typing import Any, List, Optional, Tuple
+
+from capture import Area, Frame, create_frame_source
+
+logger = logging.getLogger(__name__)
+
+# Per-slot header; seq is -1 while the slot is being written
+HEADER = np.dtype([('seq', 'i8'), ('generation', 'i8'), ('timestamp', 'f8'), ('started', 'f8'),
+                   ('capture', 'f8'), ('area', 'i4', 4), ('shape', 'i4', 2)])
+
+class FrameRing:
+    """Fixed-size BGR frame slots in one shared memory block
+    
+    Created by the owning process and attached by name everywhere else.
+    """
+    
+    def __init__(self, slots: int, max_size: Tuple[int, int], name: Optional[str] = None):
+        width, height = max_size
+        self.slots = slots
+        self.max_size = max_size
+        header_bytes = -(-HEADER.itemsize * slots // 64) * 64
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                              size=header_bytes + slots * height * width * 3)
+        self.header = np.ndarray((slots,), HEADER, buffer=self.shm.buf)
+        self.data = np.ndarray((slots, height, width, 3), np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if self.owner:
+            self.header['seq'] = -1
+    
+    @property
+    def name(self) -> str:
+        return self.shm.name
+    
+    def fits(self, frame: Frame) -> bool:
+        """Whether the frame fits in a slot"""
+        height, width = frame.shape[:2]
+        return width <= self.max_size[0] and height <= self.max_size[1]
+    
+    def write(self, seq: int, generation: int, frame: Frame, started: float, capture_seconds: float):
+        """Copy a captured frame into the slot for `seq`; the frame must fit"""
+        slot = seq % self.slots
+        header = self.header
+        header['seq'][slot] = -1
+        image = frame.bgr
+        height, width = image.shape[:2]
+        np.copyto(self.data[slot, :height, :width], image)
+        header['generation'][slot] = generation
+        header['timestamp'][slot] = frame.timestamp
+        header['started'][slot] = started
+        header['capture'][slot] = capture_seconds
+        header['area'][slot] = frame.area
+        header['shape'][slot] = (height, width)
+        header['seq'][slot] = seq
+    
+    def valid(self, seq: int) -> bool:
+        """Whether the slot still holds frame `seq`"""
+        return seq >= 0 and self.header['seq'][seq % self.slots] == seq
+    
+    def read(self, seq: int, generation: int) -> Optional[Frame]:
+        """Zero-copy Frame over the slot, or None if it no longer holds that frame"""
+        if not self.valid(seq):
+            return None
+        header = self.header[seq % self.slots]
+        if header['generation'] != generation:
+            return None
+        height, width = header['shape']
+        return Frame(self.data[seq % self.slots, :height, :width], tuple(int(v) for v in header['area']),
+                     float(header['timestamp']))
+    
+    def capture_seconds(self, seq: int) -> float:
+        return float(self.header['capture'][seq % self.slots])
+    
+    def started(self, seq: int) -> float:
+        return float(self.header['started'][seq % self.slots])
+    
+    def close(self):
+        # Drop the numpy views first; the buffer cannot be released while they exist
+        self.header = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class PipelineState:
+    """Counters and controls shared by the bot, the capture process and the workers"""
+    
+    def __init__(self, context):
+        self.condition = context.Condition()
+        self.latest = context.Value('q', -1, lock=False)
+        self.claimed = context.Value('q', -1, lock=False)
+        self.dropped = context.Value('q', 0, lock=False)
+        self.torn = context.Value('q', 0)
+        self.oversized = context.Value('q', 0, lock=False)
+        self.generation = context.Value('q', 0)
+        self.area = context.Array('i', 4)
+        self.baseline = context.Value('d', 0.0)
+        self.interval = context.Value('d', 0.1)
+        self.armed = context.Event()
+        self.stop = context.Event()
+    
+    def publish(self, seq: int):
+        """Make frame `seq` the newest one and wake an idle worker"""
+        with self.condition:
+            self.latest.value = seq
+            self.condition.notify()
+    
+    def claim(self, timeout: float) -> Optional[int]:
+        """Take the newest unclaimed frame, counting the ones skipped over as dropped"""
+        with self.condition:
+            if self.latest.value <= self.claimed.value:
+                self.condition.wait(timeout)
+                if self.latest.value <= self.claimed.value:
+                    return None
+            seq = self.latest.value
+            self.dropped.value += seq - self.claimed.value - 1
+            self.claimed.value = seq
+            return seq
+    
+    def skip_to_latest(self):
+        """Forget frames published so far without counting them as dropped"""
+        with self.condition:
+            self.claimed.value = self.latest.value
+
+@dataclass
+class PipelineResult:
+    """What a detection worker found in one frame
+    
+    `started` is time.perf_counter() when the capture began; the counter is
+    system-wide, so the bot can measure its decision latency against it.
+    """
+    generation: int
+    seq: int
+    timestamp: float
+    started: float
+    capture_seconds: float
+    detector: Optional[str]
+    detect_seconds: float
+
+def capture_process(config: Any, ring_name: str, slots: int, max_size: Tuple[int, int], state: PipelineState):
+    """Grab the armed area every `interval` seconds into the ring"""
+    ring = FrameRing(slots, max_size, name=ring_name)
+    source = create_frame_source(config.capture_backend, config.capture_path)
+    seq = state.latest.value
+    try:
+        while not state.stop.is_set():
+            if not state.armed.wait(0.1):
+                continue
+            generation = state.generation.value
+            start = time.perf_counter()
+            frame = source.grab(tuple(state.area[:]))
+            capture_seconds = time.perf_counter() - start
+            if ring.fits(frame):
+                seq += 1
+                ring.write(seq, generation, frame, start, capture_seconds)
+                state.publish(seq)
+            else:
+                # Only a config the pipeline was not started with can ask for more than a slot holds
+                if state.oversized.value == 0:
+                    logger.warning(f"Frame of {frame.shape[1]}x{frame.shape[0]} does not fit the "
+                                   f"{max_size[0]}x{max_size[1]} frame slots; skipping it")
+                state.oversized.value += 1
+            time.sleep(max(state.interval.value - (time.perf_counter() - start), 0))
+    finally:
+        ring.close()
+
+def detection_process(config: Any, ring_name: str, slots: int, max_size: Tuple[int, int],
+                      state: PipelineState, results):
+    """Run the visual cascade stages on the newest frame, one result per frame"""
+    # Imported here because main imports this module; it also loads tkinter and PIL, which the detectors do not use
+    from detectors import DetectorCascade, TickContext
+    from main import VisualDetector
+    
+    config = replace(config, enable_sound_detection=False, detector_workers=0)
+    ring = FrameRing(slots, max_size, name=ring_name)
+    visual = VisualDetector(config)
+    cascade = DetectorCascade.from_config(config)
+    context = TickContext(config, visual, None)
+    frame = previous = None
+    try:
+        while not state.stop.is_set():
+            seq = state.claim(timeout=0.1)
+            if seq is None:
+                continue
+            generation = state.generation.value
+            frame = ring.read(seq, generation)
+            if frame is None:
+                continue
+            previous = ring.read(seq - 1, generation)
+            if previous is not None and previous.shape != frame.shape:
+                previous = None
+            
+            context.frame = frame
+            context.previous_frame = previous
+            context.splash_baseline = state.baseline.value
+            start = time.perf_counter()
+            detector = cascade.evaluate(context)
+            detect_seconds = time.perf_counter() - start
+            context.frame = context.previous_frame = None
+            
+            # The capture process may have lapped the ring while we were reading
+            if not ring.valid(seq) or (previous is not None and not ring.valid(seq - 1)):
+                with state.torn.get_lock():
+                    state.torn.value += 1
+                continue
+            results.put(PipelineResult(generation, seq, frame.timestamp, ring.started(seq),
+                                       ring.capture_seconds(seq), detector.name if detector is not None else None,
+                                       detect_seconds))
+    finally:
+        # Exit even if the bot stopped reading results
+        results.cancel_join_thread()
+        context.frame = context.previous_frame = frame = previous = None
+        ring.close()
+
+class DetectionPipeline:
+    """Capture and visual detection in separate processes, driven by the bot"""
+    
+    def __init__(self, config: Any, workers: int = 1, slots: int = 8):
+        self.config = config
+        self.workers = max(1, workers)
+        # Each worker holds a frame and its predecessor while the capture process writes ahead
+        self.slots = max(slots, 2 * self.workers + 2)
+        area = config.bobber_detection_area
+        self.max_size = (area[2], area[3])
+        self.context = multiprocessing.get_context('spawn')
+        self.state = PipelineState(self.context)
+        self.results = self.context.Queue()
+        self.ring: Optional[FrameRing] = None
+        self.processes: List[multiprocessing.Process] = []
+        self.frames = 0
+    
+    def start(self):
+        """Create the ring and start the capture and detection processes"""
+        self.ring = FrameRing(self.slots, self.max_size)
+        args = (self.config, self.ring.name, self.slots, self.max_size, self.state)
+        self.processes = [self.context.Process(target=capture_process, args=args, name='fishbot-capture',
+                                               daemon=True)]
+        self.processes += [self.context.Process(target=detection_process, args=args + (self.results,),
+                                                name=f'fishbot-detect-{i}', daemon=True)
+                           for i in range(self.workers)]
+        for process in self.processes:
+            process.start()
+        logger.info(f"Detection pipeline started: {self.workers} worker(s), {self.slots} frame slots")
+    
+    @property
+    def generation(self) -> int:
+        return self.state.generation.value
+    
+    @property
+    def dropped(self) -> int:
+        return self.state.dropped.value
+    
+    @property
+    def torn(self) -> int:
+        return self.state.torn.value
+    
+    @property
+    def oversized(self) -> int:
+        return self.state.oversized.value
+    
+    def arm(self, area: Area, baseline: float, interval: float):
+        """Start capturing `area` for a new cast; results of earlier casts are ignored"""
+        state = self.state
+        state.armed.clear()
+        state.skip_to_latest()
+        state.area[:] = list(area)
+        state.baseline.value = baseline
+        state.interval.value = interval
+        with state.generation.get_lock():
+            state.generation.value += 1
+        state.armed.set()
+    
+    def frame(self, result: PipelineResult) -> Optional[Frame]:
+        """Zero-copy Frame over the slot a result was computed from, or None once it is overwritten
+        
+        Copy what is needed and drop the frame before close(); the shared
+        memory cannot be released while views of it exist.
+        """
+        return self.ring.read(result.seq, result.generation) if self.ring is not None else None
+    
+    def disarm(self):
+        """Stop capturing until the next arm()"""
+        self.state.armed.clear()
+    
+    def poll(self, timeout: float = 0.0) -> List[PipelineResult]:
+        """Results for the current cast, waiting up to `timeout` for the first one"""
+        for process in self.processes:
+            if process.exitcode is not None:
+                raise RuntimeError(f"Detection pipeline process {process.name} exited ({process.exitcode})")
+        results = []
+        generation = self.generation
+        block = timeout > 0
+        while True:
+            try:
+                result = self.results.get(block, timeout) if block else self.results.get_nowait()
+            except queue.Empty:
+                break
+            block = False
+            if result.generation == generation:
+                results.append(result)
+        self.frames += len(results)
+        return results
+    
+    def close(self):
+        """Stop the processes and release the shared memory"""
+        self.state.stop.set()
+        self.state.armed.set()
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
\ No newline at end of file
@@ -0,0 +1,513 @@
+"""
+Session recording and replay for offline tuning of the Fishbot detectors.
+A session directory holds every captured frame and audio chunk with its
+monotonic timestamp, plus the bot's cast, bite and loot events:
+
+    session.json   metadata (detection area, frame stride, audio format)
+    frames.idx     fixed-size binary records: timestamp, area and shape per frame
+    frames.dat     raw frames in fixed-stride slots (or frames.z when compressed)
+    audio.idx      fixed-size binary records: timestamp and sample count per chunk
+    audio.dat      raw int16 audio chunks in fixed-stride slots
+    events.jsonl   cast, bite, timeout and loot events
+
+Every frame slot is as large as the full detection area, so frame i lives at
+i * stride and the store is read through np.memmap: a multi-hour session is
+never loaded into memory, and seeking to a cast only touches the pages of
+the frames that are read. Smaller bobber-window frames leave the rest of
+their slot unwritten, which stays sparse on disk. With compression enabled,
+groups of frames are zlib-compressed as one chunk and only the chunk holding
+a requested frame is inflated. All writing happens on a background thread;
+if it falls behind, frames are dropped rather than stalling the bot.
+
+Recording hooks into the existing extension points: RecordingFrameSource wraps
+any FrameSource and the recorder listens on the AudioEngine. SessionReplay
+feeds a recording back as a FrameSource and an AudioInput that share one
+replay clock, either paced in real time or as fast as the detectors run.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+import logging
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from audio_engine import CHUNK, RATE, AudioInput, ChunkCallback
+from capture import Area, Frame, FrameSource
+
+logger = logging.getLogger(__name__)
+
+SESSION_VERSION = 2
+
+FRAME_RECORD = np.dtype([('t', '<f8'), ('x', '<i4'), ('y', '<i4'),
+                         ('height', '<i4'), ('width', '<i4'), ('channels', '<i4')])
+AUDIO_RECORD = np.dtype([('t', '<f8'), ('samples', '<i4')])
+CHUNK_RECORD = np.dtype([('offset', '<i8'), ('size', '<i8')])
+
+class SessionRecorder:
+    """Appends frames, audio chunks and events to a session directory
+    
+    Frames are copied on the capturing thread, because shared-memory frames
+    are only valid until the next grabs, into one of `queue_frames`
+    preallocated slots. Every file write and all compression happen on a
+    writer thread, so neither the polling loop nor the audio callback ever
+    waits for the disk. If the writer falls so far behind that no slot is
+    free, the frame is dropped and counted in `dropped_frames`.
+    
+    With `background` off everything is written on the calling thread
+    instead, which suits offline writers that must not lose frames.
+    """
+    
+    def __init__(self, path: str, detection_area: Area, sample_rate: int = RATE, chunk_size: int = CHUNK,
+                 compress: bool = False, frames_per_chunk: int = 16, background: bool = True,
+                 queue_frames: int = 8):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # Room for a BGRA capture of the whole detection area
+        self.frame_stride = int(detection_area[2]) * int(detection_area[3]) * 4
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.frames_per_chunk = frames_per_chunk
+        self.background = background
+        self.metadata = {
+            "version": SESSION_VERSION,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "detection_area": list(detection_area),
+            "frame_stride": self.frame_stride,
+            "compression": "zlib" if compress else None,
+            "frames_per_chunk": frames_per_chunk,
+            "sample_rate": sample_rate,
+            "chunk_size": chunk_size,
+        }
+        with open(os.path.join(path, 'session.json'), 'w') as f:
+            json.dump(self.metadata, f, indent=4)
+        
+        self._frames = open(os.path.join(path, 'frames.z' if compress else 'frames.dat'), 'wb')
+        self._frame_index = open(os.path.join(path, 'frames.idx'), 'wb')
+        self._audio_index = open(os.path.join(path, 'audio.idx'), 'wb')
+        self._audio = open(os.path.join(path, 'audio.dat'), 'wb')
+        self._events = open(os.path.join(path, 'events.jsonl'), 'w')
+        self._chunk_index = open(os.path.join(path, 'chunks.idx'), 'wb') if compress else None
+        self._frame_record = np.zeros(1, dtype=FRAME_RECORD)
+        self._audio_record = np.zeros(1, dtype=AUDIO_RECORD)
+        self._chunk_record = np.zeros(1, dtype=CHUNK_RECORD)
+        self._audio_slot = np.zeros(chunk_size, dtype=np.int16)
+        # Compressed chunks keep the fixed-stride layout; the gaps are streamed from here
+        self._padding = np.zeros(self.frame_stride, dtype=np.uint8) if compress else None
+        self._compressor = None
+        self._chunk_start = 0
+        self._lock = threading.Lock()
+        self.frame_count = 0
+        self.audio_count = 0
+        self.dropped_frames = 0
+        self.closed = False
+        
+        self._writer = None
+        if background:
+            # Slots go to the writer with their frame and come back once it is on disk
+            self._spare: "queue.Queue[np.ndarray]" = queue.Queue()
+            for _ in range(queue_frames):
+                self._spare.put(np.empty(self.frame_stride, dtype=np.uint8))
+            self._pending: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+            self._writer = threading.Thread(target=self._run, name='session-writer', daemon=True)
+            self._writer.start()
+    
+    def _run(self):
+        """Writer thread: everything that touches the files"""
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            kind, *args = item
+            try:
+                if kind == 'frame':
+                    slot, record = args
+                    try:
+                        self._write_frame(slot[:self._record_bytes(record)], record)
+                    finally:
+                        self._spare.put(slot)
+                elif kind == 'audio':
+                    self._write_audio(*args)
+                else:
+                    self._events.write(args[0])
+            except Exception as e:
+                logger.error(f"Error writing session {self.path}: {e}")
+    
+    @staticmethod
+    def _record_bytes(record: np.ndarray) -> int:
+        height, width, channels = record[0][['height', 'width', 'channels']].tolist()
+        return height * width * channels
+    
+    def _write_frame(self, data: np.ndarray, record: np.ndarray):
+        """Append one frame's bytes and index record"""
+        if self.compress:
+            if self._compressor is None:
+                self._compressor = zlib.compressobj(1)
+                self._chunk_start = self._frames.tell()
+            self._frames.write(self._compressor.compress(data.data))
+            self._frames.write(self._compressor.compress(self._padding[:self.frame_stride - data.nbytes].data))
+            if (self.frame_count + 1) % self.frames_per_chunk == 0:
+                self._finish_chunk()
+        else:
+            # Only the frame's own bytes; the rest of its slot stays sparse
+            self._frames.seek(self.frame_count * self.frame_stride)
+            self._frames.write(data.data)
+        self._frame_index.write(record.tobytes())
+        self.frame_count += 1
+    
+    def _finish_chunk(self):
+        """Close the zlib stream of the current chunk and index it"""
+        self._frames.write(self._compressor.flush())
+        self._chunk_record['offset'] = self._chunk_start
+        self._chunk_record['size'] = self._frames.tell() - self._chunk_start
+        self._chunk_index.write(self._chunk_record.tobytes())
+        self._compressor = None
+    
+    def _write_audio(self, samples: np.ndarray, timestamp: float):
+        count = len(samples)
+        self._audio_slot[:count] = samples
+        self._audio_slot[count:] = 0
+        self._audio.write(self._audio_slot.data)
+        self._audio_record[0] = (timestamp, count)
+        self._audio_index.write(self._audio_record.tobytes())
+        self.audio_count += 1
+    
+    def record_frame(self, frame: Frame):
+        """Store a captured frame with its area and timestamp"""
+        image = frame.image
+        if image.nbytes > self.frame_stride:
+            logger.warning(f"Frame {image.shape} is larger than the detection area, not recorded")
+            return
+        channels = image.shape[2] if image.ndim == 3 else 1
+        x, y = frame.area[:2] if frame.area else (0, 0)
+        record = np.zeros(1, dtype=FRAME_RECORD)
+        record[0] = (frame.timestamp, x, y, image.shape[0], image.shape[1], channels)
+        
+        with self._lock:
+            if self.closed:
+                return
+            if not self.background:
+                self._write_frame(np.ascontiguousarray(image).reshape(-1).view(np.uint8), record)
+                return
+            try:
+                slot = self._spare.get_nowait()
+            except queue.Empty:
+                self.dropped_frames += 1
+                if self.dropped_frames == 1 or self.dropped_frames % 100 == 0:
+                    logger.warning(f"Session writer is behind, {self.dropped_frames} frame(s) not recorded")
+                return
+            slot[:image.nbytes].reshape(image.shape)[...] = image
+            self._pending.put(('frame', slot, record))
+    
+    def record_audio(self, samples: np.ndarray, timestamp: float):
+        """Store one audio chunk; usable directly as an AudioEngine listener"""
+        samples = samples[:self.chunk_size]
+        with self._lock:
+            if self.closed:
+                return
+            if self.background:
+                self._pending.put(('audio', samples.copy(), timestamp))
+            else:
+                self._write_audio(samples, timestamp)
+    
+    def record_event(self, event: str, timestamp: Optional[float] = None, **data):
+        """Store a bot event such as cast, bite, timeout or loot"""
+        record = {"t": time.monotonic() if timestamp is None else timestamp, "event": event}
+        record.update(data)
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            if self.closed:
+                return
+            if self.background:
+                self._pending.put(('event', line))
+            else:
+                self._events.write(line)
+    
+    def close(self):
+        """Write out everything queued, then close the files"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join()
+        if self.compress:
+            if self._compressor is not None:
+                self._finish_chunk()
+            self._chunk_index.close()
+        else:
+            # Full-size last slot, so the store maps as (frames, stride)
+            self._frames.truncate(self.frame_count * self.frame_stride)
+        for f in (self._frames, self._frame_index, self._audio_index, self._audio, self._events):
+            f.close()
+        dropped = f", {self.dropped_frames} dropped" if self.dropped_frames else ""
+        logger.info(f"Recorded {self.frame_count} frames and {self.audio_count} audio chunks "
+                    f"to {self.path}{dropped}")
+
+class RecordingFrameSource(FrameSource):
+    """Passes frames through from another source and hands each one to recorders
+    
+    A recorder is anything with a record_frame(frame) method, such as a
+    SessionRecorder or a FlightRecorder.
+    """
+    
+    def __init__(self, source: FrameSource, recorders: List[Any]):
+        self.source = source
+        self.recorders = recorders
+    
+    def grab(self, area: Area) -> Frame:
+        frame = self.source.grab(area)
+        for recorder in self.recorders:
+            recorder.record_frame(frame)
+        return frame
+    
+    def close(self):
+        self.source.close()
+
+class Session:
+    """Memory-mapped read access to a recorded session
+    
+    Only the indexes are read up front; frames and audio are views into the
+    mapped files (or one inflated chunk for compressed sessions).
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'session.json'), 'r') as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("version") != SESSION_VERSION:
+            raise ValueError(f"Unsupported session version {self.metadata.get('version')} in {path}")
+        self.sample_rate = self.metadata["sample_rate"]
+        self.chunk_size = self.metadata["chunk_size"]
+        self.frame_stride = self.metadata["frame_stride"]
+        self.compression = self.metadata.get("compression")
+        self.frames_per_chunk = self.metadata.get("frames_per_chunk", 16)
+        
+        self.frame_index = self._map('frames.idx', FRAME_RECORD)
+        self.audio_index = self._map('audio.idx', AUDIO_RECORD)
+        if self.compression:
+            self.chunk_index = self._map('chunks.idx', CHUNK_RECORD)
+            self._chunk_cache: Dict[int, np.ndarray] = {}
+            # A frame is only readable once its chunk was written
+            self.frame_index = self.frame_index[:len(self.chunk_index) * self.frames_per_chunk]
+            self._frames = None
+        else:
+            self._frames = self._map('frames.dat', np.uint8, (-1, self.frame_stride))
+            self.frame_index = self.frame_index[:len(self._frames)]
+        self._audio = self._map('audio.dat', np.int16, (-1, self.chunk_size))
+        self.audio_index = self.audio_index[:len(self._audio)]
+        self.frame_times = self.frame_index['t']
+        self.audio_times = self.audio_index['t']
+        
+        self.events = []
+        with open(os.path.join(path, 'events.jsonl'), 'r') as f:
+            for line in f:
+                self.events.append(json.loads(line))
+    
+    def _map(self, name: str, dtype, shape: Tuple[int, ...] = (-1,)) -> np.ndarray:
+        """Read-only memmap of whole records in a session file (empty if there are none)"""
+        filename = os.path.join(self.path, name)
+        record_size = np.dtype(dtype).itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        count = os.path.getsize(filename) // record_size if os.path.exists(filename) else 0
+        if count == 0:
+            return np.zeros((0,) + tuple(shape[1:]), dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode='r', shape=(count,) + tuple(shape[1:]))
+    
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_index)
+    
+    @property
+    def audio_count(self) -> int:
+        return len(self.audio_index)
+    
+    @property
+    def start_time(self) -> float:
+        times = [t[0] for t in (self.frame_times, self.audio_times) if len(t)]
+        times += [event["t"] for event in self.events[:1]]
+        return min(times) if times else 0.0
+    
+    def _chunk(self, number: int) -> np.ndarray:
+        """Inflated frame chunk; the last couple are cached for sequential reads"""
+        if number not in self._chunk_cache:
+            offset, size = self.chunk_index[number]
+            with open(os.path.join(self.path, 'frames.z'), 'rb') as f:
+                f.seek(int(offset))
+                data = zlib.decompress(f.read(int(size)))
+            if len(self._chunk_cache) >= 2:
+                self._chunk_cache.pop(next(iter(self._chunk_cache)))
+            self._chunk_cache[number] = np.frombuffer(data, dtype=np.uint8).reshape(-1, self.frame_stride)
+        return self._chunk_cache[number]
+    
+    def frame(self, index: int) -> Frame:
+        """Frame `index` as recorded, with its original area and timestamp"""
+        t, x, y, height, width, channels = self.frame_index[index].tolist()
+        if self.compression:
+            slot = self._chunk(index // self.frames_per_chunk)[index % self.frames_per_chunk]
+        else:
+            slot = self._frames[index]
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        image = slot[:height * width * channels].reshape(shape)
+        return Frame(image, (x, y, width, height), timestamp=t)
+    
+    def frames_between(self, start: float, end: float) -> range:
+        """Indices of the frames captured in [start, end)"""
+        return range(int(np.searchsorted(self.frame_times, start)), int(np.searchsorted(self.frame_times, end)))
+    
+    def audio_chunk(self, index: int) -> np.ndarray:
+        return self._audio[index, :self.audio_index['samples'][index]]
+    
+    def audio_between(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Audio chunks recorded in [start, end) as (samples, timestamps) views"""
+        first, last = np.searchsorted(self.audio_times, [start, end])
+        return self._audio[first:last], self.audio_times[first:last]
+    
+    def casts(self) -> List[Dict[str, Any]]:
+        """One entry per cast with the recorded outcome
+        
+        Each cast spans from its cast event to the next one (or the end of the
+        recording), so a replay can run on past the recorded bite.
+        """
+        casts = []
+        for event in self.events:
+            name = event["event"]
+            if name == "cast":
+                casts.append({"start": event["t"], "end": None, "outcome": None, "bite": None, "detector": None})
+            elif casts and casts[-1]["outcome"] is None and name in ("bite", "timeout"):
+                casts[-1]["outcome"] = name
+                if name == "bite":
+                    casts[-1]["bite"] = event["t"]
+                    casts[-1]["detector"] = event.get("detector")
+        
+        # Just past the last sample, so the frame the last bite was detected in is part of its cast
+        last = max(self.frame_times.max(initial=0.0), self.audio_times.max(initial=0.0))
+        end_time = float(np.nextafter(last, np.inf))
+        for cast, following in zip(casts, casts[1:] + [None]):
+            cast["end"] = following["start"] if following else end_time
+        return casts
+
+class SessionReplay:
+    """Feeds a recorded session back through a FrameSource and an AudioInput
+    
+    Both share one replay clock in the recording's timeline. In fast mode
+    each grab advances the clock to the next recorded frame and delivers the
+    audio recorded up to that moment on the grabbing thread, so a replay is
+    deterministic. In real-time mode grabs wait for the frame's due time and
+    audio is delivered from its own paced thread.
+    """
+    
+    def __init__(self, session: Session, realtime: bool = False):
+        self.session = session
+        self.realtime = realtime
+        self.now = session.start_time
+        self.frame_source = ReplayFrameSource(self)
+        self.audio_input = ReplayAudioInput(self)
+        self._frame_index = 0
+        self._audio_index = 0
+        self._wall_start = time.monotonic()
+        self._replay_start = self.now
+    
+    def seek(self, timestamp: float):
+        """Continue the replay from `timestamp` in the recording"""
+        self._frame_index = int(np.searchsorted(self.session.frame_times, timestamp))
+        self._audio_index = int(np.searchsorted(self.session.audio_times, timestamp))
+        self.now = timestamp
+        self._wall_start = time.monotonic()
+        self._replay_start = timestamp
+    
+    def wall_delay(self, timestamp: float) -> float:
+        """Seconds of wall time until `timestamp` is due in real-time mode"""
+        return (timestamp - self._replay_start) - (time.monotonic() - self._wall_start)
+    
+    def deliver_audio(self, until: float):
+        """Push recorded audio chunks up to `until` (fast mode)"""
+        callback = self.audio_input.callback
+        times = self.session.audio_times
+        while self._audio_index < len(times) and times[self._audio_index] <= until:
+            if callback is not None:
+                callback(self.session.audio_chunk(self._audio_index), times[self._audio_index])
+            self._audio_index += 1
+    
+    def next_frame(self) -> Frame:
+        if self._frame_index >= self.session.frame_count:
+            raise EOFError("End of recorded session")
+        frame = self.session.frame(self._frame_index)
+        self._frame_index += 1
+        if self.realtime:
+            delay = self.wall_delay(frame.timestamp)
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            self.deliver_audio(frame.timestamp)
+        self.now = frame.timestamp
+        return frame
+
+class ReplayFrameSource(FrameSource):
+    """Recorded frames in order, cropped to the requested area when it lies inside
+    
+    Frames whose recorded area does not contain the requested one (e.g. a
+    bobber window recorded where the new code asks for the full area) are
+    returned as recorded.
+    """
+    
+    def __init__(self, replay: SessionReplay):
+        self.replay = replay
+    
+    def grab(self, area: Area) -> Frame:
+        frame = self.replay.next_frame()
+        if frame.area is None or tuple(frame.area) == tuple(area):
+            return frame
+        
+        rx, ry = frame.area[:2]
+        x, y, w, h = area
+        height, width = frame.image.shape[:2]
+        if rx <= x and ry <= y and x + w <= rx + width and y + h <= ry + height:
+            image = frame.image[y - ry:y - ry + h, x - rx:x - rx + w]
+            return Frame(image, area, timestamp=frame.timestamp)
+        return frame
+
+class ReplayAudioInput(AudioInput):
+    """Recorded audio chunks for an AudioEngine, with their recorded timestamps"""
+    
+    def __init__(self, replay: SessionReplay):
+        self.replay = replay
+        self.sample_rate = replay.session.sample_rate
+        self.chunk_size = replay.session.metadata.get("chunk_size", CHUNK)
+        self.callback: Optional[ChunkCallback] = None
+        self._running = False
+        self._thread = None
+    
+    def _run(self):
+        """Real-time delivery, paced against the replay clock"""
+        replay = self.replay
+        times = replay.session.audio_times
+        while self._running and replay._audio_index < len(times):
+            delay = replay.wall_delay(times[replay._audio_index])
+            if delay > 0:
+                time.sleep(min(delay, 0.05))
+                continue
+            self.callback(replay.session.audio_chunk(replay._audio_index), times[replay._audio_index])
+            replay._audio_index += 1
+    
+    def start(self, callback: ChunkCallback):
+        self.callback = callback
+        if self.replay.realtime:
+            self._running = True
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+    
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.callback = None
+
+def new_session_path(directory: str) -> str:
+    """Timestamped session directory inside `directory`"""
+    return os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S"))
\ No newline at end of file
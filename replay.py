@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded session through the Fishbot detectors.
+Each recorded cast is fed back through VisualDetector and SoundDetector with
+the current configuration, and the replayed bite is compared with the one
+the bot detected live. No game needs to be running.
+
+    python replay.py recordings/session-20240101-120000
+    python replay.py SESSION --config fishbot_config.json --realtime
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from dataclasses import replace
+from typing import Optional, Tuple
+
+from audio_engine import AudioEngine
+from detectors import BiteWatch, DetectorCascade
+from instrumentation import Instrumentation
+from main import FishbotConfig, SoundDetector, VisualDetector, setup_logging
+from recording import Session, SessionReplay
+
+def replay_cast(replay: SessionReplay, visual: VisualDetector, sound: SoundDetector,
+                config: FishbotConfig, end: float,
+                instruments: Optional[Instrumentation] = None) -> Tuple[Optional[str], Optional[float]]:
+    """Run the bite checks of wait_for_bite over one cast; returns (detector, time)
+    
+    The cast goes through the same BiteWatch as the live bot, so the frames
+    the bot grabbed to locate the bobber are consumed the same way and the
+    analysis window and splash baseline follow the recording. With
+    `instruments`, frames read and the time spent in each detector are
+    recorded as the capture/detect_* stages.
+    """
+    instruments = instruments or Instrumentation()
+    cascade = DetectorCascade.from_config(config, instruments=instruments)
+    watch = BiteWatch(config, visual, sound, cascade, instruments)
+    
+    try:
+        watch.begin()
+        while True:
+            # Frames drive the replay clock, so capture even with visual detection off
+            with instruments.timer('capture'):
+                frame = visual.capture_frame(watch.analysis_area)
+            if frame.timestamp >= end:
+                return None, None
+            
+            detector = watch.check(frame if config.enable_visual_detection else None)
+            if detector is not None:
+                return detector.name, frame.timestamp if detector.needs_frame else replay.now
+    except EOFError:
+        return None, None
+    finally:
+        cascade.close()
+        sound.stop_listening()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Replay a recorded Fishbot session through the detectors")
+    parser.add_argument('session', help="session directory written with record_dir")
+    parser.add_argument('--config', help="config file to replay with (default: built-in defaults)")
+    parser.add_argument('--realtime', action='store_true', help="pace the replay at the recorded speed")
+    parser.add_argument('--no-sound', action='store_true', help="replay visual detection only")
+    args = parser.parse_args()
+    setup_logging()
+    
+    config = FishbotConfig()
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = FishbotConfig(**json.load(f))
+    if args.no_sound:
+        config = replace(config, enable_sound_detection=False)
+    
+    session = Session(args.session)
+    casts = session.casts()
+    print(f"{args.session}: {session.frame_count} frames, {session.audio_count} audio chunks, {len(casts)} casts")
+    
+    replay = SessionReplay(session, realtime=args.realtime)
+    visual = VisualDetector(config, frame_source=replay.frame_source)
+    sound = SoundDetector(config, AudioEngine(replay.audio_input))
+    
+    print(f"{'cast':>4} {'recorded':<18} {'replayed':<18} {'delta s':>8}")
+    agree = 0
+    deltas = []
+    start = time.perf_counter()
+    for number, cast in enumerate(casts, 1):
+        replay.seek(cast["start"])
+        detector, detected_at = replay_cast(replay, visual, sound, config, cast["end"])
+        
+        recorded = f"{cast['detector'] or cast['outcome'] or '-'}"
+        if cast["bite"] is not None:
+            recorded += f" @{cast['bite'] - cast['start']:.2f}"
+        replayed = "-" if detector is None else f"{detector} @{detected_at - cast['start']:.2f}"
+        delta = ""
+        if detected_at is not None and cast["bite"] is not None:
+            deltas.append(detected_at - cast["bite"])
+            delta = f"{deltas[-1]:+8.2f}"
+        agree += (detector is None) == (cast["bite"] is None)
+        print(f"{number:>4} {recorded:<18} {replayed:<18} {delta:>8}")
+    elapsed = time.perf_counter() - start
+    sound.close()
+    
+    print(f"Agreement with the live run: {agree}/{len(casts)} casts")
+    if deltas:
+        print(f"Replayed minus recorded bite time: mean {np.mean(deltas):+.2f} s, "
+              f"max {np.max(np.abs(deltas)):.2f} s")
+    print(f"Replayed in {elapsed:.1f} s")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
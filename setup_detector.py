@@ -10,7 +10,12 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
 import os
+import time
 from PIL import Image, ImageTk
+from audio_detectors import extract_splash_clip
+from audio_engine import CHUNK, RATE, AudioEngine, read_wav, write_wav
+from capture import create_frame_source
+from template_matching import crop_from_difference
 
 class FishbotSetup:
     """Setup utility for configuring the fishbot"""
@@ -18,10 +23,19 @@ class FishbotSetup:
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Fishbot Setup")
-        self.root.geometry("800x600")
+        self.root.geometry("800x800")
         
         self.detection_area = (400, 200, 800, 600)  # x, y, width, height
+        self.frame_source = create_frame_source()
         self.screenshot = None
+        self.area_capture = None
+        self.before_capture = None
+        self.crop_box = None  # x, y, w, h inside the detection area
+        self.crop_method = None
+        self.drag_start = None
+        self.splash_clip = None
+        self.splash_rate = None
+        self.splash_source = None
         self.setup_gui()
         
     def setup_gui(self):
@@ -71,26 +85,55 @@ class FishbotSetup:
         ttk.Button(screenshot_frame, text="Capture Detection Area", command=self.capture_detection_area).grid(row=0, column=1, padx=(0, 10))
         ttk.Button(screenshot_frame, text="Save Bobber Template", command=self.save_bobber_template).grid(row=0, column=2)
         
-        # Preview canvas
+        ttk.Button(screenshot_frame, text="Capture Before Cast", command=self.capture_before_cast).grid(row=1, column=0, padx=(0, 10), pady=(10, 0))
+        ttk.Button(screenshot_frame, text="Auto-Crop Bobber", command=self.auto_crop_bobber).grid(row=1, column=1, padx=(0, 10), pady=(10, 0))
+        
+        ttk.Label(screenshot_frame, text="Template Name:").grid(row=2, column=0, sticky=tk.W, pady=(10, 0))
+        self.template_name_var = tk.StringVar(value="bobber")
+        ttk.Entry(screenshot_frame, textvariable=self.template_name_var, width=20).grid(row=2, column=1, sticky=tk.W, pady=(10, 0))
+        
+        # Splash sound frame; recorded clips are used by the matched-filter sound detector
+        sound_frame = ttk.LabelFrame(main_frame, text="Splash Sound", padding="10")
+        sound_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Button(sound_frame, text="Record Splash", command=self.record_splash_sound).grid(row=0, column=0, padx=(0, 10))
+        ttk.Button(sound_frame, text="Load Recording", command=self.load_splash_recording).grid(row=0, column=1, padx=(0, 10))
+        ttk.Button(sound_frame, text="Save Splash Sound", command=self.save_splash_sound).grid(row=0, column=2)
+        
+        ttk.Label(sound_frame, text="Seconds:").grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
+        self.record_seconds_var = tk.IntVar(value=10)
+        ttk.Entry(sound_frame, textvariable=self.record_seconds_var, width=10).grid(row=1, column=1, sticky=tk.W, pady=(10, 0))
+        ttk.Label(sound_frame, text="Sound Name:").grid(row=2, column=0, sticky=tk.W, pady=(10, 0))
+        self.sound_name_var = tk.StringVar(value="splash")
+        ttk.Entry(sound_frame, textvariable=self.sound_name_var, width=20).grid(row=2, column=1, sticky=tk.W, pady=(10, 0))
+        self.sound_status_var = tk.StringVar(value="No splash sound captured")
+        ttk.Label(sound_frame, textvariable=self.sound_status_var).grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
+        
+        # Preview canvas; drag on a captured area to select the bobber
         self.canvas = tk.Canvas(main_frame, width=600, height=300, bg='lightgray')
-        self.canvas.grid(row=3, column=0, columnspan=3, pady=(10, 0))
+        self.canvas.grid(row=4, column=0, columnspan=3, pady=(10, 0))
+        self.canvas.bind("<ButtonPress-1>", self.start_crop_drag)
+        self.canvas.bind("<B1-Motion>", self.update_crop_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.finish_crop_drag)
         
         # Instructions
         instructions_frame = ttk.LabelFrame(main_frame, text="Instructions", padding="10")
-        instructions_frame.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
+        instructions_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
         
         instructions_text = """1. Position your Game window and cast your fishing line
 2. Adjust the detection area to cover the water where your bobber appears
 3. Take a screenshot to preview the area
-4. Capture the detection area when your bobber is visible
+4. Capture Before Cast, cast your line, then Auto-Crop Bobber
+   (or Capture Detection Area and drag a box around the bobber)
 5. Save the bobber template for better detection
-6. The bot will use this configuration for automated fishing"""
+6. Optionally Record Splash, catch a fish while it records, then Save Splash Sound
+7. The bot will use this configuration for automated fishing"""
         
         ttk.Label(instructions_frame, text=instructions_text, justify=tk.LEFT).grid(row=0, column=0, sticky=tk.W)
         
         # Save/Load buttons
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=5, column=0, columnspan=3, pady=(10, 0))
+        button_frame.grid(row=6, column=0, columnspan=3, pady=(10, 0))
         
         ttk.Button(button_frame, text="Save Configuration", command=self.save_config).grid(row=0, column=0, padx=(0, 10))
         ttk.Button(button_frame, text="Load Configuration", command=self.load_config).grid(row=0, column=1)
@@ -156,8 +199,8 @@ class FishbotSetup:
     def capture_detection_area(self):
         """Capture just the detection area"""
         try:
-            x, y, w, h = self.detection_area
-            area_screenshot = pyautogui.screenshot(region=(x, y, w, h))
+            frame = self.frame_source.grab(self.detection_area)
+            area_screenshot = Image.fromarray(cv2.cvtColor(frame.bgr, cv2.COLOR_BGR2RGB))
             
             # Display in canvas
             canvas_width = 600
@@ -170,34 +213,196 @@ class FishbotSetup:
             
             # Save for template creation
             self.area_screenshot = area_screenshot
+            self.area_capture = frame.bgr.copy()
+            self.capture_area = self.detection_area
+            self.crop_box = None
+            self.crop_method = None
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to capture detection area: {e}")
     
+    def capture_before_cast(self):
+        """Capture the empty water so the bobber can be found by differencing"""
+        try:
+            frame = self.frame_source.grab(self.detection_area)
+            self.before_capture = frame.bgr.copy()
+            messagebox.showinfo("Before Cast", "Water captured. Now cast your line and click Auto-Crop Bobber.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to capture detection area: {e}")
+    
+    def auto_crop_bobber(self):
+        """Capture the area with the bobber and crop it from the before-cast difference"""
+        if self.before_capture is None:
+            messagebox.showwarning("Warning", "Please capture the water before casting first")
+            return
+        
+        self.capture_detection_area()
+        if self.area_capture is None:
+            return
+        
+        crop_box = crop_from_difference(self.before_capture, self.area_capture)
+        if crop_box is None:
+            messagebox.showwarning("Warning", "No bobber found in the difference. Drag a box around it instead.")
+            return
+        
+        self.crop_box = crop_box
+        self.crop_method = "difference"
+        self.draw_crop_box()
+    
+    def canvas_scale(self):
+        """Detection-area pixels per canvas pixel (x, y)"""
+        height, width = self.area_capture.shape[:2]
+        return width / 600, height / 300
+    
+    def draw_crop_box(self):
+        """Draw the current crop box on the canvas"""
+        self.canvas.delete("crop")
+        if self.crop_box is None:
+            return
+        scale_x, scale_y = self.canvas_scale()
+        x, y, w, h = self.crop_box
+        self.canvas.create_rectangle(x / scale_x, y / scale_y, (x + w) / scale_x, (y + h) / scale_y,
+                                     outline="red", width=2, tags="crop")
+    
+    def start_crop_drag(self, event):
+        """Start selecting a bobber box on the captured area"""
+        if self.area_capture is not None:
+            self.drag_start = (event.x, event.y)
+    
+    def update_crop_drag(self, event):
+        """Rubber-band the selection while dragging"""
+        if self.drag_start is None:
+            return
+        self.canvas.delete("crop")
+        self.canvas.create_rectangle(*self.drag_start, event.x, event.y, outline="red", width=2, tags="crop")
+    
+    def finish_crop_drag(self, event):
+        """Convert the dragged canvas box into detection-area coordinates"""
+        if self.drag_start is None:
+            return
+        scale_x, scale_y = self.canvas_scale()
+        height, width = self.area_capture.shape[:2]
+        x0, x1 = sorted((self.drag_start[0], event.x))
+        y0, y1 = sorted((self.drag_start[1], event.y))
+        self.drag_start = None
+        
+        x0, x1 = max(0, int(x0 * scale_x)), min(width, int(round(x1 * scale_x)))
+        y0, y1 = max(0, int(y0 * scale_y)), min(height, int(round(y1 * scale_y)))
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            self.canvas.delete("crop")
+            return
+        
+        self.crop_box = (x0, y0, x1 - x0, y1 - y0)
+        self.crop_method = "manual"
+        self.draw_crop_box()
+    
     def save_bobber_template(self):
-        """Save a bobber template from the current area screenshot"""
-        if not hasattr(self, 'area_screenshot'):
+        """Save a tight bobber template and its metadata from the captured area"""
+        if self.area_capture is None:
             messagebox.showwarning("Warning", "Please capture the detection area first")
             return
+        if self.crop_box is None:
+            messagebox.showwarning("Warning", "Drag a box around the bobber or use Auto-Crop Bobber first")
+            return
+        # The bot skips templates named splash*, so such a bobber template would never be used
+        if self.template_name_var.get().strip().lower().startswith('splash'):
+            messagebox.showwarning("Warning", "Template names starting with 'splash' are reserved for the "
+                                   "splash template; please choose another name")
+            return
         
         try:
             # Create templates directory if it doesn't exist
             os.makedirs('templates', exist_ok=True)
             
-            # Save the area screenshot as bobber template
-            template_path = 'templates/bobber.png'
-            self.area_screenshot.save(template_path)
+            name = self.template_name_var.get().strip() or "bobber"
+            template_path = f'templates/{name}.png'
+            x, y, w, h = self.crop_box
+            cv2.imwrite(template_path, self.area_capture[y:y + h, x:x + w])
             
-            # Also save as numpy array for OpenCV
-            import cv2
-            cv_image = cv2.cvtColor(np.array(self.area_screenshot), cv2.COLOR_RGB2BGR)
-            cv2.imwrite('templates/bobber_cv.png', cv_image)
+            # Metadata next to the image; the bot only loads the image itself
+            area_x, area_y = self.capture_area[:2]
+            metadata = {
+                "source_area": list(self.capture_area),
+                "crop": [x, y, w, h],
+                "screen_position": [area_x + x, area_y + y],
+                "size": [w, h],
+                "scale": 1.0,
+                "method": self.crop_method,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            with open(f'templates/{name}.json', 'w') as f:
+                json.dump(metadata, f, indent=4)
             
-            messagebox.showinfo("Success", f"Bobber template saved to {template_path}")
+            messagebox.showinfo("Success", f"Bobber template ({w}x{h}) saved to {template_path}")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save template: {e}")
     
+    def record_splash_sound(self):
+        """Record game audio for a few seconds; catch a fish while it runs"""
+        seconds = max(1, self.record_seconds_var.get())
+        engine = AudioEngine(capacity=seconds * RATE // CHUNK + 8)
+        if not engine.start():
+            messagebox.showerror("Error", "Could not open the audio input (is PyAudio installed?)")
+            return
+        self.sound_status_var.set(f"Recording for {seconds} s... catch a fish now")
+        self.root.after(seconds * 1000, lambda: self.finish_splash_recording(engine))
+    
+    def finish_splash_recording(self, engine: AudioEngine):
+        """Stop recording and cut the splash out of it"""
+        chunks, _, _ = engine.read(0)
+        engine.stop()
+        self.set_splash_recording(chunks.ravel(), engine.sample_rate, "recorded")
+    
+    def load_splash_recording(self):
+        """Cut the splash out of an existing 16-bit WAV recording"""
+        filename = filedialog.askopenfilename(filetypes=[("WAV files", "*.wav"), ("All files", "*.*")])
+        if not filename:
+            return
+        try:
+            samples, rate = read_wav(filename)
+            self.set_splash_recording(samples, rate, os.path.basename(filename))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load recording: {e}")
+    
+    def set_splash_recording(self, samples: np.ndarray, rate: int, source: str):
+        """Keep the loudest event of a recording as the splash clip"""
+        if len(samples) == 0:
+            self.sound_status_var.set("Nothing was recorded")
+            return
+        self.splash_clip = extract_splash_clip(samples, rate)
+        self.splash_rate = rate
+        self.splash_source = source
+        peak = int(np.abs(self.splash_clip.astype(np.int32)).max())
+        self.sound_status_var.set(f"Captured {len(self.splash_clip) / rate:.2f} s clip (peak {peak}) "
+                                  f"from {source}; save it if that was the splash")
+    
+    def save_splash_sound(self):
+        """Save the captured splash clip and its metadata to templates/sounds"""
+        if self.splash_clip is None:
+            messagebox.showwarning("Warning", "Record or load a splash first")
+            return
+        
+        try:
+            os.makedirs('templates/sounds', exist_ok=True)
+            name = self.sound_name_var.get().strip() or "splash"
+            sound_path = f'templates/sounds/{name}.wav'
+            write_wav(sound_path, self.splash_clip, self.splash_rate)
+            
+            metadata = {
+                "sample_rate": self.splash_rate,
+                "duration": len(self.splash_clip) / self.splash_rate,
+                "source": self.splash_source,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            with open(f'templates/sounds/{name}.json', 'w') as f:
+                json.dump(metadata, f, indent=4)
+            
+            messagebox.showinfo("Success", f"Splash sound saved to {sound_path}")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save splash sound: {e}")
+    
     def save_config(self):
         """Save the current configuration"""
         try:
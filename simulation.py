@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Deterministic simulation of the full Fishbot loop.
+FishBot runs unchanged against a scripted game world on a virtual clock:
+casting schedules a bite, the world draws the splash into synthetic frames
+and mixes a splash sound into the audio, and looting is scored against the
+bite window. Sleeping only advances the clock, so a cycle costs only the
+bot's own compute (a few to a few tens of milliseconds, mostly detectors)
+and every timing is exact.
+
+    python simulation.py --cycles 1000
+    python simulation.py --cycles 200 --no-visual --config fishbot_config.json
+"""
+
+import argparse
+import json
+import logging
+import time
+import numpy as np
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence
+
+from audio_engine import CHUNK, RATE, AudioEngine, AudioInput
+from backends import InputBackend, VirtualClock
+from capture import Area, Frame, SyntheticFrameSource
+from main import FishBot, FishbotConfig, setup_logging
+
+logger = logging.getLogger(__name__)
+
+def band_noise(rng: np.random.Generator, length: int, sample_rate: int, low: float, high: float) -> np.ndarray:
+    """White noise restricted to [low, high) Hz, normalised to unit RMS"""
+    spectrum = np.fft.rfft(rng.standard_normal(length))
+    frequencies = np.fft.rfftfreq(length, 1.0 / sample_rate)
+    spectrum[(frequencies < low) | (frequencies >= high)] = 0
+    noise = np.fft.irfft(spectrum, length)
+    return noise / max(np.sqrt(np.mean(noise ** 2)), 1e-12)
+
+@dataclass
+class WorldStats:
+    """What happened in the simulated world, in virtual seconds"""
+    casts: int = 0
+    bites: int = 0
+    catches: int = 0
+    missed: int = 0
+    false_loots: int = 0
+    loot_lags: List[float] = field(default_factory=list)
+
+class SimulatedWorld:
+    """Scripted game: every cast gets a bite after a scheduled delay
+    
+    `schedule` lists the bite delay in seconds for successive casts (None for
+    a cast without a bite) and is repeated; without one, delays are drawn
+    from `bite_delay` and `miss_rate`. A bite splashes for `splash_duration`
+    and can be looted until `loot_window` seconds after it.
+    """
+    
+    def __init__(self, clock: VirtualClock, schedule: Optional[Sequence[Optional[float]]] = None,
+                 seed: int = 0, bite_delay: Sequence[float] = (3.0, 10.0), miss_rate: float = 0.0,
+                 splash_duration: float = 0.5, loot_window: float = 3.0):
+        self.clock = clock
+        self.schedule = list(schedule) if schedule is not None else None
+        self.rng = np.random.default_rng(seed)
+        self.bite_delay = bite_delay
+        self.miss_rate = miss_rate
+        self.splash_duration = splash_duration
+        self.loot_window = loot_window
+        self.stats = WorldStats()
+        self.bite_time: Optional[float] = None
+        self.bitten = False
+    
+    def next_delay(self) -> Optional[float]:
+        if self.schedule is not None:
+            return self.schedule[self.stats.casts % len(self.schedule)]
+        if self.rng.random() < self.miss_rate:
+            return None
+        return float(self.rng.uniform(*self.bite_delay))
+    
+    def cast(self):
+        """Throw a new line, abandoning any previous one"""
+        self.settle()
+        delay = self.next_delay()
+        self.stats.casts += 1
+        self.bite_time = None if delay is None else self.clock.time() + delay
+        self.bitten = False
+    
+    def settle(self):
+        """Count a bite that has gone unlooted"""
+        if self.bitten:
+            self.stats.missed += 1
+            self.bitten = False
+    
+    def splash_active(self) -> bool:
+        now = self.clock.time()
+        if self.bite_time is None or now < self.bite_time:
+            return False
+        if not self.bitten:
+            self.bitten = True
+            self.stats.bites += 1
+        return now < self.bite_time + self.splash_duration
+    
+    def loot(self):
+        """Loot the line; only succeeds inside the bite window"""
+        now = self.clock.time()
+        if self.bite_time is not None and self.bite_time <= now <= self.bite_time + self.loot_window:
+            if not self.bitten:
+                self.stats.bites += 1
+            self.stats.catches += 1
+            self.stats.loot_lags.append(now - self.bite_time)
+            self.bite_time = None
+            self.bitten = False
+        else:
+            self.stats.false_loots += 1
+
+class SimulatedInput(InputBackend):
+    """Key presses that act on the simulated world"""
+    
+    def __init__(self, world: SimulatedWorld, config: FishbotConfig):
+        self.world = world
+        self.fishing_key = config.fishing_key
+        self.loot_keys = tuple(config.loot_key.split('+'))
+    
+    def press(self, key: str):
+        if key == self.fishing_key:
+            self.world.cast()
+    
+    def hotkey(self, *keys: str):
+        if keys == self.loot_keys:
+            self.world.loot()
+
+class SimulatedFrameSource(SyntheticFrameSource):
+    """Synthetic water frames that splash when the world says so, stamped with virtual time"""
+    
+    def __init__(self, world: SimulatedWorld, **kwargs):
+        super().__init__(**kwargs)
+        self.world = world
+    
+    def splash_active(self) -> bool:
+        return self.world.splash_active()
+    
+    def grab(self, area: Area) -> Frame:
+        frame = super().grab(area)
+        frame.timestamp = self.world.clock.time()
+        return frame
+
+class SimulatedAudioInput(AudioInput):
+    """Background noise with a splash sound at every bite, produced as the virtual clock advances
+    
+    Chunks come from a small precomputed bank, so generating audio costs no
+    more than delivering it.
+    """
+    
+    def __init__(self, world: SimulatedWorld, sample_rate: int = RATE, chunk_size: int = CHUNK,
+                 noise_level: float = 200.0, splash_level: float = 4000.0,
+                 splash_band: Sequence[float] = (1500.0, 7000.0), bank_size: int = 32, seed: int = 0):
+        self.world = world
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        rng = np.random.default_rng(seed)
+        length = bank_size * chunk_size
+        # Low rumble with a little broadband hiss
+        noise = noise_level * (band_noise(rng, length, sample_rate, 20.0, 600.0)
+                               + 0.1 * band_noise(rng, length, sample_rate, 20.0, sample_rate / 2))
+        splash = noise + splash_level * band_noise(rng, length, sample_rate, *splash_band)
+        self.noise = np.clip(noise, -32768, 32767).astype(np.int16).reshape(bank_size, chunk_size)
+        self.splash = np.clip(splash, -32768, 32767).astype(np.int16).reshape(bank_size, chunk_size)
+        self.period = chunk_size / sample_rate
+        self._callback = None
+        self._next = 0.0
+        self._count = 0
+    
+    def start(self, callback):
+        self._callback = callback
+        self._next = self.world.clock.time()
+        self.world.clock.listeners.append(self.advance)
+    
+    def stop(self):
+        if self.advance in self.world.clock.listeners:
+            self.world.clock.listeners.remove(self.advance)
+        self._callback = None
+    
+    def advance(self, now: float):
+        """Deliver every chunk that ends before `now`"""
+        world = self.world
+        while self._callback is not None and self._next + self.period <= now:
+            start = self._next
+            bite = world.bite_time
+            splashing = bite is not None and start + self.period > bite and start < bite + world.splash_duration
+            bank = self.splash if splashing else self.noise
+            self._callback(bank[self._count % len(bank)], start)
+            self._count += 1
+            self._next += self.period
+
+@dataclass
+class SimulationResult:
+    """Outcome of a simulation run"""
+    cycles: int
+    wall_seconds: float
+    virtual_seconds: float
+    world: WorldStats
+    bot_stats: Dict
+    latency: Dict
+    
+    @property
+    def cycles_per_second(self) -> float:
+        return self.cycles / self.wall_seconds if self.wall_seconds > 0 else 0.0
+    
+    @property
+    def compute_ms_per_cycle(self) -> float:
+        """Real time the bot spends per cycle; all of its waiting is virtual"""
+        return self.wall_seconds / self.cycles * 1000 if self.cycles else 0.0
+    
+    def summary(self) -> Dict:
+        lags = np.array(self.world.loot_lags) * 1000
+        return {
+            "cycles": self.cycles,
+            "cycles_per_second": self.cycles_per_second,
+            "compute_ms_per_cycle": self.compute_ms_per_cycle,
+            "virtual_seconds_per_cycle": self.virtual_seconds / self.cycles if self.cycles else 0.0,
+            "casts": self.world.casts,
+            "bites": self.world.bites,
+            "catches": self.world.catches,
+            "missed": self.world.missed,
+            "false_loots": self.world.false_loots,
+            "loot_lag_ms": {
+                "p50": float(np.percentile(lags, 50)) if len(lags) else None,
+                "p95": float(np.percentile(lags, 95)) if len(lags) else None,
+                "max": float(lags.max()) if len(lags) else None,
+            },
+            "latency": self.latency,
+        }
+
+class Simulation:
+    """A FishBot wired to a simulated world on a virtual clock"""
+    
+    def __init__(self, config: Optional[FishbotConfig] = None, seed: int = 0,
+                 schedule: Optional[Sequence[Optional[float]]] = None, **world_options):
+        # A small detection area with the bobber in the middle keeps frames cheap
+        config = config or replace(FishbotConfig(), bobber_detection_area=(0, 0, 160, 120),
+                                   adaptive_roi=False)
+        self.config = config
+        self.clock = VirtualClock()
+        self.world = SimulatedWorld(self.clock, schedule, seed=seed, **world_options)
+        x, y, w, h = config.bobber_detection_area
+        self.frame_source = SimulatedFrameSource(self.world, seed=seed, screen_size=(x + w, y + h),
+                                                 bobber_position=(x + w // 2, y + h // 2))
+        self.audio_input = SimulatedAudioInput(self.world, seed=seed)
+        self.bot = FishBot(config, clock=self.clock, input_backend=SimulatedInput(self.world, config),
+                           frame_source=self.frame_source, audio_engine=AudioEngine(self.audio_input),
+                           rng=np.random.default_rng(seed), hotkeys=False)
+    
+    def run(self, cycles: int) -> SimulationResult:
+        """Run complete fishing cycles and score them"""
+        bot = self.bot
+        bot.is_running = True
+        bot.stats['start_time'] = self.clock.time()
+        start_virtual = self.clock.time()
+        start = time.perf_counter()
+        try:
+            for _ in range(cycles):
+                bot.fishing_cycle()
+        finally:
+            wall = time.perf_counter() - start
+            bot.is_running = False
+            bot.sound_detector.close()
+        self.world.settle()
+        return SimulationResult(cycles, wall, self.clock.time() - start_virtual, self.world.stats,
+                                dict(bot.stats), bot.instruments.summary())
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Run the Fishbot loop against a simulated game")
+    parser.add_argument('--cycles', type=int, default=1000, help="fishing cycles to simulate")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--config', help="config file (default: built-in defaults on a 160x120 area)")
+    parser.add_argument('--miss-rate', type=float, default=0.0, help="fraction of casts without a bite")
+    parser.add_argument('--no-sound', action='store_true', help="disable sound detection")
+    parser.add_argument('--no-visual', action='store_true', help="disable visual detection")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+    setup_logging()
+    
+    config = replace(FishbotConfig(), bobber_detection_area=(0, 0, 160, 120), adaptive_roi=False)
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = FishbotConfig(**json.load(f))
+    config = replace(config, instrumentation=True,
+                     enable_sound_detection=config.enable_sound_detection and not args.no_sound,
+                     enable_visual_detection=config.enable_visual_detection and not args.no_visual)
+    
+    # Per-cast log lines would dominate the run time
+    logging.getLogger('main').setLevel(logging.WARNING)
+    logging.getLogger('audio_engine').setLevel(logging.WARNING)
+    
+    simulation = Simulation(config, seed=args.seed, miss_rate=args.miss_rate)
+    summary = simulation.run(args.cycles).summary()
+    
+    print(f"{summary['cycles']} cycles in {summary['cycles'] / summary['cycles_per_second']:.2f} s "
+          f"({summary['cycles_per_second']:.0f} cycles/s, {summary['compute_ms_per_cycle']:.3f} ms compute per cycle)")
+    print(f"Virtual time per cycle: {summary['virtual_seconds_per_cycle']:.2f} s")
+    print(f"Casts {summary['casts']}, bites {summary['bites']}, catches {summary['catches']}, "
+          f"missed {summary['missed']}, false loots {summary['false_loots']}")
+    lag = summary['loot_lag_ms']
+    if lag['p50'] is not None:
+        print(f"Bite to loot: p50 {lag['p50']:.0f} ms, p95 {lag['p95']:.0f} ms, max {lag['max']:.0f} ms (virtual)")
+    for stage, latency in summary['latency'].items():
+        if latency['count']:
+            print(f"  {stage:<16} p50 {latency['p50_ms']:9.2f} ms  p95 {latency['p95_ms']:9.2f} ms  "
+                  f"({latency['count']} samples)")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=4)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
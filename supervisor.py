@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Run several Fishbot instances from one process, for game clients tiled on
+one desktop.
+Each tick the supervisor captures the bounding box of every instance's
+`bobber_detection_area` once, and each instance analyses a zero-copy view of
+its own part. Every instance is a FishBot driven as a non-blocking
+cast/wait/loot state machine, so one instance waiting out its cast or
+reaction delay never stalls another's polling. Key presses from all
+instances go through a single input thread, one at a time, each optionally
+preceded by a click on the instance's `focus_point` to focus its window.
+The supervisor ticks at the shortest polling interval of the instances
+waiting for a bite, which is roi_poll_interval while an instance watches
+its bobber window, and at the shortest poll_interval otherwise.
+
+Sound detection is off for every instance: the clients share one audio
+output, so a splash cannot be attributed to an instance. For the same
+reason of one shared capture, pipeline_workers is ignored. Each instance
+records into its own subdirectory of record_dir and flight_recorder_dir,
+named after the instance, and needs its own metrics_port if any is set.
+
+    python supervisor.py instances.json
+
+instances.json holds config defaults and one entry per client:
+
+    {
+        "defaults": {"poll_interval": 0.1, "capture_backend": "auto"},
+        "instances": [
+            {"name": "left", "bobber_detection_area": [200, 300, 600, 400], "focus_point": [500, 100]},
+            {"name": "right", "bobber_detection_area": [2120, 300, 600, 400], "focus_point": [2420, 100]}
+        ]
+    }
+"""
+
+import argparse
+import json
+import math
+import os
+import queue
+import threading
+import time
+import logging
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backends import Clock, InputBackend, PyAutoGUIInput, SystemClock
+from capture import Area, Frame, FrameSource, create_frame_source
+from main import FishBot, FishbotConfig, setup_logging
+
+logger = logging.getLogger(__name__)
+
+class SharedCapture(FrameSource):
+    """One capture per tick of the area covering every instance, sliced on grab"""
+    
+    def __init__(self, source: FrameSource, areas: List[Area]):
+        self.source = source
+        left = min(area[0] for area in areas)
+        top = min(area[1] for area in areas)
+        right = max(area[0] + area[2] for area in areas)
+        bottom = max(area[1] + area[3] for area in areas)
+        self.bounds = (left, top, right - left, bottom - top)
+        self.frame: Optional[Frame] = None
+    
+    def refresh(self) -> Frame:
+        """Capture the bounding area; later grabs return views of this frame"""
+        self.frame = self.source.grab(self.bounds)
+        return self.frame
+    
+    def grab(self, area: Area) -> Frame:
+        if self.frame is None:
+            self.refresh()
+        x, y, w, h = area
+        left, top, width, height = self.bounds
+        if x < left or y < top or x + w > left + width or y + h > top + height:
+            raise ValueError(f"Area {area} is outside the captured bounds {self.bounds}")
+        view = self.frame.image[y - top:y - top + h, x - left:x - left + w]
+        return Frame(view, area, self.frame.timestamp)
+
+class InputDispatcher:
+    """Sends key presses from every instance one at a time on its own thread"""
+    
+    def __init__(self, backend: InputBackend, gap: float = 0.05):
+        self.backend = backend
+        self.gap = gap
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='input-dispatcher', daemon=True)
+        self._thread.start()
+    
+    def submit(self, focus: Optional[Tuple[int, int]], action: str, *args: str,
+               on_sent: Optional[Callable[[str], None]] = None):
+        """Queue an input; `on_sent(action)` is called on the input thread once it has been sent"""
+        self._queue.put((focus, action, args, on_sent))
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            focus, action, args, on_sent = item
+            try:
+                # Focus and key press back to back, so no other instance's input lands in between
+                if focus is not None:
+                    self.backend.click(*focus)
+                getattr(self.backend, action)(*args)
+            except Exception as e:
+                logger.error(f"Error sending {action}{args}: {e}")
+            # Reported even after an error, so the instance does not wait for the input forever
+            if on_sent is not None:
+                on_sent(action)
+            time.sleep(self.gap)
+    
+    def close(self):
+        """Send what is queued, then stop the thread"""
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+class DispatchedInput(InputBackend):
+    """An instance's view of the shared input dispatcher
+    
+    Inputs are only queued here; `on_sent` is told when each one goes out.
+    """
+    
+    deferred = True
+    
+    def __init__(self, dispatcher: InputDispatcher, focus: Optional[Tuple[int, int]] = None,
+                 on_sent: Optional[Callable[[str], None]] = None):
+        self.dispatcher = dispatcher
+        self.focus = focus
+        self.on_sent = on_sent
+    
+    def press(self, key: str):
+        self.dispatcher.submit(self.focus, 'press', key, on_sent=self.on_sent)
+    
+    def hotkey(self, *keys: str):
+        self.dispatcher.submit(self.focus, 'hotkey', *keys, on_sent=self.on_sent)
+
+class FishingInstance:
+    """One game client: a FishBot stepped through cast, wait, react, loot and rest"""
+    
+    def __init__(self, name: str, bot: FishBot):
+        self.name = name
+        self.bot = bot
+        self.state = 'cast'
+        self.started = 0.0
+        self.next_at = 0.0
+        # (action, clock time, instruments time) of inputs sent by the input thread
+        self.sent: "queue.SimpleQueue[Tuple[str, float, Optional[float]]]" = queue.SimpleQueue()
+        if isinstance(bot.input, DispatchedInput):
+            bot.input.on_sent = self.input_sent
+    
+    def input_sent(self, action: str):
+        """Called on the input thread once one of this instance's inputs has gone out"""
+        self.sent.put((action, self.bot.clock.time(), self.bot.instruments.now()))
+    
+    @property
+    def needs_frame(self) -> bool:
+        return self.state in ('casting', 'waiting')
+    
+    def rest(self, now: float, seconds: float):
+        self.state = 'resting'
+        self.next_at = now + seconds
+        self.bot.update_cascade_stats()
+    
+    def step(self, now: float):
+        """Advance the state machine; never blocks"""
+        bot = self.bot
+        while not self.sent.empty():
+            action, sent_at, stamp = self.sent.get()
+            if action == 'press':
+                # The cast delay and the bot's cast timings start when the key press was sent, not queued
+                bot.cast_time = stamp
+                self.next_at = sent_at + bot.config.cast_delay
+            else:
+                bot.loot_sent(stamp)
+        if self.state == 'cast':
+            bot.send_cast()
+            self.state = 'casting'
+            self.next_at = math.inf
+        elif self.state == 'casting':
+            if now >= self.next_at:
+                bot.watch.begin()
+                self.started = now
+                self.state = 'waiting'
+        elif self.state == 'waiting':
+            if now - self.started >= bot.config.timeout_duration:
+                bot.cast_timed_out()
+                self.rest(now, 0.5)
+            elif self.poll():
+                # Human-like reaction delay, as in FishBot.fishing_cycle
+                self.state = 'reacting'
+                self.next_at = now + bot.rng.uniform(bot.config.reaction_delay_min, bot.config.reaction_delay_max)
+        elif self.state == 'reacting':
+            if now >= self.next_at:
+                looted = bot.send_loot()
+                self.rest(now, 1.5 if looted else 1.0)
+        elif self.state == 'resting':
+            if now >= self.next_at:
+                self.state = 'cast'
+    
+    def poll(self) -> bool:
+        """Run the bite detectors on this tick's view; returns whether a bite was found"""
+        bot = self.bot
+        tick = bot.instruments.work_now()
+        detector = bot.watch.check(bot.capture_tick_frame())
+        if detector is not None:
+            logger.info(f"{self.name}: {detector.name} detected")
+            bot.bite_detected(detector.name, tick)
+            return True
+        return False
+
+class Supervisor:
+    """Drives several FishingInstances from one capture and one input thread"""
+    
+    def __init__(self, defaults: Dict[str, Any], instances: List[Dict[str, Any]], clock: Optional[Clock] = None,
+                 input_backend: Optional[InputBackend] = None, frame_source: Optional[FrameSource] = None,
+                 input_gap: float = 0.05):
+        if not instances:
+            raise ValueError("No instances configured")
+        self.clock = clock or SystemClock()
+        base = FishbotConfig(**defaults)
+        names = [spec.get('name') or f"instance-{number + 1}" for number, spec in enumerate(instances)]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Instance names must be unique: {names}")
+        configs = []
+        for name, spec in zip(names, instances):
+            spec = dict(spec)
+            spec.pop('name', None)
+            spec.pop('focus_point', None)
+            config = replace(base, enable_sound_detection=False, **spec)
+            # Recordings of different instances must not land in the same session directory
+            if config.record_dir:
+                config = replace(config, record_dir=os.path.join(config.record_dir, name))
+            if config.flight_recorder_dir:
+                config = replace(config, flight_recorder_dir=os.path.join(config.flight_recorder_dir, name))
+            if config.pipeline_workers > 0:
+                logger.warning(f"{name}: instances share one capture; ignoring pipeline_workers")
+                config = replace(config, pipeline_workers=0)
+            configs.append(config)
+        ports = [config.metrics_port for config in configs if config.metrics_port]
+        if len(set(ports)) != len(ports):
+            raise ValueError(f"Each instance needs its own metrics_port: {ports}")
+        
+        self.capture = SharedCapture(frame_source or create_frame_source(base.capture_backend, base.capture_path),
+                                     [tuple(config.bobber_detection_area) for config in configs])
+        self.dispatcher = InputDispatcher(input_backend or PyAutoGUIInput(), input_gap)
+        self.instances: List[FishingInstance] = []
+        for name, spec, config in zip(names, instances, configs):
+            focus = spec.get('focus_point')
+            bot = FishBot(config, clock=self.clock,
+                          input_backend=DispatchedInput(self.dispatcher, tuple(focus) if focus else None),
+                          frame_source=self.capture, hotkeys=False)
+            self.instances.append(FishingInstance(name, bot))
+        # Tick rate while no instance is waiting for a bite
+        self.idle_interval = min(config.poll_interval for config in configs)
+        self.is_running = False
+        self.ticks = 0
+    
+    @property
+    def interval(self) -> float:
+        """Seconds between ticks: the shortest polling interval of the instances waiting for a bite"""
+        waiting = [instance.bot.watch.interval for instance in self.instances if instance.state == 'waiting']
+        return min(waiting) if waiting else self.idle_interval
+    
+    def tick(self):
+        """One capture shared by every instance that is looking at its bobber, then one step each"""
+        now = self.clock.time()
+        if any(instance.needs_frame for instance in self.instances):
+            self.capture.refresh()
+        for instance in self.instances:
+            instance.step(now)
+        self.ticks += 1
+    
+    def run(self, duration: Optional[float] = None):
+        """Tick every `interval` seconds until stop() or `duration` elapses"""
+        self.is_running = True
+        start = self.clock.time()
+        try:
+            for instance in self.instances:
+                bot = instance.bot
+                bot.is_running = True
+                bot.stats['start_time'] = start
+                # What FishBot.start_bot sets up besides its own loop
+                bot.start_recording()
+                bot.start_metrics_server()
+                bot.update_state_metrics()
+            logger.info(f"Supervising {len(self.instances)} instances, capturing {self.capture.bounds}")
+            while self.is_running and (duration is None or self.clock.time() - start < duration):
+                tick_start = self.clock.perf_counter()
+                self.tick()
+                self.clock.sleep(max(self.interval - (self.clock.perf_counter() - tick_start), 0))
+        except KeyboardInterrupt:
+            logger.info("Supervisor interrupted by user")
+        finally:
+            self.close()
+    
+    def stop(self):
+        self.is_running = False
+    
+    def close(self):
+        """Stop every instance, flush pending input and log per-instance statistics"""
+        self.is_running = False
+        self.dispatcher.close()
+        for instance in self.instances:
+            logger.info(f"=== {instance.name} ===")
+            # One instance failing to shut down must not leave the others' recorders and workers open
+            try:
+                instance.bot.stop_bot()
+            except Exception as e:
+                logger.error(f"Error stopping {instance.name}: {e}")
+
+def load_instances(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Config defaults and per-instance settings from an instances file"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data.get('defaults', {}), data.get('instances', [])
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Run several Fishbot instances from one screen capture")
+    parser.add_argument('instances', help="JSON file with config defaults and one entry per game client")
+    parser.add_argument('--duration', type=float, help="stop after this many seconds")
+    parser.add_argument('--input-gap', type=float, default=0.05, help="seconds between inputs to different clients")
+    args = parser.parse_args()
+    setup_logging()
+    
+    defaults, instances = load_instances(args.instances)
+    try:
+        supervisor = Supervisor(defaults, instances, input_gap=args.input_gap)
+    except (TypeError, ValueError) as e:
+        parser.error(str(e))
+    supervisor.run(args.duration)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,335 @@
+"""
+Coarse-to-fine template matching for the Fishbot visual detectors.
+The template is searched on a downsampled copy of the image first and the
+best candidate is refined in a small full-resolution window, which costs a
+fraction of a full-resolution TM_CCOEFF_NORMED search.
+
+A TemplateBank holds every template in a directory. Template pyramids and
+normalisation stats are computed once at load time, the image-side float
+planes and integral images are computed once per frame and shared by all
+templates, and files are re-read only when their mtime changes.
+"""
+
+import cv2
+import numpy as np
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from capture import Frame
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class MatchResult:
+    """Best template match in full-resolution image coordinates"""
+    location: Tuple[int, int]
+    score: float
+    scale: float
+    size: Tuple[int, int]
+    template: str = ''
+    
+    @property
+    def center(self) -> Tuple[int, int]:
+        """Centre of the matched region"""
+        return (self.location[0] + self.size[0] // 2, self.location[1] + self.size[1] // 2)
+
+class ImagePlanes:
+    """Per-frame pyramid levels, float planes and integral images
+    
+    Built once per frame and shared by every template matched against it.
+    """
+    
+    def __init__(self, image: Union[Frame, np.ndarray]):
+        if not isinstance(image, Frame) and image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        self.image = image
+        self._gray: Dict[int, np.ndarray] = {}
+        self._float: Dict[int, np.ndarray] = {}
+        self._integrals: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def gray(self, level: int = 0) -> np.ndarray:
+        """Grayscale image at a pyramid level, reusing the Frame cache when possible"""
+        if isinstance(self.image, Frame):
+            return self.image.downsampled(level)
+        if level not in self._gray:
+            self._gray[level] = self.image if level == 0 else cv2.pyrDown(self.gray(level - 1))
+        return self._gray[level]
+    
+    def float(self, level: int = 0) -> np.ndarray:
+        """float32 copy of a level, as cv2.matchTemplate needs for float templates"""
+        if level not in self._float:
+            self._float[level] = self.gray(level).astype(np.float32)
+        return self._float[level]
+    
+    def integrals(self, level: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum and squared-sum integral images of a level"""
+        if level not in self._integrals:
+            total, squared = cv2.integral2(self.gray(level), sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+            self._integrals[level] = (total, squared)
+        return self._integrals[level]
+    
+    def ccoeff_normed(self, level: int, template: np.ndarray, template_norm: float,
+                      region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """TM_CCOEFF_NORMED score map for a zero-mean template with a precomputed norm
+        
+        Equivalent to cv2.TM_CCOEFF_NORMED. For a whole level the image float plane
+        and window statistics are cached and shared across templates; a small
+        refinement `region` (x0, y0, x1, y1) is computed locally instead.
+        """
+        if region is None:
+            image = self.float(level)
+            total, squared = self.integrals(level)
+        else:
+            x0, y0, x1, y1 = region
+            gray = self.gray(level)[y0:y1, x0:x1]
+            image = gray.astype(np.float32)
+            total, squared = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        th, tw = template.shape[:2]
+        
+        # Correlation with a zero-mean template equals sum((T - mean T) * (I - mean I))
+        correlation = cv2.matchTemplate(image, template, cv2.TM_CCORR)
+        
+        def window_sum(table: np.ndarray) -> np.ndarray:
+            return table[th:, tw:] - table[:-th, tw:] - table[th:, :-tw] + table[:-th, :-tw]
+        sums = window_sum(total)
+        variance = np.maximum(window_sum(squared) - sums * sums / (th * tw), 0.0)
+        denominator = np.sqrt(variance) * template_norm
+        
+        scores = np.zeros_like(correlation)
+        np.divide(correlation, denominator, out=scores, where=denominator > 1e-6)
+        return scores
+
+class PyramidMatcher:
+    """Multi-scale, coarse-to-fine matcher for one grayscale template"""
+    
+    def __init__(self, template: np.ndarray, scales: Sequence[float] = (1.0,), levels: int = 2,
+                 min_template_size: int = 8, name: str = ''):
+        if template.ndim == 3:
+            template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        self.name = name
+        self.levels = max(0, levels)
+        self.min_template_size = min_template_size
+        
+        # Per scale: zero-mean float32 template pyramid and the norm of each level
+        self.scaled: List[Tuple[float, List[np.ndarray], List[float]]] = []
+        for scale in scales:
+            if scale == 1.0:
+                scaled = template
+            else:
+                size = (max(1, round(template.shape[1] * scale)), max(1, round(template.shape[0] * scale)))
+                scaled = cv2.resize(template, size, interpolation=cv2.INTER_AREA)
+            pyramid = [scaled]
+            for _ in range(self.levels):
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            
+            centered = []
+            norms = []
+            for level_template in pyramid:
+                values = level_template.astype(np.float32)
+                values -= values.mean()
+                centered.append(values)
+                norms.append(float(np.sqrt(np.sum(values.astype(np.float64) ** 2))))
+            self.scaled.append((scale, centered, norms))
+    
+    def _coarse_level(self, pyramid: List[np.ndarray], image_shape: Tuple[int, ...]) -> int:
+        """Deepest level at which the template is still large enough to match"""
+        level = 0
+        image_h, image_w = image_shape[:2]
+        while level < self.levels:
+            # cv2.pyrDown rounds odd sizes up
+            image_h, image_w = (image_h + 1) // 2, (image_w + 1) // 2
+            template_h, template_w = pyramid[level + 1].shape[:2]
+            if min(template_h, template_w) < self.min_template_size or image_h < template_h or image_w < template_w:
+                break
+            level += 1
+        return level
+    
+    def match(self, image: Union[Frame, np.ndarray, ImagePlanes]) -> Optional[MatchResult]:
+        """Find the best match over all scales, or None if the template never fits"""
+        planes = image if isinstance(image, ImagePlanes) else ImagePlanes(image)
+        gray_shape = planes.gray(0).shape
+        best = None
+        
+        for scale, pyramid, norms in self.scaled:
+            th, tw = pyramid[0].shape[:2]
+            if gray_shape[0] < th or gray_shape[1] < tw or norms[0] == 0:
+                continue
+            
+            # Coarse search on the downsampled image
+            level = self._coarse_level(pyramid, gray_shape)
+            coarse = planes.ccoeff_normed(level, pyramid[level], norms[level])
+            _, coarse_score, _, coarse_loc = cv2.minMaxLoc(coarse)
+            
+            if level == 0:
+                candidate = MatchResult(coarse_loc, coarse_score, scale, (tw, th), self.name)
+            else:
+                # Refine in a full-resolution window around the coarse hit
+                factor = 1 << level
+                margin = 2 * factor
+                x0 = max(0, coarse_loc[0] * factor - margin)
+                y0 = max(0, coarse_loc[1] * factor - margin)
+                x1 = min(gray_shape[1], coarse_loc[0] * factor + tw + margin)
+                y1 = min(gray_shape[0], coarse_loc[1] * factor + th + margin)
+                fine = planes.ccoeff_normed(0, pyramid[0], norms[0], (x0, y0, x1, y1))
+                _, fine_score, _, fine_loc = cv2.minMaxLoc(fine)
+                candidate = MatchResult((x0 + fine_loc[0], y0 + fine_loc[1]), fine_score, scale,
+                                        (tw, th), self.name)
+            
+            if best is None or candidate.score > best.score:
+                best = candidate
+        return best
+
+class TemplateBank:
+    """Every template image in a directory, matched together in one pass
+    
+    Templates are tried most-recently-successful first and matching stops at
+    the first score above `confidence`. The directory is rescanned at most
+    every `reload_interval` seconds and only files whose mtime changed are
+    re-read, so templates can be swapped while the bot is running.
+    """
+    
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+    
+    def __init__(self, directory: str = 'templates', scales: Sequence[float] = (1.0,), levels: int = 2,
+                 confidence: float = 0.8, exclude: Sequence[str] = (), reload_interval: float = 2.0):
+        self.directory = directory
+        self.scales = tuple(scales)
+        self.levels = levels
+        self.confidence = confidence
+        # File-name prefixes to skip, compared case-insensitively
+        self.exclude = tuple(prefix.lower() for prefix in exclude)
+        self.reload_interval = reload_interval
+        self._mtimes: Dict[str, float] = {}
+        self._matchers: Dict[str, PyramidMatcher] = {}
+        self._order: List[str] = []
+        self._last_scan = None
+    
+    def __len__(self) -> int:
+        return len(self._matchers)
+    
+    @property
+    def names(self) -> List[str]:
+        """Template names in the order they are tried"""
+        return list(self._order)
+    
+    def configure(self, scales: Sequence[float], levels: int, confidence: float):
+        """Change the matching settings; templates are rebuilt if the scales or levels changed"""
+        self.confidence = confidence
+        if tuple(scales) == self.scales and levels == self.levels:
+            return
+        self.scales = tuple(scales)
+        self.levels = levels
+        for name in list(self._matchers):
+            self.remove(name)
+        self.refresh(force=True)
+    
+    def add(self, name: str, template: np.ndarray):
+        """Add (or replace) an in-memory template"""
+        self._matchers[name] = PyramidMatcher(template, self.scales, self.levels, name=name)
+        if name not in self._order:
+            self._order.append(name)
+    
+    def remove(self, name: str):
+        """Drop a template from the bank"""
+        self._matchers.pop(name, None)
+        self._mtimes.pop(name, None)
+        if name in self._order:
+            self._order.remove(name)
+    
+    def refresh(self, force: bool = False) -> bool:
+        """Reload new or modified template files; returns True if the bank changed"""
+        now = time.monotonic()
+        if not force and self._last_scan is not None and now - self._last_scan < self.reload_interval:
+            return False
+        self._last_scan = now
+        
+        if not os.path.isdir(self.directory):
+            return False
+        
+        changed = False
+        seen = set()
+        for entry in os.scandir(self.directory):
+            name = entry.name
+            if (not entry.is_file() or not name.lower().endswith(self.IMAGE_EXTENSIONS)
+                    or name.lower().startswith(self.exclude)):
+                continue
+            seen.add(name)
+            mtime = entry.stat().st_mtime
+            if self._mtimes.get(name) == mtime:
+                continue
+            
+            template = cv2.imread(entry.path, cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                logger.warning(f"Could not read template: {entry.path}")
+                continue
+            self.add(name, template)
+            self._mtimes[name] = mtime
+            changed = True
+            logger.info(f"Loaded template {name} ({template.shape[1]}x{template.shape[0]})")
+        
+        for name in [name for name in self._mtimes if name not in seen]:
+            self.remove(name)
+            changed = True
+            logger.info(f"Removed template {name}")
+        return changed
+    
+    def match(self, image: Union[Frame, np.ndarray]) -> Optional[MatchResult]:
+        """Best match across all templates, stopping early on a confident hit"""
+        self.refresh()
+        planes = ImagePlanes(image)
+        best = None
+        
+        for name in self._order:
+            result = self._matchers[name].match(planes)
+            if result is None:
+                continue
+            if best is None or result.score > best.score:
+                best = result
+            if result.score >= self.confidence:
+                # Try the template that just hit first next time
+                self._order.remove(name)
+                self._order.insert(0, name)
+                break
+        return best
+
+def crop_from_difference(before: np.ndarray, after: np.ndarray, padding: int = 6,
+                         min_pixels: int = 20) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box (x, y, w, h) of the largest change between two captures
+    
+    Used by the setup utility to cut a tight bobber template from a capture
+    taken before casting and one taken with the bobber in the water.
+    """
+    if before.shape != after.shape:
+        return None
+    
+    # Largest per-channel change, so a red bobber on blue water is not lost in gray
+    diff = cv2.absdiff(cv2.GaussianBlur(before, (5, 5), 0), cv2.GaussianBlur(after, (5, 5), 0))
+    if diff.ndim == 3:
+        diff = diff.max(axis=2)
+    _, mask = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+    
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    largest = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(largest) < min_pixels:
+        return None
+    
+    x, y, w, h = cv2.boundingRect(largest)
+    height, width = after.shape[:2]
+    x0, y0 = max(0, x - padding), max(0, y - padding)
+    x1, y1 = min(width, x + w + padding), min(height, y + h + padding)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def match_single_scale(gray: np.ndarray, template: np.ndarray) -> Optional[MatchResult]:
+    """Reference full-resolution single-scale search (the original detect_bobber)"""
+    th, tw = template.shape[:2]
+    if gray.shape[0] < th or gray.shape[1] < tw:
+        return None
+    result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return MatchResult(max_loc, max_val, 1.0, (tw, th))
\ No newline at end of file
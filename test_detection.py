@@ -6,7 +6,6 @@ This script helps verify that visual and audio detection are working correctly
 
 import cv2
 import numpy as np
-import pyautogui
 import time
 import threading
 import tkinter as tk
@@ -14,6 +13,8 @@ from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import os
 import json
+from capture import create_frame_source
+from audio_features import rms
 
 class DetectionTester:
     """Test utility for verifying detection methods"""
@@ -24,6 +25,7 @@ class DetectionTester:
         self.root.geometry("900x700")
         
         self.detection_area = (400, 200, 800, 600)
+        self.frame_source = create_frame_source()
         self.is_testing = False
         self.setup_gui()
         
@@ -99,9 +101,7 @@ class DetectionTester:
     
     def capture_area(self):
         """Capture the detection area"""
-        x, y, w, h = self.detection_area
-        screenshot = pyautogui.screenshot(region=(x, y, w, h))
-        return cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+        return self.frame_source.grab(self.detection_area).bgr
     
     def test_visual(self):
         """Test visual splash detection"""
@@ -145,7 +145,6 @@ class DetectionTester:
         def audio_test():
             try:
                 import pyaudio
-                import audioop
                 
                 CHUNK = 1024
                 FORMAT = pyaudio.paInt16
@@ -165,7 +164,7 @@ class DetectionTester:
                 while time.time() - start_time < 5:
                     try:
                         data = stream.read(CHUNK, exception_on_overflow=False)
-                        volume = audioop.rms(data, 2)
+                        volume = int(rms(data)[0])
                         max_volume = max(max_volume, volume)
                         
                         if volume > 3000:
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from audio_detectors import MatchedFilterDetector, SpectralSplashDetector
+
+RATE = 44100
+
+def background(seconds: float, seed: int = 0) -> np.ndarray:
+    """Quiet broadband noise"""
+    return np.random.default_rng(seed).normal(0, 50, int(RATE * seconds))
+
+def tone_burst(signal: np.ndarray, start: float, frequency: float, amplitude: float = 3000) -> np.ndarray:
+    signal = signal.copy()
+    first, count = int(RATE * start), int(RATE * 0.1)
+    signal[first:first + count] += amplitude * np.sin(2 * np.pi * frequency * np.arange(count) / RATE)
+    return signal
+
+def first_trigger_time(detector: SpectralSplashDetector, signal: np.ndarray):
+    result = detector.process(np.clip(signal, -32768, 32767).astype(np.int16))
+    if result.first is None:
+        return None
+    return (result.first * detector.hop + detector.window_size) / RATE
+
+def test_band_limited_onset_fires():
+    signal = tone_burst(background(1.0), 0.6, 2500)
+    assert abs(first_trigger_time(SpectralSplashDetector(RATE), signal) - 0.6) < 0.05
+
+def test_out_of_band_onset_does_not_fire():
+    signal = tone_burst(background(1.0), 0.6, 300)
+    assert first_trigger_time(SpectralSplashDetector(RATE), signal) is None
+
+def test_broadband_burst_is_not_selective():
+    signal = background(1.0)
+    first = int(RATE * 0.6)
+    signal[first:first + 4410] += np.random.default_rng(1).normal(0, 3000, 4410)
+    assert first_trigger_time(SpectralSplashDetector(RATE), signal) is None
+
+def test_scores_do_not_depend_on_how_the_stream_is_split():
+    signal = np.clip(tone_burst(background(0.5), 0.3, 5000), -32768, 32767).astype(np.int16)
+    whole = SpectralSplashDetector(RATE).process(signal)
+    detector = SpectralSplashDetector(RATE)
+    pieces = [detector.process(piece) for piece in np.split(signal, [100, 3000, 3001, 9000])]
+    np.testing.assert_allclose(np.concatenate([piece.score for piece in pieces]), whole.score, rtol=1e-9)
+
+def direct_scores(signal: np.ndarray, clips, block: int, min_rms: float) -> np.ndarray:
+    """Best normalised correlation of the windows ending in each block, computed sample by sample"""
+    length = max(len(clip) for clip in clips)
+    padded = np.concatenate([np.zeros(length), signal.astype(np.float64)])
+    scores = np.zeros(len(signal) // block)
+    for n in range(len(scores) * block):
+        end = length + n + 1
+        for clip in clips:
+            clip = np.asarray(clip, dtype=np.float64)
+            clip = clip - clip.mean()
+            window = padded[end - len(clip):end]
+            energy = window @ window
+            if energy < len(clip) * min_rms ** 2:
+                continue
+            score = clip @ window / (np.linalg.norm(clip) * np.sqrt(max(energy, 1.0)))
+            scores[n // block] = max(scores[n // block], score)
+    return scores
+
+@pytest.mark.parametrize('clip_lengths', [(40,), (100, 37)])
+def test_matched_filter_matches_direct_correlation(clip_lengths):
+    rng = np.random.default_rng(3)
+    block = 32
+    clips = [rng.normal(0, 3000, length) for length in clip_lengths]
+    signal = rng.normal(0, 500, 20 * block)
+    signal[300:300 + len(clips[0])] += clips[0]
+    signal = signal.astype(np.int16)
+    
+    detector = MatchedFilterDetector(clips, threshold=0.5, block_size=block, min_rms=100.0)
+    # Uneven pieces, so blocks straddle calls
+    scores = []
+    for piece in np.split(signal, [5, 70, 71, 200, 431, 500]):
+        scores.append(detector.process(piece).score)
+    scores = np.concatenate(scores)
+    
+    expected = direct_scores(signal, clips, block, 100.0)
+    np.testing.assert_allclose(scores, expected, atol=1e-9)
+    assert scores.max() > 0.9
@@ -0,0 +1,66 @@
+import wave
+
+import numpy as np
+
+from audio_engine import AudioEngine, AudioRingBuffer, WavFileInput
+
+def chunk(value: int, size: int = 4) -> np.ndarray:
+    return np.full(size, value, dtype=np.int16)
+
+def test_read_returns_chunks_since_cursor():
+    ring = AudioRingBuffer(capacity=8, chunk_size=4)
+    for value in range(3):
+        ring.write(chunk(value), float(value))
+    samples, times, cursor = ring.read(1)
+    assert cursor == 3
+    np.testing.assert_array_equal(samples[:, 0], [1, 2])
+    np.testing.assert_array_equal(times, [1.0, 2.0])
+    # Nothing new since the cursor
+    samples, times, cursor = ring.read(cursor)
+    assert len(samples) == 0 and cursor == 3
+
+def test_read_across_the_wrap_in_order():
+    ring = AudioRingBuffer(capacity=4, chunk_size=4)
+    for value in range(6):
+        ring.write(chunk(value), float(value))
+    samples, times, cursor = ring.read(3)
+    assert cursor == 6
+    np.testing.assert_array_equal(samples[:, 0], [3, 4, 5])
+    np.testing.assert_array_equal(times, [3.0, 4.0, 5.0])
+
+def test_lapped_reader_skips_to_the_oldest_valid_chunk():
+    ring = AudioRingBuffer(capacity=4, chunk_size=4)
+    for value in range(10):
+        ring.write(chunk(value), float(value))
+    samples, times, cursor = ring.read(0)
+    assert cursor == 10
+    # The slot being written next is never handed out
+    np.testing.assert_array_equal(samples[:, 0], [7, 8, 9])
+
+def test_max_chunks_and_short_chunks():
+    ring = AudioRingBuffer(capacity=8, chunk_size=4)
+    ring.write(np.array([5, 6], dtype=np.int16), 0.0)
+    ring.write(chunk(7), 1.0)
+    samples, _, cursor = ring.read(0, max_chunks=1)
+    assert cursor == 1
+    np.testing.assert_array_equal(samples[0], [5, 6, 0, 0])
+
+def test_engine_plays_a_wav_file(tmp_path):
+    path = str(tmp_path / "tone.wav")
+    samples = (np.arange(1000) % 200 - 100).astype(np.int16)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(samples.tobytes())
+    audio = WavFileInput(path, chunk_size=100, realtime=False)
+    engine = AudioEngine(audio, capacity=32)
+    cursor = engine.cursor()
+    assert engine.start()
+    assert audio.finished.wait(5.0)
+    engine.stop()
+    chunks, times, cursor = engine.read(cursor)
+    assert engine.sample_rate == 8000
+    assert cursor == 10
+    np.testing.assert_array_equal(chunks.ravel(), samples)
+    assert (np.diff(times) >= 0).all()
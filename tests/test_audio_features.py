@@ -0,0 +1,66 @@
+import numpy as np
+
+from audio_features import AudioFeatureExtractor, as_chunks, ema, mean_square, peak, rms
+
+def ema_loop(values: np.ndarray, initial: float, alpha: float) -> np.ndarray:
+    result = np.empty(len(values))
+    level = initial
+    for i, value in enumerate(values):
+        level = (1 - alpha) * level + alpha * value
+        result[i] = level
+    return result
+
+def noise(chunks: int, size: int = 64, seed: int = 2) -> np.ndarray:
+    return np.random.default_rng(seed).integers(-20000, 20000, (chunks, size), dtype=np.int16)
+
+def test_rms_and_peak_match_the_direct_formulas():
+    chunks = noise(5)
+    chunks[0, 3] = -32768
+    expected_rms = np.sqrt((chunks.astype(np.float64) ** 2).mean(axis=1))
+    np.testing.assert_allclose(rms(chunks), expected_rms)
+    np.testing.assert_array_equal(peak(chunks), np.abs(chunks.astype(np.int32)).max(axis=1))
+    assert peak(chunks)[0] == 32768
+
+def test_as_chunks_views_bytes_without_copying():
+    samples = np.arange(10, dtype=np.int16)
+    data = samples.tobytes()
+    chunks = as_chunks(data, 4)
+    assert chunks.shape == (2, 4)
+    np.testing.assert_array_equal(chunks.ravel(), samples[:8])
+    assert as_chunks(samples).shape == (1, 10)
+
+def test_long_term_energy_follows_the_recurrence():
+    chunks = noise(300)
+    extractor = AudioFeatureExtractor(0.05)
+    features = extractor.process(chunks)
+    energy = mean_square(chunks)
+    long_term = ema_loop(energy, energy[0], 0.05)
+    np.testing.assert_allclose(extractor.long_term_energy, long_term[-1], rtol=1e-9)
+    previous = np.concatenate([[energy[0]], long_term[:-1]])
+    np.testing.assert_allclose(features.energy_ratio, energy / np.maximum(previous, 1.0), rtol=1e-9)
+
+def test_feature_batches_match_one_chunk_at_a_time():
+    chunks = noise(1200)
+    batched = AudioFeatureExtractor(0.05).process(chunks)
+    single = AudioFeatureExtractor(0.05)
+    ratios = np.concatenate([single.process(chunk[None]).energy_ratio for chunk in chunks])
+    np.testing.assert_allclose(batched.energy_ratio, ratios, rtol=1e-9)
+    np.testing.assert_allclose(batched.energy, mean_square(chunks))
+    assert len(batched) == 1200
+
+def test_loud_chunk_stands_out_against_the_long_term_energy():
+    chunks = noise(50) // 100
+    chunks[40] = noise(1, seed=3)[0]
+    ratio = AudioFeatureExtractor(0.05).process(chunks).energy_ratio
+    assert ratio.argmax() == 40
+    assert ratio[40] > 100
+
+def test_ema_matches_recurrence():
+    values = np.random.default_rng(0).uniform(0, 1e6, 300)
+    np.testing.assert_allclose(ema(values, 5e5, 0.05), ema_loop(values, 5e5, 0.05), rtol=1e-9)
+
+def test_ema_runs_along_first_axis():
+    values = np.random.default_rng(1).uniform(0, 100, (50, 3))
+    initial = np.array([10.0, 0.0, 50.0])
+    expected = np.stack([ema_loop(values[:, i], initial[i], 0.2) for i in range(3)], axis=1)
+    np.testing.assert_allclose(ema(values, initial, 0.2), expected, rtol=1e-9)
@@ -0,0 +1,75 @@
+from dataclasses import replace
+
+import numpy as np
+
+from calibration import CalibrationGrid, first_crossings, frame_metrics, score_grid
+from capture import Frame
+from main import FishbotConfig
+from recording import Session, SessionRecorder
+
+TIMES = np.arange(10) * 0.5
+CASTS = [{"start": 0.0, "end": 2.0}, {"start": 2.0, "end": 5.0}, {"start": 5.0, "end": 6.0}]
+
+def test_first_crossings_per_cast_and_threshold():
+    values = np.array([0.1, 0.5, 0.2, 0.9, 0.3, 0.3, 0.6, 0.1, 0.7, 0.2])
+    result = first_crossings(TIMES, values, [0.25, 0.5, 0.8], CASTS)
+    assert result.shape == (3, 3)
+    # First cast: 0.5 at 0.5 s crosses 0.25 only; 0.9 at 1.5 s crosses the rest
+    np.testing.assert_allclose(result[0], [0.5, 1.5, 1.5])
+    # Second cast starts at 2.0 s: 0.3 at 2.0 s, then 0.6 at 3.0 s; nothing reaches 0.8
+    np.testing.assert_allclose(result[1], [0.0, 1.0, np.nan])
+    # No samples in the third cast
+    assert np.isnan(result[2]).all()
+
+def test_first_crossings_inclusive():
+    values = np.array([0.0, 0.5, 0.5, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+    strict = first_crossings(TIMES, values, [0.5], CASTS[:1])
+    inclusive = first_crossings(TIMES, values, [0.5], CASTS[:1], inclusive=True)
+    assert strict[0, 0] == 1.5
+    assert inclusive[0, 0] == 0.5
+
+def test_first_crossings_keeps_parameter_axes():
+    values = np.zeros((10, 2, 3))
+    values[3, 1, 2] = 1.0
+    result = first_crossings(TIMES, values, [0.5, 2.0], CASTS[:1])
+    assert result.shape == (1, 2, 3, 2)
+    assert result[0, 1, 2, 0] == 1.5
+    assert np.isnan(result[0, 1, 2, 1])
+    assert np.isnan(np.delete(result[0].reshape(6, 2), 5, axis=0)).all()
+
+def test_score_grid_counts_per_grid_point():
+    # Three casts (two with bites) by two grid points
+    detections = np.array([[2.05, np.nan], [1.0, 1.0], [np.nan, 3.0]])
+    bites = np.array([2.0, np.nan, 2.5])
+    scores = score_grid(detections, bites)
+    np.testing.assert_array_equal(scores["tp"], [1, 1])
+    np.testing.assert_array_equal(scores["fp"], [1, 1])
+    np.testing.assert_array_equal(scores["fn"], [1, 1])
+    np.testing.assert_allclose(scores["delay"], [0.05, 0.5])
+    np.testing.assert_allclose(scores["f1"], [0.5, 0.5])
+
+FULL = (0, 0, 40, 20)
+WINDOW = (10, 5, 10, 10)
+
+def foam(area, ratio: float, t: float) -> Frame:
+    """Dark water with `ratio` of its pixels white"""
+    image = np.full((area[3], area[2], 3), 60, dtype=np.uint8)
+    image.reshape(-1, 3)[:round(ratio * area[2] * area[3])] = 255
+    return Frame(image, area, t)
+
+def test_splash_is_measured_over_the_bobber_baseline(tmp_path):
+    # Cast 1 locates the bobber (a full-area frame, then the window); cast 2 stays on the full area
+    frames = [foam(FULL, 0.3, 0.0), foam(WINDOW, 0.2, 0.1), foam(WINDOW, 0.2, 0.2), foam(WINDOW, 0.5, 0.3),
+              foam(FULL, 0.1, 1.0), foam(FULL, 0.4, 1.1)]
+    path = str(tmp_path / 'session')
+    recorder = SessionRecorder(path, FULL, background=False)
+    for frame in frames:
+        recorder.record_frame(frame)
+    recorder.close()
+    
+    config = replace(FishbotConfig(), bobber_detection_area=FULL)
+    grid = CalibrationGrid(splash_saturation=(30,), splash_value=(200,))
+    splash, motion, _ = frame_metrics(Session(path), config, grid, None)
+    np.testing.assert_allclose(splash[:, 0, 0], [0.0, 0.0, 0.0, 0.3, 0.1, 0.4], atol=1e-6)
+    # The locating frame is not compared with the window that follows it
+    assert motion[0] == motion[1] == 0.0
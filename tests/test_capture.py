@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+import pytest
+
+from capture import FileFrameSource, Frame, SyntheticFrameSource, create_frame_source
+
+def make_image(seed: int = 0, shape=(24, 32, 3)) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+def test_planes_are_converted_once():
+    frame = Frame(make_image())
+    assert frame.gray is frame.gray
+    assert frame.hsv is frame.hsv
+    np.testing.assert_array_equal(frame.gray, cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY))
+    np.testing.assert_array_equal(frame.hsv, cv2.cvtColor(frame.image, cv2.COLOR_BGR2HSV))
+
+def test_downsampled_levels_build_on_each_other():
+    frame = Frame(make_image())
+    assert frame.downsampled(0) is frame.gray
+    level2 = frame.downsampled(2)
+    assert level2 is frame.downsampled(2)
+    assert level2.shape == (6, 8)
+    np.testing.assert_array_equal(level2, cv2.pyrDown(cv2.pyrDown(frame.gray)))
+
+def test_frame_keeps_area_and_timestamp():
+    frame = Frame(make_image(), (1, 2, 32, 24), timestamp=5.0)
+    assert frame.area == (1, 2, 32, 24)
+    assert frame.timestamp == 5.0
+    assert frame.shape == (24, 32, 3)
+
+def test_bgr_drops_alpha_without_copying():
+    image = make_image(shape=(24, 32, 4))
+    frame = Frame(image)
+    assert frame.bgr.shape == (24, 32, 3)
+    assert np.shares_memory(frame.bgr, image)
+    np.testing.assert_array_equal(frame.gray, cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY))
+
+def test_file_source_crops_and_loops(tmp_path):
+    images = [make_image(seed) for seed in range(2)]
+    for number, image in enumerate(images):
+        cv2.imwrite(str(tmp_path / f"{number}.png"), image)
+    source = FileFrameSource(str(tmp_path))
+    first = source.grab((4, 2, 10, 8))
+    assert first.area == (4, 2, 10, 8)
+    np.testing.assert_array_equal(first.image, images[0][2:10, 4:14])
+    np.testing.assert_array_equal(source.grab((0, 0, 32, 24)).image, images[1])
+    np.testing.assert_array_equal(source.grab((0, 0, 32, 24)).image, images[0])
+
+def test_file_source_without_loop_ends(tmp_path):
+    cv2.imwrite(str(tmp_path / "only.png"), make_image())
+    source = FileFrameSource(str(tmp_path / "only.png"), loop=False)
+    source.grab((0, 0, 32, 24))
+    with pytest.raises(EOFError):
+        source.grab((0, 0, 32, 24))
+
+def test_file_source_rejects_areas_outside_the_image(tmp_path):
+    cv2.imwrite(str(tmp_path / "only.png"), make_image())
+    source = FileFrameSource(str(tmp_path / "only.png"))
+    # A frame the size of the area is a pre-cropped capture, wherever the area is
+    assert source.grab((400, 300, 32, 24)).shape == (24, 32, 3)
+    with pytest.raises(ValueError):
+        source.grab((20, 10, 16, 16))
+    with pytest.raises(ValueError):
+        source.grab((0, 0, 40, 24))
+
+def test_file_backend_replays_its_path(tmp_path):
+    image = make_image()
+    cv2.imwrite(str(tmp_path / "only.png"), image)
+    source = create_frame_source('file', str(tmp_path / "only.png"))
+    np.testing.assert_array_equal(source.grab((0, 0, 32, 24)).image, image)
+    with pytest.raises(ValueError):
+        create_frame_source('file')
+
+def test_synthetic_source_alternates_buffers():
+    source = create_frame_source('synthetic', splash_every=4, splash_duration=1)
+    first = source.grab((0, 0, 80, 60))
+    second = source.grab((0, 0, 80, 60))
+    assert first.shape == second.shape == (60, 80, 3)
+    assert not np.shares_memory(first.image, second.image)
+    assert source.grab((0, 0, 80, 60)).image is first.image
+    splashes = []
+    for _ in range(8):
+        source.grab((0, 0, 80, 60))
+        splashes.append(source.splash_active())
+    assert any(splashes) and not all(splashes)
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_frame_source('nonsense')
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+from capture import Frame
+from detection_engine import DetectionEngine
+
+def water(value: int = 60, shape=(30, 40, 3)) -> np.ndarray:
+    return np.full(shape, value, dtype=np.uint8)
+
+def test_planes_land_in_alternating_engine_buffers():
+    engine = DetectionEngine()
+    first, second, third = Frame(water()), Frame(water()), Frame(water())
+    engine.splash_ratio(first)
+    engine.splash_ratio(second)
+    engine.splash_ratio(third)
+    assert not np.shares_memory(first.hsv, second.hsv)
+    # The third frame reuses the first frame's buffers instead of allocating
+    assert np.shares_memory(first.hsv, third.hsv)
+    np.testing.assert_array_equal(third.hsv, cv2.cvtColor(third.image, cv2.COLOR_BGR2HSV))
+
+def test_prepare_binds_a_frame_once():
+    engine = DetectionEngine()
+    frame = Frame(water())
+    engine.prepare(frame)
+    gray = frame.gray
+    engine.prepare(frame)
+    engine.prepare(Frame(water()))
+    assert frame.gray is gray
+
+def test_buffers_follow_the_frame_size():
+    engine = DetectionEngine()
+    small = Frame(water(shape=(10, 12, 3)))
+    engine.splash_ratio(small)
+    assert small.hsv.shape == (10, 12, 3)
+    large = Frame(water(shape=(30, 40, 3)))
+    engine.splash_ratio(large)
+    assert large.hsv.shape == (30, 40, 3)
+
+def test_splash_ratio_counts_foam_pixels():
+    image = water()
+    image[:15] = 255
+    assert DetectionEngine().splash_ratio(Frame(image)) == 0.5
+
+def test_motion_ratio_against_previous_frame():
+    engine = DetectionEngine(motion_pixel_threshold=30)
+    previous = Frame(water())
+    moved = water()
+    moved[:, :10] = 200
+    assert engine.motion_ratio(previous, Frame(moved)) == 0.25
+    assert engine.motion_ratio(None, Frame(moved)) == 0.0
+    assert engine.motion_ratio(Frame(water(shape=(10, 10, 3))), Frame(moved)) == 0.0
@@ -0,0 +1,69 @@
+import pytest
+
+from detectors import BiteDetector, DetectorCascade, TickContext
+
+class Config:
+    enable_sound_detection = True
+    enable_visual_detection = True
+
+class Stage(BiteDetector):
+    """A detector with a fixed answer, counting its checks"""
+    
+    def __init__(self, name: str, cost: float, confidence: float, fires: bool):
+        self.name = name
+        self.cost = cost
+        self.confidence = confidence
+        self.fires = fires
+        self.checks = 0
+    
+    def check(self, context: TickContext) -> bool:
+        self.checks += 1
+        return self.fires
+
+def evaluate(cascade: DetectorCascade):
+    return cascade.evaluate(TickContext(Config(), None, None))
+
+@pytest.mark.parametrize('confidence, expected', [(0.6, 'motion'), (0.9, None)])
+def test_single_stage_decides_at_its_confidence(confidence, expected):
+    motion = Stage('motion', 0.4, 0.6, True)
+    decided = evaluate(DetectorCascade([motion], confidence=confidence))
+    assert (decided.name if decided else None) == expected
+
+def test_confidences_combine():
+    # 1 - (1 - 0.6) * (1 - 0.7) = 0.88
+    first = Stage('motion', 0.4, 0.6, True)
+    second = Stage('splash', 1.5, 0.7, True)
+    assert evaluate(DetectorCascade([first, second], confidence=0.85)) is second
+    assert evaluate(DetectorCascade([first, second], confidence=0.9)) is None
+
+def test_gate_stage_escalates_but_never_decides():
+    gate = Stage('highlights', 0.2, 0.0, True)
+    splash = Stage('splash', 1.5, 0.9, False)
+    cascade = DetectorCascade([splash, gate], confidence=0.6)
+    assert evaluate(cascade) is None
+    assert splash.checks == 1
+    gate.fires = False
+    assert evaluate(cascade) is None
+    assert splash.checks == 1
+    assert cascade.report()['splash']['skipped'] == 1
+
+def test_decisive_cheap_stage_skips_the_rest():
+    sound = Stage('sound', 0.05, 0.9, True)
+    motion = Stage('motion', 0.4, 0.6, True)
+    splash = Stage('splash', 1.5, 0.9, True)
+    assert evaluate(DetectorCascade([splash, motion, sound], confidence=0.6)) is sound
+    assert motion.checks == splash.checks == 0
+
+def test_without_cascade_every_stage_runs():
+    gate = Stage('highlights', 0.2, 0.0, False)
+    splash = Stage('splash', 1.5, 0.9, True)
+    assert evaluate(DetectorCascade([gate, splash], cascade=False)) is splash
+    assert gate.checks == splash.checks == 1
+
+def test_parallel_tiers_give_the_same_decision():
+    stages = [Stage('highlights', 0.2, 0.0, True), Stage('motion', 0.4, 0.6, True), Stage('splash', 1.5, 0.9, True)]
+    cascade = DetectorCascade(stages, confidence=0.9, workers=2)
+    try:
+        assert evaluate(cascade).name == 'splash'
+    finally:
+        cascade.close()
@@ -0,0 +1,48 @@
+import pytest
+
+from evaluation import EvaluationResult, parse_grid, score_cast
+
+def cast(bite=None, start=100.0, end=110.0):
+    return {"start": start, "end": end, "bite": None if bite is None else start + bite}
+
+@pytest.mark.parametrize('bite, detected, outcome, duration', [
+    (4.0, 4.3, "tp", 4.3),
+    (4.0, 3.95, "tp", 3.95),
+    (4.0, 3.0, "fp", 3.0),
+    (None, 2.0, "fp", 2.0),
+    (4.0, None, "fn", 10.0),
+    (None, None, "tn", 10.0),
+])
+def test_score_cast(bite, detected, outcome, duration):
+    detected_at = None if detected is None else 100.0 + detected
+    result = score_cast("session", cast(bite), "splash", detected_at, early=0.1)
+    assert result.outcome == outcome
+    assert result.bite == bite
+    assert result.duration == pytest.approx(duration)
+    if outcome == "tp":
+        assert result.delay == pytest.approx(detected - bite)
+    else:
+        assert result.delay is None
+
+def test_summary_counts_outcomes_and_catches():
+    result = EvaluationResult("config")
+    result.casts = [score_cast("s", cast(4.0), "splash", 104.5, 0.1),
+                    score_cast("s", cast(4.0), "splash", 107.5, 0.1),
+                    score_cast("s", cast(None), "motion", 101.0, 0.1),
+                    score_cast("s", cast(4.0), None, None, 0.1)]
+    summary = result.summary(loot_window=3.0, reaction_delay=0.2)
+    assert (summary["tp"], summary["fp"], summary["fn"], summary["bites"]) == (2, 1, 1, 3)
+    assert summary["precision"] == pytest.approx(2 / 3)
+    assert summary["recall"] == pytest.approx(2 / 3)
+    # The second detection comes too late to loot
+    assert summary["catches"] == 1
+    assert summary["delay_ms"]["max"] == pytest.approx(3500)
+
+def test_parse_grid_takes_the_cross_product():
+    variants = parse_grid(["splash_threshold=0.1,0.2", "adaptive_roi=false"])
+    assert variants == [
+        ("splash_threshold=0.1 adaptive_roi=False", {"splash_threshold": 0.1, "adaptive_roi": False}),
+        ("splash_threshold=0.2 adaptive_roi=False", {"splash_threshold": 0.2, "adaptive_roi": False}),
+    ]
+    with pytest.raises(ValueError):
+        parse_grid(["no_such_field=1"])
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+
+from capture import Frame
+from flight_recorder import FlightRecorder, FrameRing
+from recording import Session
+
+AREA = (0, 0, 8, 6)
+
+def frame(value: int, shape=(6, 8, 4), area=AREA) -> Frame:
+    return Frame(np.full(shape, value, dtype=np.uint8), area, timestamp=float(value))
+
+def test_ring_keeps_the_most_recent_frames_in_order():
+    ring = FrameRing(3, 8 * 6 * 4)
+    for value in range(5):
+        assert ring.write(frame(value))
+    frames = ring.share()
+    assert [f.timestamp for f in frames] == [2.0, 3.0, 4.0]
+    assert [int(f.image[0, 0, 0]) for f in frames] == [2, 3, 4]
+
+def test_ring_keeps_shape_and_area_of_each_frame():
+    ring = FrameRing(4, 8 * 6 * 4)
+    ring.write(frame(1))
+    ring.write(frame(2, shape=(3, 5, 3), area=(2, 1, 5, 3)))
+    ring.write(frame(3, shape=(2, 2), area=(4, 4, 2, 2)))
+    frames = ring.share()
+    assert [f.image.shape for f in frames] == [(6, 8, 4), (3, 5, 3), (2, 2)]
+    assert [f.area for f in frames] == [AREA, (2, 1, 5, 3), (4, 4, 2, 2)]
+
+def test_ring_rejects_frames_larger_than_a_slot():
+    ring = FrameRing(2, 8 * 6 * 4)
+    assert not ring.write(frame(1, shape=(12, 8, 4)))
+    assert ring.share() == []
+
+def test_shared_frames_survive_later_writes():
+    ring = FrameRing(2, 8 * 6 * 4)
+    ring.write(frame(1))
+    ring.write(frame(2))
+    shared = ring.share()
+    ring.write(frame(3))
+    ring.write(frame(4))
+    assert [int(f.image[0, 0, 0]) for f in shared] == [1, 2]
+    assert [int(f.image[0, 0, 0]) for f in ring.share()] == [3, 4]
+
+def test_bite_event_saves_a_snapshot(tmp_path):
+    recorder = FlightRecorder(str(tmp_path), AREA, frames=4, audio_chunks=8, chunk_size=16)
+    for value in range(6):
+        recorder.record_frame(frame(value))
+        recorder.record_audio(np.full(16, value, dtype=np.int16), float(value))
+    recorder.record_event("cast", timestamp=0.0)
+    recorder.record_event("bite", timestamp=5.5, detector="splash")
+    recorder.close()
+    
+    assert recorder.snapshots == 1
+    session = Session(os.path.join(tmp_path, os.listdir(tmp_path)[0]))
+    assert [session.frame(i).timestamp for i in range(session.frame_count)] == [2.0, 3.0, 4.0, 5.0]
+    np.testing.assert_array_equal(session.frame(3).image, frame(5).image)
+    assert session.audio_count == 6
+    assert [event["event"] for event in session.events] == ["cast", "bite"]
+
+def test_snapshots_keep_the_history(tmp_path):
+    recorder = FlightRecorder(str(tmp_path), AREA, frames=4, audio_chunks=8, chunk_size=16)
+    for value in range(3):
+        recorder.record_frame(frame(value))
+    first = recorder.snapshot("first")
+    assert recorder._idle.wait(5.0)
+    recorder.record_frame(frame(3))
+    second = recorder.snapshot("second")
+    recorder.close()
+    assert [Session(path).frame_count for path in (first, second)] == [3, 4]
+    np.testing.assert_array_equal(Session(second).frame(0).image, Session(first).frame(0).image)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from instrumentation import Instrumentation, LatencyHistogram
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.mark.parametrize('q', [50, 90, 95, 99])
+def test_percentiles_are_within_bucket_resolution(q):
+    samples = np.random.default_rng(0).lognormal(np.log(0.02), 1.0, 5000)
+    histogram = LatencyHistogram()
+    for sample in samples:
+        histogram.add(sample)
+    assert histogram.percentile(q) == pytest.approx(np.percentile(samples, q), rel=0.07)
+
+def test_count_sum_min_and_max_are_exact():
+    histogram = LatencyHistogram()
+    for sample in (0.004, 0.001, 2.5, 0.0):
+        histogram.add(sample)
+    assert histogram.count == 4
+    assert histogram.total == pytest.approx(2.505)
+    assert (histogram.min, histogram.max) == (0.0, 2.5)
+    assert histogram.percentile(100) == pytest.approx(2.5, rel=0.07)
+    assert histogram.percentile(0) == 0.0
+
+def test_empty_histogram():
+    assert LatencyHistogram().percentile(50) == 0.0
+    assert LatencyHistogram().summary() == {"count": 0}
+
+def test_timer_records_the_enclosed_block():
+    clock, work_clock = FakeClock(), FakeClock()
+    instrumentation = Instrumentation(enabled=True, clock=clock, work_clock=work_clock)
+    with instrumentation.timer("capture"):
+        work_clock.now += 0.25
+        clock.now += 10.0
+    start = instrumentation.now()
+    clock.now += 0.5
+    instrumentation.since("loot", start)
+    instrumentation.since("loot", None)
+    start = instrumentation.work_now()
+    work_clock.now += 0.125
+    instrumentation.work_since("decide", start)
+    summary = instrumentation.summary()
+    # Timers measure work time, `since` spans of the bot's clock
+    assert summary["capture"]["count"] == 1
+    assert summary["capture"]["max_ms"] == pytest.approx(250)
+    assert summary["loot"]["count"] == 1
+    assert summary["loot"]["max_ms"] == pytest.approx(500)
+    assert summary["decide"]["max_ms"] == pytest.approx(125)
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation = Instrumentation(enabled=False)
+    with instrumentation.timer("capture"):
+        pass
+    instrumentation.record("loot", 1.0)
+    assert instrumentation.now() is None
+    assert instrumentation.summary() == {}
@@ -0,0 +1,51 @@
+import urllib.request
+
+from metrics_server import BotMetrics, MetricsServer, render_prometheus
+
+def test_render_groups_series_in_declared_order():
+    metrics = BotMetrics()
+    metrics.increment('fishbot_bites_total', detector="splash")
+    metrics.increment('fishbot_bites_total', detector="audio")
+    metrics.increment('fishbot_bites_total', detector="splash")
+    metrics.increment('fishbot_casts_total', 3)
+    metrics.set('fishbot_running', 1)
+    metrics.set('custom_value', 0.5)
+    
+    assert render_prometheus(metrics.snapshot()) == "\n".join([
+        '# HELP fishbot_casts_total Lines cast',
+        '# TYPE fishbot_casts_total counter',
+        'fishbot_casts_total 3',
+        '# HELP fishbot_bites_total Bites detected, by detector',
+        '# TYPE fishbot_bites_total counter',
+        'fishbot_bites_total{detector="audio"} 1',
+        'fishbot_bites_total{detector="splash"} 2',
+        '# HELP fishbot_running 1 while the bot is running',
+        '# TYPE fishbot_running gauge',
+        'fishbot_running 1',
+        '# HELP custom_value ',
+        '# TYPE custom_value untyped',
+        'custom_value 0.5',
+    ]) + "\n"
+
+def test_frames_update_counters_and_latency():
+    metrics = BotMetrics(smoothing=0.5)
+    metrics.frame(0.02)
+    metrics.frame(0.04)
+    values = metrics.snapshot()
+    assert values[('fishbot_frames_total', ())] == 2
+    assert abs(values[('fishbot_capture_seconds_total', ())] - 0.06) < 1e-12
+    assert abs(values[('fishbot_capture_latency_seconds', ())] - 0.03) < 1e-12
+
+def test_server_serves_metrics():
+    metrics = BotMetrics()
+    metrics.increment('fishbot_catches_total')
+    server = MetricsServer(metrics, 0)
+    server.start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+    finally:
+        server.close()
+    assert 'fishbot_catches_total 1\n' in body
+    assert '# TYPE process_cpu_seconds_total counter' in body
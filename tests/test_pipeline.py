@@ -0,0 +1,73 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from capture import Frame
+from pipeline import FrameRing, PipelineState
+
+@pytest.fixture
+def ring():
+    ring = FrameRing(4, (8, 6))
+    yield ring
+    ring.close()
+
+def make_frame(value: int, width: int = 8, height: int = 6) -> Frame:
+    return Frame(np.full((height, width, 3), value, dtype=np.uint8), (10, 20, width, height), float(value))
+
+def test_read_returns_written_frame(ring):
+    ring.write(5, 2, make_frame(7, 4, 3), 1.5, 0.25)
+    frame = ring.read(5, 2)
+    assert frame.shape == (3, 4, 3)
+    assert (frame.image == 7).all()
+    assert frame.area == (10, 20, 4, 3)
+    assert frame.timestamp == 7.0
+    assert ring.started(5) == 1.5
+    assert ring.capture_seconds(5) == 0.25
+
+def test_read_rejects_other_generation(ring):
+    ring.write(0, 1, make_frame(1), 0.0, 0.0)
+    assert ring.read(0, 1) is not None
+    assert ring.read(0, 2) is None
+
+def test_slot_is_invalid_once_the_ring_laps(ring):
+    ring.write(1, 0, make_frame(1), 0.0, 0.0)
+    assert ring.valid(1)
+    ring.write(1 + ring.slots, 0, make_frame(2), 0.0, 0.0)
+    assert not ring.valid(1)
+    assert ring.read(1, 0) is None
+    assert (ring.read(1 + ring.slots, 0).image == 2).all()
+
+def test_slot_is_invalid_while_being_written(ring):
+    ring.write(3, 0, make_frame(3), 0.0, 0.0)
+    # A writer marks the slot before copying the pixels in
+    ring.header['seq'][3] = -1
+    assert not ring.valid(3)
+    assert not ring.valid(-1)
+
+def test_fits(ring):
+    assert ring.fits(make_frame(0, 8, 6))
+    assert not ring.fits(make_frame(0, 9, 6))
+    assert not ring.fits(make_frame(0, 8, 7))
+
+def test_attached_ring_shares_the_slots(ring):
+    attached = FrameRing(ring.slots, ring.max_size, name=ring.name)
+    try:
+        ring.write(2, 4, make_frame(9), 0.0, 0.0)
+        assert (attached.read(2, 4).image == 9).all()
+    finally:
+        attached.close()
+
+def test_claim_takes_newest_and_counts_skipped():
+    state = PipelineState(multiprocessing.get_context('spawn'))
+    assert state.claim(timeout=0.0) is None
+    for seq in range(4):
+        state.publish(seq)
+    assert state.claim(timeout=0.0) == 3
+    assert state.dropped.value == 3
+    assert state.claim(timeout=0.0) is None
+    state.publish(4)
+    state.publish(5)
+    state.skip_to_latest()
+    assert state.claim(timeout=0.0) is None
+    assert state.dropped.value == 3
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from capture import Frame
+from recording import Session, SessionRecorder
+
+AREA = (100, 50, 16, 12)
+
+def record_session(path: str, compress: bool = False, background: bool = False):
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(37):
+        # Full-area BGRA frames and smaller BGR windows, as with adaptive ROI
+        shape = (12, 16, 4) if i % 3 else (5, 7, 3)
+        area = AREA if i % 3 else (104, 52, 7, 5)
+        frames.append(Frame(rng.integers(0, 256, shape, dtype=np.uint8), area, 10.0 + i * 0.1))
+    audio = [rng.integers(-3000, 3000, 64, dtype=np.int16) for _ in range(5)] + [np.arange(20, dtype=np.int16)]
+    
+    recorder = SessionRecorder(path, AREA, sample_rate=8000, chunk_size=64, compress=compress,
+                               frames_per_chunk=8, background=background, queue_frames=64)
+    recorder.record_event("cast", timestamp=10.0)
+    for i, frame in enumerate(frames):
+        recorder.record_frame(frame)
+        if i < len(audio):
+            recorder.record_audio(audio[i], 10.0 + i * 0.1)
+    recorder.record_event("bite", timestamp=12.0, detector="splash")
+    recorder.record_event("cast", timestamp=13.0)
+    recorder.close()
+    assert recorder.dropped_frames == 0
+    return frames, audio
+
+@pytest.mark.parametrize('compress', [False, True])
+@pytest.mark.parametrize('background', [False, True])
+def test_session_round_trip(tmp_path, compress, background):
+    path = str(tmp_path / 'session')
+    frames, audio = record_session(path, compress, background)
+    session = Session(path)
+    
+    assert session.frame_count == len(frames)
+    for i, frame in enumerate(frames):
+        recorded = session.frame(i)
+        np.testing.assert_array_equal(recorded.image, frame.image)
+        assert recorded.area == frame.area
+        assert recorded.timestamp == frame.timestamp
+    
+    assert session.audio_count == len(audio)
+    for i, samples in enumerate(audio):
+        np.testing.assert_array_equal(session.audio_chunk(i), samples)
+    
+    assert session.start_time == 10.0
+    assert list(session.frames_between(10.0, 10.45)) == [0, 1, 2, 3, 4]
+    casts = session.casts()
+    assert [(cast["start"], cast["outcome"], cast["bite"], cast["detector"]) for cast in casts] == \
+        [(10.0, "bite", 12.0, "splash"), (13.0, None, None, None)]
+    assert casts[0]["end"] == 13.0
+    # The last cast runs just past the last sample
+    assert casts[1]["end"] > frames[-1].timestamp
+
+def test_closed_recorder_ignores_writes(tmp_path):
+    path = str(tmp_path / 'session')
+    recorder = SessionRecorder(path, AREA)
+    recorder.close()
+    recorder.record_frame(Frame(np.zeros((12, 16, 4), dtype=np.uint8), AREA, 0.0))
+    recorder.record_event("cast", timestamp=0.0)
+    assert Session(path).frame_count == 0
+    assert Session(path).events == []
+
+def test_uncompressed_frames_are_memory_mapped(tmp_path):
+    path = str(tmp_path / 'session')
+    record_session(path)
+    session = Session(path)
+    assert isinstance(session.frame_index, np.memmap)
+    assert isinstance(session._frames, np.memmap)
+    assert np.shares_memory(session.frame(1).image, session._frames)
+
+def test_oversized_frame_is_not_recorded(tmp_path):
+    recorder = SessionRecorder(str(tmp_path / 'session'), (0, 0, 4, 4), background=False)
+    recorder.record_frame(Frame(np.zeros((8, 8, 4), dtype=np.uint8), (0, 0, 8, 8), 0.0))
+    recorder.close()
+    assert Session(str(tmp_path / 'session')).frame_count == 0
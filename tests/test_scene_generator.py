@@ -0,0 +1,48 @@
+import numpy as np
+
+from recording import Session
+from scene_generator import SceneGenerator, load_labels, write_dataset
+
+AREA = (100, 80, 320, 240)
+
+def generator(**options) -> SceneGenerator:
+    options = {'screen_size': (640, 480), 'area': AREA, 'bite_delay': (1.0, 2.0), 'recast_delay': 0.5,
+               'distractors_per_minute': 0.0, 'lighting': 0.0, **options}
+    return SceneGenerator(seed=3, **options)
+
+def test_labels_match_the_rendered_bobber():
+    scene = generator(miss_rate=0.0)
+    for frame, label in scene.frames(AREA, 200):
+        if label.bobber is None or label.splash:
+            continue
+        x, y = label.bobber
+        assert AREA[0] <= x < AREA[0] + AREA[2] and AREA[1] <= y < AREA[1] + AREA[3]
+        # The bobber's red body sits at the labelled position
+        np.testing.assert_array_equal(frame.image[y - AREA[1], x - AREA[0]], (40, 40, 200))
+
+def test_splash_starts_at_the_bite():
+    labels = [label for _, label in generator(miss_rate=0.0).frames(AREA, 300)]
+    assert len({label.cast for label in labels}) > 2
+    for label in labels:
+        assert label.splash == (label.bite_time is not None and label.timestamp >= label.bite_time)
+    assert any(label.splash for label in labels)
+
+def test_missed_casts_have_no_bite():
+    labels = [label for _, label in generator(miss_rate=1.0, cast_timeout=1.0).frames(AREA, 120)]
+    assert all(label.bite_time is None and not label.splash for label in labels)
+    assert labels[-1].cast > 1
+
+def test_same_seed_renders_the_same_scene():
+    first = [frame.image.copy() for frame, _ in generator().frames(AREA, 20)]
+    second = [frame.image.copy() for frame, _ in generator().frames(AREA, 20)]
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+
+def test_dataset_events_follow_the_labels(tmp_path):
+    path = str(tmp_path / 'scenes')
+    write_dataset(path, generator(miss_rate=0.0), AREA, 150, compress=False)
+    labels = load_labels(path)
+    session = Session(path)
+    assert session.frame_count == len(labels) == 150
+    bites = sorted({label.bite_time for label in labels if label.splash})
+    assert [cast["bite"] for cast in session.casts() if cast["outcome"] == "bite"] == bites
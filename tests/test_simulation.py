@@ -0,0 +1,49 @@
+import itertools
+import logging
+from dataclasses import replace
+
+import main
+from backends import VirtualClock
+from main import FishbotConfig
+from simulation import Simulation
+
+def test_virtual_clock_notifies_listeners():
+    clock = VirtualClock(5.0)
+    seen = []
+    clock.listeners.append(seen.append)
+    clock.sleep(0.25)
+    clock.sleep(-1.0)
+    assert clock.time() == clock.perf_counter() == 5.25
+    assert seen == [5.25, 5.25]
+
+def run(cycles: int, **options):
+    logging.getLogger('main').setLevel(logging.WARNING)
+    return Simulation(seed=1, **options).run(cycles)
+
+def test_scheduled_bites_are_caught():
+    result = run(4, schedule=[2.0, 5.0, None, 3.5])
+    world = result.world
+    assert (world.casts, world.bites, world.catches) == (4, 3, 3)
+    assert (world.missed, world.false_loots) == (0, 0)
+    assert all(0 < lag < 1.0 for lag in world.loot_lags)
+
+def test_runs_are_deterministic():
+    first = run(3, schedule=[2.5, 4.0])
+    second = run(3, schedule=[2.5, 4.0])
+    assert first.virtual_seconds == second.virtual_seconds
+    assert first.world.loot_lags == second.world.loot_lags
+
+def test_prefetched_frame_is_dropped_when_the_window_moves(monkeypatch):
+    logging.getLogger('main').setLevel(logging.WARNING)
+    config = replace(FishbotConfig(), bobber_detection_area=(0, 0, 160, 120), adaptive_roi=True,
+                     detector_workers=2, enable_sound_detection=False)
+    simulation = Simulation(config, seed=0, schedule=[3.0, 4.0, 2.5])
+    visual = simulation.bot.visual_detector
+    # The bobber is lost on every tick, so it is re-acquired in another window every few ticks
+    windows = itertools.cycle([(40, 30, 60, 50), (50, 40, 60, 50)])
+    monkeypatch.setattr(visual, 'bobber_window', lambda frame, size: next(windows))
+    monkeypatch.setattr(visual, 'detect_bobber', lambda frame: None)
+    # The detectors always outlast the tick, so the next frame is always prefetched
+    monkeypatch.setattr(main, 'wait', lambda futures, timeout=None: (set(), set(futures)))
+    world = simulation.run(3).world
+    assert (world.catches, world.false_loots) == (3, 0)
@@ -0,0 +1,103 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backends import InputBackend
+from capture import Frame, FrameSource
+from supervisor import DispatchedInput, InputDispatcher, SharedCapture, Supervisor
+
+class ScreenSource(FrameSource):
+    """A fixed screen image, counting grabs"""
+    
+    def __init__(self):
+        self.screen = np.random.default_rng(0).integers(0, 256, (200, 300, 3), dtype=np.uint8)
+        self.grabs = []
+    
+    def grab(self, area):
+        x, y, w, h = area
+        self.grabs.append(tuple(area))
+        return Frame(self.screen[y:y + h, x:x + w].copy(), area, float(len(self.grabs)))
+
+class RecordingInput(InputBackend):
+    def __init__(self):
+        self.sent = []
+        self.done = threading.Event()
+    
+    def press(self, key):
+        self.sent.append(('press', key))
+        if key == 'stop':
+            self.done.set()
+    
+    def hotkey(self, *keys):
+        self.sent.append(('hotkey',) + keys)
+    
+    def click(self, x, y):
+        self.sent.append(('click', x, y))
+
+def test_shared_capture_grabs_the_bounds_once_and_slices_views():
+    source = ScreenSource()
+    areas = [(10, 20, 50, 40), (100, 30, 60, 80)]
+    capture = SharedCapture(source, areas)
+    assert capture.bounds == (10, 20, 150, 90)
+    frame = capture.refresh()
+    for area in areas:
+        view = capture.grab(area)
+        x, y, w, h = area
+        np.testing.assert_array_equal(view.image, source.screen[y:y + h, x:x + w])
+        assert np.shares_memory(view.image, frame.image)
+        assert view.area == area
+        assert view.timestamp == frame.timestamp
+    assert source.grabs == [capture.bounds]
+
+def test_shared_capture_rejects_areas_outside_the_bounds():
+    capture = SharedCapture(ScreenSource(), [(10, 20, 50, 40)])
+    with pytest.raises(ValueError):
+        capture.grab((5, 20, 50, 40))
+
+def test_dispatcher_sends_focus_and_keys_in_order():
+    backend = RecordingInput()
+    dispatcher = InputDispatcher(backend, gap=0.0)
+    left = DispatchedInput(dispatcher, focus=(5, 6))
+    right = DispatchedInput(dispatcher)
+    left.press('1')
+    right.hotkey('shift', 'right')
+    left.hotkey('shift', 'right')
+    right.press('stop')
+    assert backend.done.wait(5.0)
+    dispatcher.close()
+    assert backend.sent == [('click', 5, 6), ('press', '1'), ('hotkey', 'shift', 'right'),
+                            ('click', 5, 6), ('hotkey', 'shift', 'right'), ('press', 'stop')]
+
+def test_on_sent_follows_each_input():
+    backend = RecordingInput()
+    dispatcher = InputDispatcher(backend, gap=0.0)
+    reports = []
+    # Runs on the input thread right after the input went out
+    left = DispatchedInput(dispatcher, on_sent=lambda action: reports.append((action, len(backend.sent))))
+    right = DispatchedInput(dispatcher, focus=(1, 2))
+    left.press('1')
+    right.press('2')
+    left.hotkey('shift', 'right')
+    right.press('stop')
+    assert backend.done.wait(5.0)
+    dispatcher.close()
+    assert reports == [('press', 1), ('hotkey', 4)]
+
+def test_interval_follows_the_waiting_instances():
+    defaults = {"poll_interval": 0.2, "roi_poll_interval": 0.05, "enable_visual_detection": True}
+    instances = [{"name": "left", "bobber_detection_area": [0, 0, 100, 80]},
+                 {"name": "right", "bobber_detection_area": [150, 0, 100, 80], "poll_interval": 0.1}]
+    supervisor = Supervisor(defaults, instances, input_backend=RecordingInput(), frame_source=ScreenSource())
+    try:
+        left, right = supervisor.instances
+        assert supervisor.interval == 0.1
+        left.state = 'waiting'
+        assert supervisor.interval == 0.2
+        # Once the bobber is found the instance polls its window at roi_poll_interval
+        left.bot.watch.analysis_area = (20, 20, 30, 30)
+        assert supervisor.interval == 0.05
+        left.state = 'resting'
+        assert supervisor.interval == 0.1
+    finally:
+        supervisor.dispatcher.close()
@@ -0,0 +1,121 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from capture import Frame
+from template_matching import PyramidMatcher, TemplateBank, crop_from_difference, match_single_scale
+
+def bobber(size: int = 24) -> np.ndarray:
+    """A red-and-white float with some texture, as a BGR image"""
+    image = np.full((size, size, 3), (110, 80, 30), dtype=np.uint8)
+    centre = (size // 2, size // 2)
+    cv2.circle(image, centre, size // 3, (40, 40, 200), -1)
+    cv2.circle(image, (centre[0], centre[1] - size // 4), size // 6, (235, 235, 235), -1)
+    cv2.line(image, (centre[0], 0), (centre[0], size // 4), (20, 20, 20), 2)
+    return image
+
+def scene(template: np.ndarray, location, shape=(180, 240)) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    image = np.empty(shape + (3,), dtype=np.uint8)
+    image[:] = (120, 80, 30)
+    noise = cv2.GaussianBlur(rng.normal(0, 25, shape), (0, 0), 3)
+    image = np.clip(image + noise[..., None], 0, 255).astype(np.uint8)
+    x, y = location
+    h, w = template.shape[:2]
+    image[y:y + h, x:x + w] = template
+    return image
+
+@pytest.mark.parametrize('location', [(37, 51), (180, 120), (0, 0)])
+def test_pyramid_matches_the_full_resolution_search(location):
+    template = bobber()
+    image = scene(template, location)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    reference = match_single_scale(gray, cv2.cvtColor(template, cv2.COLOR_BGR2GRAY))
+    result = PyramidMatcher(template, levels=2).match(Frame(image))
+    assert reference.location == location
+    assert result.location == reference.location
+    assert result.score == pytest.approx(reference.score, abs=1e-4)
+    assert result.center == (location[0] + 12, location[1] + 12)
+
+def test_pyramid_finds_the_scale():
+    template = bobber(24)
+    image = scene(cv2.resize(template, (30, 30), interpolation=cv2.INTER_AREA), (90, 40))
+    result = PyramidMatcher(template, scales=(0.8, 1.0, 1.25), levels=2).match(image)
+    assert result.scale == 1.25
+    assert result.size == (30, 30)
+    assert abs(result.location[0] - 90) <= 1 and abs(result.location[1] - 40) <= 1
+
+def test_template_larger_than_image():
+    template = bobber(24)
+    assert PyramidMatcher(template).match(np.zeros((10, 10), np.uint8)) is None
+    assert match_single_scale(np.zeros((10, 10), np.uint8), template[:, :, 0]) is None
+
+def write_template(path, image, mtime: float):
+    cv2.imwrite(str(path), image)
+    os.utime(path, (mtime, mtime))
+
+def test_bank_loads_and_reloads_changed_files(tmp_path):
+    write_template(tmp_path / "bobber.png", bobber(24), 1000.0)
+    write_template(tmp_path / "splash.png", bobber(24), 1000.0)
+    bank = TemplateBank(str(tmp_path), exclude=('splash',), reload_interval=0.0)
+    assert bank.refresh()
+    assert bank.names == ["bobber.png"]
+    # Unchanged mtime: nothing is re-read
+    assert not bank.refresh()
+    
+    image = scene(cv2.resize(bobber(24), (30, 30), interpolation=cv2.INTER_AREA), (90, 40))
+    assert bank.match(image).score < 0.9
+    write_template(tmp_path / "bobber.png", cv2.resize(bobber(24), (30, 30), interpolation=cv2.INTER_AREA), 2000.0)
+    assert bank.refresh()
+    result = bank.match(image)
+    assert result.template == "bobber.png"
+    assert result.location == (90, 40)
+    assert result.score > 0.99
+
+def test_bank_exclude_ignores_case(tmp_path):
+    for name in ("Splash.png", "SPLASH_big.png", "bobber.png"):
+        write_template(tmp_path / name, bobber(24), 1000.0)
+    bank = TemplateBank(str(tmp_path), exclude=('Splash',))
+    bank.refresh()
+    assert bank.names == ["bobber.png"]
+
+def test_bank_drops_deleted_files(tmp_path):
+    write_template(tmp_path / "a.png", bobber(24), 1000.0)
+    write_template(tmp_path / "b.png", bobber(20), 1000.0)
+    bank = TemplateBank(str(tmp_path), reload_interval=0.0)
+    bank.refresh()
+    assert len(bank) == 2
+    os.remove(tmp_path / "a.png")
+    assert bank.refresh()
+    assert bank.names == ["b.png"]
+
+def test_bank_tries_the_last_hit_first(tmp_path):
+    bank = TemplateBank(str(tmp_path / "missing"), confidence=0.9)
+    bank.add("other", np.random.default_rng(1).integers(0, 256, (24, 24), dtype=np.uint8))
+    bank.add("bobber", cv2.cvtColor(bobber(24), cv2.COLOR_BGR2GRAY))
+    result = bank.match(scene(bobber(24), (50, 60)))
+    assert result.template == "bobber"
+    assert bank.names == ["bobber", "other"]
+
+def test_crop_from_difference_boxes_the_new_bobber():
+    before = scene(np.full((24, 24, 3), (120, 80, 30), np.uint8), (0, 0))
+    after = before.copy()
+    after[70:94, 100:124] = bobber(24)
+    # A small flicker elsewhere is not the largest change
+    after[10:13, 10:13] = 255
+    x, y, w, h = crop_from_difference(before, after, padding=6)
+    assert x <= 100 and y <= 70 and x + w >= 124 and y + h >= 94
+    assert w <= 24 + 2 * 6 + 4 and h <= 24 + 2 * 6 + 4
+
+def test_crop_from_difference_without_a_change():
+    before = scene(np.full((24, 24, 3), (120, 80, 30), np.uint8), (0, 0))
+    assert crop_from_difference(before, before.copy()) is None
+    assert crop_from_difference(before, before[:50]) is None
+
+def test_crop_from_difference_clips_to_the_image():
+    before = np.full((40, 40, 3), 100, np.uint8)
+    after = before.copy()
+    after[:10, :10] = 250
+    assert crop_from_difference(before, after, padding=6)[:2] == (0, 0)